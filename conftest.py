@@ -0,0 +1,7 @@
+import importlib.util
+
+collect_ignore = []
+
+# the viewer is an optional dependency
+if importlib.util.find_spec("compas_viewer") is None:
+    collect_ignore.append("src/compas_ags/viewer")
@@ -1,9 +1,28 @@
 from .core import (
     update_q_from_qind,
     update_primal_from_dual,
+    update_edge_results,
+    solve_blocks,
+    vertex_edge_adjacency,
     get_jacobian_and_residual,
+    get_residual,
+    LeastSquaresQR,
+    NewtonResult,
+    solve_newton_step_lsmr,
     compute_jacobian,
+    jacobian_operator,
     parallelise_edges,
+    parallelise_edges_numpy,
+    SparseFactor,
+    LeastSquaresFactor,
+    ForceDensitySolver,
+    laplacian_factor,
+    CompiledPair,
+    compile_pair,
+    rref_nonpivots,
+    count_dof,
+    nullspace_subspace,
+    nullspace_lsmr,
 )
 from .graphstatics import (
     form_identify_dof,
@@ -12,6 +31,7 @@ from .graphstatics import (
     form_update_from_force,
     form_update_from_force_newton,
     force_update_from_form,
+    update_diagrams_from_qind,
     force_update_from_constraints,
     update_diagrams_from_constraints,
 )
@@ -35,15 +55,35 @@ from .constraints import (
 __all__ = [
     "update_q_from_qind",
     "update_primal_from_dual",
+    "update_edge_results",
+    "solve_blocks",
+    "vertex_edge_adjacency",
     "get_jacobian_and_residual",
+    "get_residual",
+    "LeastSquaresQR",
+    "NewtonResult",
+    "solve_newton_step_lsmr",
     "compute_jacobian",
+    "jacobian_operator",
     "parallelise_edges",
+    "parallelise_edges_numpy",
+    "SparseFactor",
+    "LeastSquaresFactor",
+    "ForceDensitySolver",
+    "laplacian_factor",
+    "CompiledPair",
+    "compile_pair",
+    "rref_nonpivots",
+    "count_dof",
+    "nullspace_subspace",
+    "nullspace_lsmr",
     "form_identify_dof",
     "form_count_dof",
     "form_update_q_from_qind",
     "form_update_from_force",
     "form_update_from_force_newton",
     "force_update_from_form",
+    "update_diagrams_from_qind",
     "force_update_from_constraints",
     "update_diagrams_from_constraints",
     "compute_loadpath",
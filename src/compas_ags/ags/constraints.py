@@ -1,9 +1,13 @@
 import math
 from abc import ABC
 from abc import abstractmethod
+from typing import Literal
+from typing import Union
 
 import numpy as np
 import numpy.typing as npt
+from scipy.sparse import coo_matrix
+from scipy.sparse import csr_matrix
 
 from compas_ags.diagrams import FormDiagram
 
@@ -31,6 +35,30 @@ class AbstractConstraint(ABC):
         """Computes the residual and Jacobian matrix of the constraint."""
         pass
 
+    def compute_triplets(self) -> tuple[list[int], list[float], float]:
+        """Computes the non-zero entries of the Jacobian row and the residual of the constraint.
+
+        Returns
+        -------
+        tuple
+            The column indices and values of the non-zero entries of the Jacobian row, and the residual.
+
+        Notes
+        -----
+        The default implementation extracts the non-zero entries from the dense row of :meth:`compute_constraint`.
+        Constraints that only affect a few coordinates compute them directly instead.
+
+        """
+        row, r = self.compute_constraint()
+        row = np.asarray(row, dtype=float).ravel()
+        cols = row.nonzero()[0]
+        return cols.tolist(), row[cols].tolist(), r
+
+    def _dense_row(self, cols: list[int], values: list[float]) -> npt.NDArray:
+        row = np.zeros((1, self.number_of_cols))
+        row[0, cols] = values
+        return row
+
     @abstractmethod
     def update_constraint_goal(self):
         """Update constraint values based on current form diagram"""
@@ -70,14 +98,68 @@ class ConstraintsCollection:
     def add_constraint(self, constraint: AbstractConstraint) -> None:
         self.constraints.append(constraint)
 
-    def compute_constraints(self) -> tuple[npt.NDArray, npt.NDArray]:
-        jac = np.zeros((0, self.constraints[0].number_of_cols))
-        res = np.zeros((0, 1))
+    def compute_constraints(self, fixes: bool = True, rtype: Literal["array", "csr"] = "array") -> tuple[Union[npt.NDArray, csr_matrix], npt.NDArray]:
+        """Compute the Jacobian rows and residuals of the constraints.
+
+        Parameters
+        ----------
+        fixes : bool, optional
+            If ``False``, the horizontal and vertical fix constraints are skipped.
+            Default is ``True``.
+        rtype : {"array", "csr"}, optional
+            The format of the Jacobian rows.
+            Default is ``"array"``.
+
+        Returns
+        -------
+        tuple
+            The Jacobian rows of the constraints, with one column per coordinate of the form diagram in *Fortran* order,
+            and the residuals as a column vector.
+
+        Notes
+        -----
+        Every constraint only contributes the non-zero entries of its row, see :meth:`AbstractConstraint.compute_triplets`,
+        which are assembled into a sparse matrix once.
+        The sparse Newton steps use the rows in CSR format directly.
+        The solvers based on dense decompositions of the Jacobian, such as the QR-based Newton step and the nullspace computations,
+        request the dense rows.
+
+        """
+        constraints = [constraint for constraint in self.constraints if fixes or not isinstance(constraint, (HorizontalFix, VerticalFix))]
+        res = np.empty((len(constraints), 1))
+        rows = []
+        cols = []
+        data = []
+        for index, constraint in enumerate(constraints):
+            c, d, res[index, 0] = constraint.compute_triplets()
+            rows += [index] * len(c)
+            cols += c
+            data += d
+        shape = len(constraints), 2 * self.form.number_of_vertices()
+        jac = coo_matrix((data, (rows, cols)), shape=shape).tocsr()
+        if rtype == "csr":
+            return jac, res
+        return jac.toarray(), res
+
+    def compute_fixes(self) -> tuple[npt.NDArray, npt.NDArray]:
+        """Compute the indices and residuals of the coordinates fixed by the horizontal and vertical fix constraints.
+
+        Returns
+        -------
+        tuple of arrays
+            The indices of the fixed coordinates in *Fortran* order and their residuals.
+            Every coordinate is included only once.
+
+        """
+        res = {}
         for constraint in self.constraints:
-            j, r = constraint.compute_constraint()
-            jac = np.vstack((jac, j))
-            res = np.vstack((res, r))
-        return jac, res
+            if isinstance(constraint, HorizontalFix):
+                index = constraint.vertex_index[constraint.vertex]
+                res[index] = self.form.vertex_attribute(constraint.vertex, "x") - constraint.x
+            elif isinstance(constraint, VerticalFix):
+                index = constraint.vertex_index[constraint.vertex] + constraint.vcount
+                res[index] = self.form.vertex_attribute(constraint.vertex, "y") - constraint.y
+        return np.array(list(res.keys()), dtype=int), np.array(list(res.values()), dtype=float)
 
     def update_constraints(self) -> None:
         for constraint in self.constraints:
@@ -138,11 +220,13 @@ class HorizontalFix(AbstractConstraint):
         self.x = self.form.vertex_attribute(self.vertex, "x")
 
     def compute_constraint(self) -> tuple[npt.NDArray, float]:
-        constraint_jac_row = np.zeros((1, self.number_of_cols))
+        cols, values, r = self.compute_triplets()
+        return self._dense_row(cols, values), r
+
+    def compute_triplets(self) -> tuple[list[int], list[float], float]:
         idx = self.vertex_index[self.vertex]
-        constraint_jac_row[0, idx] = 1
         r = self.form.vertex_attribute(self.vertex, "x") - self.x
-        return constraint_jac_row, r
+        return [idx], [1.0], r
 
     def update_constraint_goal(self) -> None:
         self.set_initial_position()
@@ -187,11 +271,13 @@ class VerticalFix(AbstractConstraint):
         self.y = self.form.vertex_attribute(self.vertex, "y")
 
     def compute_constraint(self) -> tuple[npt.NDArray, float]:
-        constraint_jac_row = np.zeros((1, self.number_of_cols))
+        cols, values, r = self.compute_triplets()
+        return self._dense_row(cols, values), r
+
+    def compute_triplets(self) -> tuple[list[int], list[float], float]:
         idx = self.vertex_index[self.vertex] + self.vcount
-        constraint_jac_row[0, idx] = 1
         r = self.form.vertex_attribute(self.vertex, "y") - self.y
-        return constraint_jac_row, r
+        return [idx], [1.0], r
 
     def update_constraint_goal(self) -> None:
         self.set_initial_position()
@@ -241,18 +327,18 @@ class AngleFix(AbstractConstraint):
         self.y = self.form.vertex_attribute(self.vertex, "y")
 
     def compute_constraint(self) -> tuple[npt.NDArray, float]:
-        constraint_jac_row = np.zeros((1, self.number_of_cols))
+        cols, values, r = self.compute_triplets()
+        return self._dense_row(cols, values), r
 
+    def compute_triplets(self) -> tuple[list[int], list[float], float]:
         theta = math.radians(self.angle)
 
         idx = self.vertex_index[self.vertex]
-        constraint_jac_row[0, idx] = 1 * math.sin(theta)
         r = (self.form.vertex_attribute(self.vertex, "x") - self.x) * math.sin(theta)
 
-        idx = self.vertex_index[self.vertex] + self.vcount
-        constraint_jac_row[0, idx] = 1 * math.cos(theta)
+        idy = self.vertex_index[self.vertex] + self.vcount
         r = (self.form.vertex_attribute(self.vertex, "y") - self.y) * math.cos(theta)
-        return constraint_jac_row, r
+        return [idx, idy], [math.sin(theta), math.cos(theta)], r
 
     def update_constraint_goal(self) -> None:
         self.set_initial_position()
@@ -300,12 +386,14 @@ class LengthFix(AbstractConstraint):
         self.set_initial_length()
 
     def set_initial_length(self) -> None:
-        self.length = self.form.edge_length(*self.edge)  # Initial length
+        self.length = self.form.edge_length(self.edge)  # Initial length
 
     def compute_constraint(self) -> tuple[npt.NDArray, float]:
-        constraint_jac_row = np.zeros((1, self.number_of_cols))
+        cols, values, r = self.compute_triplets()
+        return self._dense_row(cols, values), r
 
-        s, e = self.form.edge_coordinates(*self.edge)
+    def compute_triplets(self) -> tuple[list[int], list[float], float]:
+        s, e = self.form.edge_coordinates(self.edge)
         dx = s[0] - e[0]
         dy = s[1] - e[1]
         length = math.sqrt(dx**2 + dy**2)  # Current length
@@ -313,13 +401,11 @@ class LengthFix(AbstractConstraint):
         id_u = self.vertex_index[self.edge[0]]
         id_v = self.vertex_index[self.edge[1]]
 
-        constraint_jac_row[0, id_u] = dx / length  # x0
-        constraint_jac_row[0, id_v] = -dx / length  # x1
-        constraint_jac_row[0, id_u + self.vcount] = dy / length  # y0
-        constraint_jac_row[0, id_v + self.vcount] = -dy / length  # y1
+        cols = [id_u, id_v, id_u + self.vcount, id_v + self.vcount]  # x0, x1, y0, y1
+        values = [dx / length, -dx / length, dy / length, -dy / length]
         r = length - self.length
 
-        return constraint_jac_row, r
+        return cols, values, r
 
 
 class SetLength(LengthFix):
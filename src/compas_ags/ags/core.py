@@ -1,35 +1,78 @@
 import sys
+from typing import Callable
+from typing import Union
 
 import numpy.typing as npt
+from numpy import absolute
+from numpy import add
+from numpy import arange
+from numpy import arctan2
 from numpy import array
 from numpy import asarray
 from numpy import atleast_2d
+from numpy import concatenate
+from numpy import degrees
 from numpy import delete
-from numpy import diag
+from numpy import diff
+from numpy import einsum
 from numpy import eye
 from numpy import float64
 from numpy import hstack
+from numpy import matmul
+from numpy import nan
+from numpy import ones
+from numpy import pi
+from numpy import repeat
+from numpy import sort
+from numpy import sqrt
+from numpy import stack
 from numpy import vstack
+from numpy import where
 from numpy import zeros
 from numpy.linalg import cond
-from numpy.linalg import inv
-from numpy.linalg import matrix_rank
+from numpy.linalg import eigh
+from numpy.linalg import norm
+from numpy.linalg import pinv
+from numpy.linalg import qr
+from numpy.linalg import solve as batch_solve
+from numpy.linalg import svd
+from numpy.random import default_rng
+from scipy.linalg import cho_factor
+from scipy.linalg import cho_solve
 from scipy.linalg import lstsq
-from scipy.linalg import solve
+from scipy.linalg import qr as qr_pivoting
+from scipy.linalg import solve_triangular
+from scipy.sparse import bmat as sparse_bmat
+from scipy.sparse import csr_matrix
+from scipy.sparse import diags
+from scipy.sparse import hstack as sparse_hstack
+from scipy.sparse import identity
+from scipy.sparse import issparse
 from scipy.sparse import spmatrix
+from scipy.sparse import vstack as sparse_vstack
+from scipy.sparse.linalg import LinearOperator
+from scipy.sparse.linalg import aslinearoperator
+from scipy.sparse.linalg import eigsh
+from scipy.sparse.linalg import lsmr
+from scipy.sparse.linalg import norm as sparse_norm
+from scipy.sparse.linalg import onenormest
+from scipy.sparse.linalg import splu
+from scipy.sparse.linalg import svds
 
 from compas.geometry import Line
 from compas.geometry import midpoint_point_point_xy
 from compas.geometry import project_point_line_xy
 from compas.linalg import normalizerow
 from compas.linalg import normrow
-from compas.linalg import solve_with_known
+from compas.linalg import nullspace as matrix_nullspace
 from compas.matrices import connectivity_matrix
 from compas.matrices import equilibrium_matrix
 from compas.matrices import laplacian_matrix
+from compas.tolerance import TOL
 from compas_ags.exceptions import SolutionError
 
 EPS = 1 / sys.float_info.epsilon
+SPARSE_DOF_SIZE = 500
 
 
 def rref_sympy(A, tol=None):
@@ -68,7 +111,941 @@ def rref_sympy(A, tol=None):
     return sympy.Matrix(A).rref()[0].tolist()
 
 
-def update_q_from_qind(E: spmatrix, q: npt.NDArray, dep: list[int], ind: list[int]) -> None:
+def rref_nonpivots(A, tol: float = 1e-9, blocksize: int = 64) -> list[int]:
+    r"""Identify the non-pivot columns of the reduced row-echelon form of a matrix numerically.
+
+    Parameters
+    ----------
+    A : array-like or sparse matrix
+        Matrix A (m x n).
+    tol : float, optional
+        A column is a non-pivot if the norm of its component orthogonal to all previous columns
+        is smaller than ``tol`` times the largest column norm of A.
+    blocksize : int, optional
+        Number of columns that are orthogonalised together.
+
+    Returns
+    -------
+    list
+        Non-pivot column indices.
+
+    Notes
+    -----
+    The pivots of the RREF are the columns that are linearly independent of the columns before them.
+    They are identified column by column with a block Gram-Schmidt orthogonalisation with reorthogonalisation.
+    The result is the same as ``nonpivots(rref_sympy(A))``, but the cost grows with the number of
+    rows, columns and the rank of A, and not with the complexity of an exact elimination.
+
+    Examples
+    --------
+    >>> A = [[1, 0, 1, 3], [2, 3, 4, 7], [-1, -3, -3, -4]]
+    >>> rref_nonpivots(A)
+    [2, 3]
+
+    """
+    if not issparse(A):
+        A = atleast_2d(asarray(A, dtype=float64))
+    m, n = A.shape
+    norms = sparse_norm(A, axis=0) if issparse(A) else norm(A, axis=0)
+    if n == 0 or norms.max() == 0:
+        return list(range(n))
+    tol = tol * norms.max()
+
+    Q = zeros((m, 0), dtype=float64)
+    nonpivots = []
+    for start in range(0, n, blocksize):
+        stop = min(start + blocksize, n)
+        B = A[:, start:stop]
+        B = B.toarray() if issparse(B) else array(B, dtype=float64)
+        for _ in range(2):
+            B -= Q.dot(Q.T.dot(B))
+        basis = []
+        for j in range(stop - start):
+            b = B[:, j]
+            for _ in range(2):
+                for u in basis:
+                    b -= u.dot(b) * u
+            length = norm(b)
+            if length < tol:
+                nonpivots.append(start + j)
+            else:
+                basis.append(b / length)
+        if basis:
+            Q = hstack((Q, array(basis).T))
+    return nonpivots
+
+
+def count_dof(A, tol: float = 0.001, sparse: bool = None, gap: bool = False) -> tuple:
+    r"""Count the degrees of freedom of a matrix.
+
+    Parameters
+    ----------
+    A : array-like or sparse matrix
+        Matrix A (m x n).
+    tol : float, optional
+        Singular values smaller than ``tol`` times the largest singular value are considered zero.
+    sparse : bool, optional
+        If ``True``, the small singular values are computed with a sparse eigensolver.
+        If ``False``, all singular values are computed with a dense SVD.
+        Default is ``None``, in which case the sparse eigensolver is used
+        if the smallest dimension of A is larger than ``SPARSE_DOF_SIZE``.
+    gap : bool, optional
+        If ``True``, also return the numerical gap.
+
+    Returns
+    -------
+    int
+        Column degrees-of-freedom.
+    int
+        Row degrees-of-freedom.
+    float
+        The ratio of the smallest singular value that is considered non-zero
+        and the largest singular value that is considered zero, if ``gap`` is ``True``.
+        A large gap means that the rank does not depend on the choice of tolerance.
+
+    Notes
+    -----
+    The result is the same as :func:`compas.linalg.dof`.
+    The sparse version computes only the smallest eigenvalues of the Gram matrix
+    (:math:`\mathbf{A}^{t}\mathbf{A}` or :math:`\mathbf{A}\mathbf{A}^{t}`, whichever is smaller)
+    with a shift-invert subspace iteration, which also finds zero eigenvalues of high multiplicity.
+    The size of the subspace is increased until it contains all zero eigenvalues and the smallest non-zero one.
+    Since the singular values are computed from the eigenvalues of the Gram matrix,
+    the reported gap is limited to about :math:`1 / \sqrt{\epsilon}`.
+
+    Examples
+    --------
+    >>> count_dof([[2, -1, 3], [1, 0, 1], [0, 2, -1], [1, 1, 4]])
+    (0, 1)
+
+    """
+    if not issparse(A):
+        A = atleast_2d(asarray(A, dtype=float64))
+    rows, cols = A.shape
+    n = min(rows, cols)
+    if sparse is None:
+        sparse = n > SPARSE_DOF_SIZE
+
+    # the singular values in ascending order
+    # including at least all zero singular values and the smallest non-zero one
+    s = None
+    if sparse and n > 16:
+        A = csr_matrix(A, dtype=float64)
+        G = (A.T.dot(A) if cols <= rows else A.dot(A.T)).tocsc()
+        smax = sqrt(eigsh(G, k=1, which="LA", return_eigenvectors=False)[0])
+        shift = (smax * tol) ** 2
+        rtol = max(1e-3 * shift, 1e-12 * smax**2)
+        lu = splu(G + shift * identity(n, format="csc"))
+        w, _ = _subspace_iteration(G.dot, lu.solve, n, shift, rtol, (n - 1) // 2)
+        if w is not None:
+            s = sqrt(w.clip(0))
+    if s is None:
+        if issparse(A):
+            A = A.toarray()
+        s = sort(svd(A, compute_uv=False))
+        smax = s[-1] if n else 0
+
+    small = int((s < smax * tol).sum()) if smax > 0 else n
+    r = n - small
+    k = cols - r
+    m = rows - r
+    if not gap:
+        return k, m
+    if small == 0 or small == n or s[small - 1] == 0:
+        return k, m, float("inf")
+    return k, m, float(s[small] / s[small - 1])
+
+
+def _subspace_iteration(gram: Callable, apply: Callable, n: int, threshold: float, rtol: float, maxsize: int, largest: bool = False) -> tuple:
+    """Compute the eigenpairs of a symmetric positive semi-definite matrix on one side of a threshold with a subspace iteration.
+
+    Parameters
+    ----------
+    gram : callable
+        The product of the matrix with an (n x p) array.
+    apply : callable
+        The operator of the iteration for an (n x p) array B.
+        For the smallest eigenvalues, the solution of the shifted system (G + threshold I) X = B.
+        For the largest eigenvalues, the product of the matrix with B.
+    n : int
+        The size of the matrix.
+    threshold : float
+        The eigenvalues below the threshold are computed, or the eigenvalues above it if ``largest`` is ``True``.
+    rtol : float
+        The tolerance for the norm of the residual of every eigenpair.
+    maxsize : int
+        The maximum size of the subspace.
+    largest : bool, optional
+        If ``True``, compute the eigenvalues above the threshold instead of below.
+
+    Returns
+    -------
+    tuple
+        The eigenvalues, in ascending order, or in descending order if ``largest`` is ``True``, and the eigenvectors,
+        including all eigenvalues on the requested side of the threshold and the next one,
+        or ``(None, None)`` if this requires a subspace larger than ``maxsize``.
+
+    """
+    rng = default_rng(0)
+    X = zeros((n, 0))
+    p = min(8, n)
+    while p <= maxsize:
+        X = hstack((X, rng.standard_normal((n, p - X.shape[1]))))
+        for _ in range(100):
+            X = qr(apply(X))[0]
+            w, V = eigh(X.T.dot(gram(X)))
+            if largest:
+                w, V = w[::-1], V[:, ::-1]
+            X = X.dot(V)
+            wanted = int((w >= threshold).sum() if largest else (w < threshold).sum())
+            if 2 * wanted >= p and p < n:
+                break
+            k = min(wanted + 1, p)
+            residual = norm(gram(X[:, :k]) - X[:, :k] * w[:k], axis=0)
+            if (residual < rtol).all():
+                return w, X
+        if p == n:
+            break
+        p = min(2 * p, n)
+    return None, None
+
+
+def _row_space_complement(gram: Callable, n: int, threshold: float, rtol: float) -> npt.NDArray:
+    """The orthogonal complement of the eigenvectors with eigenvalues above the threshold, if there are at most n / 2."""
+    w, X = _subspace_iteration(gram, gram, n, threshold, rtol, n // 2, largest=True)
+    if w is None:
+        return None
+    r = int((w >= threshold).sum())
+    return qr(X[:, :r], mode="complete")[0][:, r:]
+
+
+def _vstack_operators(A, B) -> LinearOperator:
+    """Stack two matrices or linear operators with the same number of columns vertically."""
+    A = aslinearoperator(A)
+    B = aslinearoperator(B)
+    m = A.shape[0]
+
+    def matvec(x):
+        return concatenate((A.matvec(x).ravel(), B.matvec(x).ravel()))
+
+    def rmatvec(y):
+        y = asarray(y).ravel()
+        return A.rmatvec(y[:m]).ravel() + B.rmatvec(y[m:]).ravel()
+
+    return LinearOperator((m + B.shape[0], A.shape[1]), matvec=matvec, rmatvec=rmatvec, dtype=float64)
+
+
+def _restrict_columns(A: LinearOperator, columns: npt.NDArray) -> LinearOperator:
+    """The operator of a subset of the columns of a linear operator."""
+    n = A.shape[1]
+
+    def matvec(x):
+        y = zeros(n, dtype=float64)
+        y[columns] = asarray(x).ravel()
+        return A.matvec(y)
+
+    def rmatvec(y):
+        return A.rmatvec(y).ravel()[columns]
+
+    return LinearOperator((A.shape[0], len(columns)), matvec=matvec, rmatvec=rmatvec, dtype=float64)
+
+
+def nullspace_subspace(A, tol: float = 0.001) -> npt.NDArray:
+    r"""Compute the nullspace of a matrix with subspace iterations on its Gram matrix.
+
+    Parameters
+    ----------
+    A : array-like or sparse matrix
+        Matrix A (m x n).
+    tol : float, optional
+        Singular values smaller than ``tol`` times the largest singular value are considered zero.
+        Default is ``0.001``.
+
+    Returns
+    -------
+    array
+        An orthonormal basis of the nullspace (n x k).
+        The result spans the same space as :func:`compas.linalg.nullspace`.
+
+    Notes
+    -----
+    Only one side of the spectrum of the Gram matrix :math:`\mathbf{A}^{t}\mathbf{A}` is computed,
+    with the threshold :math:`\lambda^2` where :math:`\lambda = tol \, \sigma_{max}`.
+    If the rank of A is at most half the number of columns,
+    the right singular vectors with singular values larger than :math:`\lambda` are computed with a block power iteration,
+    which only needs products with A and its transpose,
+    and the nullspace is their orthogonal complement.
+    Otherwise, the right singular vectors with singular values smaller than :math:`\lambda` are computed
+    with the same shift-invert subspace iteration as in :func:`count_dof`.
+    The shifted Gram matrix is positive definite and is factorised once,
+    with a Cholesky decomposition if A is dense and with a sparse LU decomposition if A is sparse.
+    If neither subspace is small enough, a dense SVD is used.
+
+    Examples
+    --------
+    >>> N = nullspace_subspace([[1.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    >>> N.shape
+    (3, 1)
+
+    """
+    if not issparse(A):
+        A = atleast_2d(asarray(A, dtype=float64))
+    rows, cols = A.shape
+    if min(rows, cols) > 1:
+        smax2 = svds(A, k=1, return_singular_vectors=False)[0] ** 2
+    else:
+        smax2 = (A.power(2) if issparse(A) else A**2).sum()
+    if smax2 <= 0:
+        return eye(cols)
+    shift = smax2 * tol**2
+    rtol = max(1e-3 * shift, 1e-12 * smax2)
+
+    def gram(X):
+        return A.T.dot(A.dot(X))
+
+    null = _row_space_complement(gram, cols, shift, rtol)
+    if null is not None:
+        return null
+
+    G = A.T.dot(A)
+    if issparse(G):
+        solve = splu((G + shift * identity(cols)).tocsc()).solve
+    else:
+        factor = cho_factor(G + shift * eye(cols))
+
+        def solve(X):
+            return cho_solve(factor, X)
+
+    w, X = _subspace_iteration(G.dot, solve, cols, shift, rtol, cols // 2)
+    if w is None:
+        return matrix_nullspace(A.toarray() if issparse(A) else A, tol=tol)
+    return X[:, w < shift]
+
+
+def nullspace_lsmr(A, tol: float = 0.001, maxiter: int = None) -> npt.NDArray:
+    r"""Compute the nullspace of a matrix with matrix-vector products only.
+
+    Parameters
+    ----------
+    A : array, sparse matrix or :class:`scipy.sparse.linalg.LinearOperator`
+        Matrix A (m x n).
+        A linear operator must implement the products with A and with its transpose.
+    tol : float, optional
+        Singular values smaller than ``tol`` times the largest singular value are considered zero.
+        Default is ``0.001``.
+    maxiter : int, optional
+        Maximum number of iterations of every LSMR solve.
+        Default is ``None``, in which case it is ten times the largest dimension of A.
+
+    Returns
+    -------
+    array
+        An orthonormal basis of the nullspace (n x k).
+        The result spans the same space as :func:`compas.linalg.nullspace`.
+
+    Notes
+    -----
+    If the rank of A is at most half the number of columns, the nullspace is computed as in :func:`nullspace_subspace`,
+    as the orthogonal complement of the right singular vectors with singular values larger than :math:`\lambda = tol \, \sigma_{max}`.
+    Otherwise, the right singular vectors with singular values smaller than :math:`\lambda`
+    are computed with the same shift-invert subspace iteration as in :func:`count_dof`,
+    on the Gram matrix :math:`\mathbf{A}^{t}\mathbf{A}` with shift :math:`\lambda^2`.
+    Instead of a factorisation, the shifted systems are solved with LSMR with damping :math:`\lambda`,
+    since :math:`(\mathbf{A}^{t}\mathbf{A} + \lambda^2 \mathbf{I})^{-1} \lambda^2 \mathbf{x} = \mathbf{x} - \mathbf{y}`,
+    where :math:`\mathbf{y}` is the damped least-squares solution of :math:`\mathbf{A}\mathbf{y} = \mathbf{A}\mathbf{x}`.
+    The damping bounds the condition number of these systems by :math:`1 / tol`.
+
+    Examples
+    --------
+    >>> N = nullspace_lsmr([[1.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    >>> N.shape
+    (3, 1)
+
+    """
+    if not isinstance(A, LinearOperator) and not issparse(A):
+        A = atleast_2d(asarray(A, dtype=float64))
+    A = aslinearoperator(A)
+    rows, cols = A.shape
+    if maxiter is None:
+        maxiter = 10 * max(rows, cols)
+    if min(rows, cols) > 1:
+        smax = svds(A, k=1, return_singular_vectors=False)[0]
+    else:
+        smax = norm(A.matmat(eye(cols)))
+    if smax == 0:
+        return eye(cols)
+    damp = smax * tol
+
+    def gram(X):
+        return A.rmatmat(A.matmat(X))
+
+    null = _row_space_complement(gram, cols, damp**2, max(1e-3 * damp**2, 1e-12 * smax**2))
+    if null is not None:
+        return null
+
+    def solve(X):
+        Y = zeros(X.shape)
+        for i in range(X.shape[1]):
+            Y[:, i] = X[:, i] - lsmr(A, A.matvec(X[:, i]), damp=damp, atol=1e-14, btol=1e-14, maxiter=maxiter)[0]
+        return Y
+
+    w, X = _subspace_iteration(gram, solve, cols, damp**2, max(1e-3 * damp**2, 1e-12 * smax**2), cols)
+    if w is None:
+        return matrix_nullspace(A.matmat(eye(cols)), tol=tol)
+    return X[:, w < damp**2]
+
+
+class SparseFactor:
+    """Sparse LU factorisation of a square system of linear equations with part of the solution known.
+
+    The matrix is reduced to the rows and columns of the unknowns and factorised once.
+    The factorisation can then be used to solve for any number of right-hand sides.
+    If the sparse factorisation fails because the reduced matrix is singular,
+    or if the matrix is too poorly conditioned,
+    the solutions are computed with a dense least-squares solver instead.
+
+    Parameters
+    ----------
+    A : sparse matrix
+        Coefficient matrix (n x n).
+        Non-square systems are solved with :class:`LeastSquaresFactor`.
+    known : list of int, optional
+        The indices of the known elements of the solution.
+        Default is ``None``, in which case all elements are unknown.
+    maxcond : float, optional
+        If the estimated condition number of the reduced matrix exceeds this value,
+        the dense least-squares solver is used instead of the sparse factorisation.
+        Default is ``None``, in which case the condition number is not checked.
+
+    Raises
+    ------
+    ValueError
+        If the coefficient matrix is not square.
+
+    Examples
+    --------
+    >>> A = csr_matrix([[2.0, -1.0, 0.0], [-1.0, 2.0, -1.0], [0.0, -1.0, 1.0]])
+    >>> factor = SparseFactor(A, known=[0])
+    >>> factor.solve(array([[0.0], [1.0], [1.0]])).tolist()
+    [[0.0], [2.0], [3.0]]
+
+    """
+
+    def __init__(self, A, known: list[int] = None, maxcond: float = None) -> None:
+        A = csr_matrix(A)
+        if A.shape[0] != A.shape[1]:
+            raise ValueError("The coefficient matrix is not square: {}.".format(A.shape))
+        self.shape = A.shape
+        self.known = list(known or [])
+        self.unknown = list(set(range(A.shape[0])) - set(self.known))
+        A = A[self.unknown, :]
+        self.A12 = A[:, self.known]
+        self.A11 = A[:, self.unknown]
+        try:
+            self.lu = splu(self.A11.tocsc())
+        except RuntimeError:
+            self.lu = None
+            self.A11 = self.A11.toarray()
+        if self.lu is not None and maxcond is not None:
+            if self.condest() > maxcond:
+                self.lu = None
+                self.A11 = self.A11.toarray()
+
+    def condest(self) -> float:
+        """Estimate the condition number of the reduced matrix in the 1-norm.
+
+        Returns
+        -------
+        float
+
+        Notes
+        -----
+        The norms of the matrix and of its inverse are estimated with a few solves on the factorisation,
+        without forming the inverse.
+
+        """
+        if self.lu is None:
+            return float(cond(self.A11, 1))
+        if self.A11.shape[0] == 0:
+            return 1.0
+        inverse = LinearOperator(
+            self.A11.shape,
+            matvec=self.lu.solve,
+            rmatvec=lambda b: self.lu.solve(b, trans="T"),
+            dtype=float64,
+        )
+        return onenormest(self.A11) * onenormest(inverse)
+
+    def solve(self, b: npt.ArrayLike, x: npt.NDArray = None, trans: bool = False) -> npt.NDArray:
+        """Solve the system for one or more right-hand sides.
+
+        Parameters
+        ----------
+        b : array-like
+            Right-hand side(s) represented as an (n,) or (n x k) array.
+        x : array, optional
+            Unknowns/knowns represented as an array with the shape of ``b``.
+            The known elements are used to update the right-hand side and the unknowns are overwritten in-place.
+            Default is ``None``, in which case the known elements are zero.
+        trans : bool, optional
+            If ``True``, solve the system with the transpose of the reduced matrix.
+            This is the adjoint of the solve with zero known elements, and ``x`` is ignored.
+            Default is ``False``.
+
+        Returns
+        -------
+        array
+            The solution, with the shape of ``b``.
+
+        """
+        b = asarray(b, dtype=float64)
+        if x is None or trans:
+            x = zeros(b.shape, dtype=float64)
+            b = b[self.unknown]
+        else:
+            b = b[self.unknown] - self.A12.dot(x[self.known])
+        if self.lu is None:
+            x[self.unknown] = lstsq(self.A11.T if trans else self.A11, b)[0]
+        else:
+            x[self.unknown] = self.lu.solve(b, trans="T" if trans else "N")
+        return x
+
+
+class LeastSquaresFactor:
+    r"""Sparse factorisation of the normal equations of a non-square system of linear equations.
+
+    Overdetermined systems are solved in a least-squares sense,
+    with :math:`\mathbf{A}^{t}\mathbf{A}\mathbf{x} = \mathbf{A}^{t}\mathbf{b}`.
+    Underdetermined systems are solved for the minimum-norm solution,
+    with :math:`\mathbf{x} = \mathbf{A}^{t}\mathbf{y}` and :math:`\mathbf{A}\mathbf{A}^{t}\mathbf{y} = \mathbf{b}`.
+    The matrix of the normal equations is factorised once with :class:`SparseFactor`.
+
+    Parameters
+    ----------
+    A : sparse matrix
+        Coefficient matrix (m x n).
+    maxcond : float, optional
+        If the estimated condition number of the matrix of the normal equations exceeds this value,
+        the dense least-squares solver is used instead of the sparse factorisation.
+        Default is ``EPS``.
+
+    Examples
+    --------
+    >>> A = csr_matrix([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+    >>> LeastSquaresFactor(A).solve(array([1.0, 1.0, 2.0])).round(6).tolist()
+    [1.0, 1.0]
+    >>> LeastSquaresFactor(A.T).solve(array([1.0, 1.0])).round(6).tolist()
+    [0.333333, 0.333333, 0.666667]
+
+    """
+
+    def __init__(self, A, maxcond: float = EPS) -> None:
+        A = csr_matrix(A)
+        self.shape = A.shape
+        self.A = A
+        self.At = A.transpose().tocsr()
+        self.overdetermined = A.shape[0] >= A.shape[1]
+        N = self.At.dot(A) if self.overdetermined else A.dot(self.At)
+        self.factor = SparseFactor(N, maxcond=maxcond)
+
+    def solve(self, b: npt.ArrayLike, trans: bool = False) -> npt.NDArray:
+        """Solve the system for one or more right-hand sides.
+
+        Parameters
+        ----------
+        b : array-like
+            Right-hand side(s) represented as an (m,) or (m x k) array,
+            or as an (n,) or (n x k) array if ``trans`` is ``True``.
+        trans : bool, optional
+            If ``True``, apply the transpose of the least-squares solution operator instead.
+            Default is ``False``.
+
+        Returns
+        -------
+        array
+            The solution, as an (n,) or (n x k) array, or as an (m,) or (m x k) array if ``trans`` is ``True``.
+
+        """
+        b = asarray(b, dtype=float64)
+        if self.overdetermined:
+            if trans:
+                return self.A.dot(self.factor.solve(b))
+            return self.factor.solve(self.At.dot(b))
+        if trans:
+            return self.factor.solve(self.A.dot(b))
+        return self.At.dot(self.factor.solve(b))
+
+
+def laplacian_factor(form, force) -> SparseFactor:
+    """Factorise the Laplacian of the force diagram with the anchor removed.
+
+    Parameters
+    ----------
+    form: :class:`FormDiagram`
+        The form diagram, which defines the ordering of the edges of the force diagram.
+    force: :class:`ForceDiagram`
+        The force diagram.
+
+    Returns
+    -------
+    :class:`SparseFactor`
+
+    Notes
+    -----
+    The Laplacian only depends on the topology of the force diagram.
+    The factorisation can therefore be reused as long as that topology does not change,
+    for example during the iterations of :func:`compas_ags.ags.form_update_from_force_newton`.
+    A :class:`CompiledPair` keeps the factorisation until the topology changes.
+
+    """
+    _vertex_index = force.vertex_index()
+    _edges = force.ordered_edges(form)
+    _edges[:] = [(_vertex_index[u], _vertex_index[v]) for u, v in _edges]
+    _L = laplacian_matrix(_edges, normalize=False, rtype="csr")
+    _known = [_vertex_index[force.anchor()]]
+    return SparseFactor(_L, _known)
+
+
+class CompiledPair:
+    """The topology of a pair of form and force diagrams, compiled into index maps and sparse matrices.
+
+    The index maps, connectivity matrices and the factorised Laplacian of the force diagram
+    only depend on the topology of the diagrams.
+    A compiled pair computes them once, when they are first needed,
+    such that repeated calls to the solvers only have to process the coordinates and force densities.
+
+    Parameters
+    ----------
+    form : :class:`compas_ags.diagrams.FormDiagram`
+        The form diagram.
+    force : :class:`compas_ags.diagrams.ForceDiagram`, optional
+        The force diagram.
+        Default is ``None``, in which case only the data of the form diagram is available.
+
+    Attributes
+    ----------
+    vertex_index : dict
+        Mapping between the vertex identifiers of the form diagram and their indices.
+    index_vertex : dict
+        Mapping between the vertex indices of the form diagram and their identifiers.
+    edge_index : dict
+        Mapping between the edge identifiers of the form diagram and their indices.
+    edges : list
+        The edges of the form diagram as pairs of vertex indices.
+    C : sparse matrix
+        The connectivity matrix of the form diagram.
+    leaves : list
+        The indices of the leaves of the form diagram.
+    i_j : dict
+        The indices of the neighbours of every vertex of the form diagram.
+    ij_e : dict
+        Mapping between pairs of vertex indices of the form diagram, in both directions, and edge indices.
+    force_vertex_index : dict
+        Mapping between the vertex identifiers of the force diagram and their indices.
+    force_edge_index : dict
+        Mapping between the edge identifiers of the force diagram, in both directions,
+        and the indices of the corresponding edges of the form diagram.
+    force_edges : list
+        The edges of the force diagram as pairs of vertex indices, in the order of the edges of the form diagram.
+    force_C : sparse matrix
+        The connectivity matrix of the force diagram, in the order of the edges of the form diagram.
+    force_edge_order : array
+        For every edge of the form diagram, the index of the corresponding edge in the list of edges of the force diagram.
+    force_edge_sign : array
+        For every edge of the form diagram, ``1`` if the corresponding edge of :attr:`force_edges`
+        has the same orientation as in the list of edges of the force diagram, and ``-1`` otherwise.
+    force_anchor : int
+        The index of the anchor of the force diagram.
+    force_i_j : dict
+        The indices of the neighbours of every vertex of the force diagram.
+    force_ij_e : dict
+        Mapping between pairs of vertex indices of the force diagram, in both directions,
+        and the indices of the corresponding edges of the form diagram.
+    laplacian : :class:`SparseFactor`
+        The factorised Laplacian of the force diagram with the anchor removed, as returned by :func:`laplacian_factor`.
+
+    Notes
+    -----
+    The pair is invalidated automatically when the topology of one of the diagrams changes,
+    as indicated by :attr:`compas_ags.diagrams.Diagram.topology_version`.
+    All solvers that accept a compiled pair call :meth:`update` before using it.
+    Attributes of vertices and edges that are not part of the topology,
+    such as the fixed vertices and the independent edges, are not compiled.
+
+    Examples
+    --------
+    >>> pair = CompiledPair(form, force)  # doctest: +SKIP
+    >>> form_update_q_from_qind(form, pair=pair)  # doctest: +SKIP
+    >>> force_update_from_form(force, form, pair=pair)  # doctest: +SKIP
+
+    """
+
+    def __init__(self, form, force=None) -> None:
+        self.form = form
+        self.force = force
+        self._version = None
+        self._cache = {}
+        self.update()
+
+    @property
+    def is_valid(self) -> bool:
+        """bool: ``True`` if the topology of the diagrams has not changed since the pair was compiled."""
+        return self._version == self._topology_versions()
+
+    def _topology_versions(self) -> tuple:
+        return self.form.topology_version, self.force.topology_version if self.force is not None else None
+
+    def update(self) -> "CompiledPair":
+        """Discard the compiled data if the topology of one of the diagrams has changed.
+
+        Returns
+        -------
+        :class:`CompiledPair`
+            The pair itself.
+
+        """
+        if not self.is_valid:
+            self._cache = {}
+            self._version = self._topology_versions()
+        return self
+
+    def _compiled(self, name: str, compile: Callable):
+        if name not in self._cache:
+            self._cache[name] = compile()
+        return self._cache[name]
+
+    # --------------------------------------------------------------------------
+    # form diagram
+    # --------------------------------------------------------------------------
+
+    @property
+    def vertex_index(self) -> dict:
+        return self._compiled("vertex_index", self.form.vertex_index)
+
+    @property
+    def index_vertex(self) -> dict:
+        return self._compiled("index_vertex", self.form.index_vertex)
+
+    @property
+    def edge_index(self) -> dict:
+        return self._compiled("edge_index", self.form.edge_index)
+
+    @property
+    def edges(self) -> list:
+        vertex_index = self.vertex_index
+        return self._compiled("edges", lambda: [(vertex_index[u], vertex_index[v]) for u, v in self.edge_index])
+
+    @property
+    def C(self) -> csr_matrix:
+        return self._compiled("C", lambda: connectivity_matrix(self.edges, "csr"))
+
+    @property
+    def leaves(self) -> list:
+        vertex_index = self.vertex_index
+        return self._compiled("leaves", lambda: [vertex_index[vertex] for vertex in self.form.leaves()])
+
+    @property
+    def i_j(self) -> dict:
+        vertex_index = self.vertex_index
+        return self._compiled("i_j", lambda: {vertex_index[vertex]: [vertex_index[nbr] for nbr in self.form.vertex_neighbors(vertex)] for vertex in vertex_index})
+
+    @property
+    def ij_e(self) -> dict:
+        def compile():
+            ij_e = {(i, j): index for index, (i, j) in enumerate(self.edges)}
+            ij_e.update({(j, i): index for index, (i, j) in enumerate(self.edges)})
+            return ij_e
+
+        return self._compiled("ij_e", compile)
+
+    # --------------------------------------------------------------------------
+    # force diagram
+    # --------------------------------------------------------------------------
+
+    @property
+    def force_vertex_index(self) -> dict:
+        return self._compiled("force_vertex_index", self.force.vertex_index)
+
+    @property
+    def force_edge_index(self) -> dict:
+        def compile():
+            edge_index = self.force.edge_index(self.form)
+            edge_index.update({(v, u): index for (u, v), index in edge_index.items()})
+            return edge_index
+
+        return self._compiled("force_edge_index", compile)
+
+    @property
+    def force_edges(self) -> list:
+        vertex_index = self.force_vertex_index
+        return self._compiled("force_edges", lambda: [(vertex_index[u], vertex_index[v]) for u, v in self.force.ordered_edges(self.form)])
+
+    @property
+    def force_C(self) -> csr_matrix:
+        return self._compiled("force_C", lambda: connectivity_matrix(self.force_edges, "csr"))
+
+    @property
+    def force_edge_order(self) -> npt.NDArray:
+        return self._compiled("force_edge_order", lambda: array(self.force.ordered_edge_indices(self.form)[0], dtype=int))
+
+    @property
+    def force_edge_sign(self) -> npt.NDArray:
+        return self._compiled("force_edge_sign", lambda: array(self.force.ordered_edge_indices(self.form)[1], dtype=float64))
+
+    @property
+    def force_anchor(self) -> int:
+        return self._compiled("force_anchor", lambda: self.force_vertex_index[self.force.anchor()])
+
+    @property
+    def force_i_j(self) -> dict:
+        vertex_index = self.force_vertex_index
+        return self._compiled("force_i_j", lambda: {vertex_index[vertex]: [vertex_index[nbr] for nbr in self.force.vertex_neighbors(vertex)] for vertex in vertex_index})
+
+    @property
+    def force_ij_e(self) -> dict:
+        def compile():
+            ij_e = {(i, j): index for index, (i, j) in enumerate(self.force_edges)}
+            ij_e.update({(j, i): index for index, (i, j) in enumerate(self.force_edges)})
+            return ij_e
+
+        return self._compiled("force_ij_e", compile)
+
+    @property
+    def laplacian(self) -> SparseFactor:
+        return self._compiled("laplacian", lambda: SparseFactor(laplacian_matrix(self.force_edges, normalize=False, rtype="csr"), [self.force_anchor]))
+
+
+def compile_pair(form, force=None, pair: CompiledPair = None) -> CompiledPair:
+    """Get an up-to-date compiled pair for a form and force diagram.
+
+    Parameters
+    ----------
+    form : :class:`compas_ags.diagrams.FormDiagram`
+        The form diagram.
+    force : :class:`compas_ags.diagrams.ForceDiagram`, optional
+        The force diagram.
+        Default is ``None``, in which case any pair compiled for the form diagram can be used.
+    pair : :class:`CompiledPair`, optional
+        A previously compiled pair.
+        Default is ``None``, in which case a new pair is compiled.
+
+    Returns
+    -------
+    :class:`CompiledPair`
+        The provided pair, updated if the topology of the diagrams has changed,
+        or a new pair if none was provided or if it was compiled for other diagrams.
+
+    """
+    if pair is not None and pair.form is form and (force is None or pair.force is force):
+        return pair.update()
+    return CompiledPair(form, force)
+
+
+class ForceDensitySolver:
+    r"""Solver for the force densities of the dependent edges of a form diagram.
+
+    The coefficient matrix only depends on the geometry of the form diagram and on the selection of independent edges.
+    It is factorised once, such that the dependent force densities can be computed for any number of
+    sets of independent force densities.
+
+    Parameters
+    ----------
+    E : sparse matrix
+        The equilibrium matrix.
+    dep : list
+        The indices of the dependent edges.
+    ind : list
+        The indices of the independent edges.
+
+    Notes
+    -----
+    The dependent force densities are the (least-squares) solution of
+
+    .. math::
+
+        \mathbf{E}_{d}\mathbf{q}_{d} = -\mathbf{E}_{i}\mathbf{q}_{i}
+
+    If the system is overdetermined, the normal equations are factorised instead.
+    Poorly conditioned systems are solved with a dense least-squares solver.
+
+    """
+
+    def __init__(self, E: spmatrix, dep: list[int], ind: list[int]) -> None:
+        E = csr_matrix(E)
+        self.dep = list(dep)
+        self.ind = list(ind)
+        self.Ei = E[:, self.ind]
+        self.Edt = None
+        Ed = E[:, self.dep]
+        if E.shape[0] > len(self.dep):
+            self.Edt = Ed.transpose().tocsr()
+            A = self.Edt.dot(Ed)
+        else:
+            A = Ed
+        self.A = None
+        self.factor = None
+        if A.shape[0] == A.shape[1]:
+            self.factor = SparseFactor(A, maxcond=EPS)
+        else:
+            self.A = A.toarray()
+
+    @classmethod
+    def from_form(cls, form, pair: "CompiledPair" = None) -> "ForceDensitySolver":
+        """Construct a solver for the current geometry and independent edges of a form diagram.
+
+        Parameters
+        ----------
+        form: :class:`FormDiagram`
+            The form diagram.
+        pair: :class:`CompiledPair`, optional
+            The compiled topology of the form diagram.
+            Default is ``None``, in which case the topology is compiled here.
+
+        Returns
+        -------
+        :class:`ForceDensitySolver`
+
+        """
+        pair = compile_pair(form, pair=pair)
+
+        vcount = len(pair.vertex_index)
+        ecount = len(pair.edges)
+        free = list(set(range(vcount)) - set(pair.leaves))
+        ind = [pair.edge_index[edge] for edge in form.ind()]
+        dep = list(set(range(ecount)) - set(ind))
+        xy = form.vertices_array("xy")
+        E = equilibrium_matrix(pair.C, xy, free, "csr")
+        return cls(E, dep, ind)
+
+    def solve(self, qi: npt.ArrayLike) -> npt.NDArray:
+        """Compute the force densities of the dependent edges.
+
+        Parameters
+        ----------
+        qi : array-like
+            The force densities of the independent edges, as an (ni,) or (ni x k) array.
+
+        Returns
+        -------
+        array
+            The force densities of the dependent edges, as an (nd,) or (nd x k) array.
+
+        """
+        b = self.Ei.dot(asarray(qi, dtype=float64))
+        if self.Edt is not None:
+            b = self.Edt.dot(b)
+        if self.factor is None:
+            return lstsq(-self.A, b)[0]
+        return -self.factor.solve(b)
+
+
+def update_q_from_qind(
+    E: spmatrix,
+    q: npt.NDArray,
+    dep: list[int],
+    ind: list[int],
+    solver: ForceDensitySolver = None,
+) -> None:
     """Update the full set of force densities using the values of the independent edges.
 
     Parameters
@@ -81,6 +1058,9 @@ def update_q_from_qind(E: spmatrix, q: npt.NDArray, dep: list[int], ind: list[in
         The indices of the dependent edges.
     ind : list
         The indices of the independent edges.
+    solver : :class:`ForceDensitySolver`, optional
+        A solver constructed previously for the same equilibrium matrix and independent edges.
+        Default is ``None``, in which case a new solver is constructed.
 
     Returns
     -------
@@ -88,23 +1068,96 @@ def update_q_from_qind(E: spmatrix, q: npt.NDArray, dep: list[int], ind: list[in
         The force densities are modified in-place.
 
     """
-    m = E.shape[0] - len(dep)
-    qi = q[ind]
-    Ei = E[:, ind]
-    Ed = E[:, dep]
-    if m > 0:
-        Edt = Ed.transpose()
-        A = Edt.dot(Ed).toarray()
-        b = Edt.dot(Ei).dot(qi)
-    else:
-        A = Ed.toarray()
-        b = Ei.dot(qi)
-    if cond(A) > EPS:
-        res = lstsq(-A, b)
-        qd = res[0]
-    else:
-        qd = solve(-A, b)
-    q[dep] = qd
+    if solver is None:
+        solver = ForceDensitySolver(E, dep, ind)
+    q[dep] = solver.solve(q[ind])
+
+
+def solve_blocks(A: npt.NDArray, b: npt.NDArray) -> npt.NDArray:
+    """Solve a block-diagonal system of linear equations.
+
+    Parameters
+    ----------
+    A : array
+        The diagonal blocks of the coefficient matrix stacked in an (n x k x k) array.
+    b : array
+        The corresponding parts of the right-hand side stacked in an (n x k) array.
+
+    Returns
+    -------
+    array
+        The solution as an (n x k) array.
+
+    Notes
+    -----
+    All regular blocks are solved in one vectorised call.
+    Singular blocks are solved in a least-squares sense using the pseudo-inverse,
+    which is the same solution a least-squares solver would produce for the assembled system.
+
+    Examples
+    --------
+    >>> A = array([[[2.0, 0.0], [0.0, 4.0]], [[1.0, 1.0], [1.0, 1.0]]])
+    >>> b = array([[2.0, 2.0], [2.0, 2.0]])
+    >>> solve_blocks(A, b).round(6).tolist()
+    [[1.0, 0.5], [1.0, 1.0]]
+
+    """
+    x = zeros(b.shape, dtype=float64)
+    singular = ~(cond(A) < EPS)
+    regular = ~singular
+    if regular.any():
+        x[regular] = batch_solve(A[regular], b[regular, :, None])[:, :, 0]
+    if singular.any():
+        x[singular] = matmul(pinv(A[singular]), b[singular, :, None])[:, :, 0]
+    return x
+
+
+def vertex_edge_adjacency(
+    vertices: list[int],
+    i_nbrs: list[list[int]],
+    ij_e: dict[tuple[int, int], int],
+) -> tuple[npt.NDArray, npt.NDArray, npt.NDArray]:
+    """Construct the adjacency of a selection of vertices and their connected edges in CSR format.
+
+    Parameters
+    ----------
+    vertices : list of int
+        The indices of the vertices.
+    i_nbrs : list of list of int
+        Vertex neighbours per vertex.
+    ij_e : dict
+        Edge index for every vertex pair.
+
+    Returns
+    -------
+    indptr : array
+        The neighbours and edges of ``vertices[i]`` are stored in ``nbrs[indptr[i]:indptr[i + 1]]`` and ``edges[indptr[i]:indptr[i + 1]]``.
+    nbrs : array
+        The indices of the neighbouring vertices.
+    edges : array
+        The indices of the connecting edges.
+
+    Raises
+    ------
+    KeyError
+        If a vertex and one of its neighbours are not connected by an edge in ``ij_e``.
+
+    Examples
+    --------
+    >>> indptr, nbrs, edges = vertex_edge_adjacency([1], {1: [0, 2]}, {(1, 0): 0, (1, 2): 1})
+    >>> indptr.tolist(), nbrs.tolist(), edges.tolist()
+    ([0, 2], [0, 2], [0, 1])
+
+    """
+    indptr = [0]
+    nbrs = []
+    edges = []
+    for i in vertices:
+        for j in i_nbrs[i]:
+            nbrs.append(j)
+            edges.append(ij_e[i, j])
+        indptr.append(len(nbrs))
+    return array(indptr, dtype=int), array(nbrs, dtype=int), array(edges, dtype=int)
 
 
 def update_primal_from_dual(
@@ -114,12 +1167,13 @@ def update_primal_from_dual(
     i_nbrs: list[list[int]],
     ij_e: dict[tuple[int, int], int],
     _C: spmatrix,
-    line_constraints: list = None,
+    line_constraints: list[Line] = None,
     target_lengths: list[float] = [],
     target_vectors: list[list[float]] = [],
     leaves: list[int] = [],
     kmax: int = 100,
-) -> None:
+    tol: float = None,
+) -> tuple[int, float]:
     r"""Update the coordinates of the primal diagram using the coordinates of the corresponding dual diagram.
     This function apply to both sides, i.e. it can be used to update the form diagram from the geometry of the force
     diagram or to update the force diagram from the geometry of the force diagram.
@@ -153,14 +1207,21 @@ def update_primal_from_dual(
     kmax : int, optional
         Maximum number of iterations.
         Default is ``100``.
+    tol : float, optional
+        Stop the iterations as soon as no free vertex moves more than this distance.
+        Default is ``None``, in which case all ``kmax`` iterations are performed.
 
     Returns
     -------
-    None
-        The vertex coordinates are modified in-place.
+    int
+        The number of iterations performed.
+    float
+        The largest displacement of a free vertex in the last iteration.
 
     Notes
     -----
+    The vertex coordinates are modified in-place.
+
     This function should be used to update the form diagram after modifying the
     geometry of the force diagram. Or to update the force diagram geometrically to
     become reciprocal to the form diagram. The objective is to compute new locations
@@ -196,79 +1257,160 @@ def update_primal_from_dual(
 
         \mathbf{p} = (\mathbf{R}^{T}\mathbf{R})^{-1}\mathbf{R}^{T}\mathbf{q}
 
+    The lines of all free vertices are collected once in the CSR-style arrays of :func:`vertex_edge_adjacency`,
+    such that the matrices :math:`\mathbf{R}` and the vectors :math:`\mathbf{q}` of all vertices are assembled with scatter-add operations.
+    The systems of all free vertices are independent and are solved together with :func:`solve_blocks`.
+
     """
     _uv = _C.dot(_xy)
     _t = normalizerow(_uv)
-    I = eye(2, dtype=float64)  # noqa: E741
     xy0 = array(xy, copy=True)
-    A = zeros((2 * len(free), 2 * len(free)), dtype=float64)
-    b = zeros((2 * len(free), 1), dtype=float64)
+    nfree = len(free)
+
+    # in order for the two diagrams to have parallel corresponding edges,
+    # each free vertex location of the primal diagram is computed as the intersection
+    # of the connected lines. each of these lines is based at the corresponding
+    # connected neighbouring vertex and taken parallel to the corresponding
+    # edge in the dual diagram.
+    # the intersection is the point that minimises the distance to all connected
+    # lines.
+    indptr, nbrs, edges = vertex_edge_adjacency(free, i_nbrs, ij_e)
+    rows = repeat(arange(nfree), diff(indptr))
+
+    is_leaf = zeros(len(xy0), dtype=bool)
+    is_leaf[leaves] = True
+    mask = ~is_leaf[nbrs]
+    mask &= normrow(_uv)[edges, 0] >= 0.001
+
+    if target_lengths:
+        lengths = array([nan if length is None else length for length in target_lengths], dtype=float64)
+        mask &= lengths[edges] != 0.0
+
+    # the direction of the line (the line parallel to the corresponding line in the force diagram)
+    n = _t[edges]
+    if target_vectors:
+        has_vector = array([vector is not None and len(vector) > 0 for vector in target_vectors], dtype=bool)
+        vectors = array([vector[:2] if has else [0.0, 0.0] for vector, has in zip(target_vectors, has_vector)], dtype=float64)
+        n = where(has_vector[edges, None], vectors[edges], n)
+
+    rows = rows[mask]
+    nbrs = nbrs[mask]
+    n = n[mask]
+
+    # projections into the orthogonal space of the direction vectors
+    # do not depend on the coordinates of the primal diagram
+    r = eye(2, dtype=float64) - n[:, :, None] * n[:, None, :]
+    A = zeros((nfree, 2, 2), dtype=float64)
+    add.at(A, rows, r)
+
+    b0 = zeros((nfree, 2), dtype=float64)
+    if line_constraints:
+        has_line = array([bool(line) for line in line_constraints], dtype=bool)
+        lines = [line for line in line_constraints if line]
+        if lines:
+            n_ = array([line.direction[:2] for line in lines], dtype=float64)
+            pt = array([line.start[:2] for line in lines], dtype=float64)
+            r_ = eye(2, dtype=float64) - n_[:, :, None] * n_[:, None, :]
+            A[has_line] += r_
+            b0[has_line] += einsum("mij,mj->mi", r_, pt)
 
     # update the free vertices
-    for k in range(kmax):
-        row = 0
-
-        # in order for the two diagrams to have parallel corresponding edges,
-        # each free vertex location of the primal diagram is computed as the intersection
-        # of the connected lines. each of these lines is based at the corresponding
-        # connected neighbouring vertex and taken parallel to the corresponding
-        # edge in the dual diagram.
-        # the intersection is the point that minimises the distance to all connected
-        # lines.
-        for count in range(len(free)):
-            i = free[count]
-            R = zeros((2, 2), dtype=float64)
-            q = zeros((2, 1), dtype=float64)
-
-            # add line constraints based on connected edges
-            for j in i_nbrs[i]:
-                if j in leaves:
-                    continue
-
-                n = _t[ij_e[(i, j)], None]  # the direction of the line (the line parallel to the corresponding line in the force diagram)
-                _l = _uv[ij_e[(i, j)], None]
-
-                if normrow(_l)[0, 0] < 0.001:
-                    continue
-
-                if target_lengths:
-                    if target_lengths[ij_e[(i, j)]] == 0.0:
-                        continue
-
-                if target_vectors:
-                    if target_vectors[ij_e[(i, j)]]:
-                        n = array(target_vectors[ij_e[(i, j)]]).reshape(1, -1)
-
-                r = I - n.T.dot(n)  # projection into the orthogonal space of the direction vector
-                a = xy[j, None]  # a point on the line (the neighbour of the vertex)
-                R += r
-                q += r.dot(a.T)
-
-            if line_constraints:
-                line: Line = line_constraints[count]
-                if line:
-                    n_ = array(line.direction[:2]).reshape(1, 2)
-                    r = I - n_.T.dot(n_)
-                    pt = array(line.start[:2]).reshape(1, 2)
-                    R += r
-                    q += r.dot(pt.T)
-
-            A[row : row + 2, row : row + 2] = R
-            b[row : row + 2] = q
-            row += 2
-
-            # p = solve(R.T.dot(R), R.T.dot(q))
-            # xy[i] = p.reshape((-1, 2), order='C')
-
-        res = lstsq(A, b)
-        xy_lstsq = res[0].reshape((-1, 2), order="C")
-        xy[free] = xy_lstsq
+    k = 0
+    residual = 0.0
+    while k < kmax:
+        k += 1
+
+        # the neighbours of the vertices are points on the lines
+        b = b0.copy()
+        add.at(b, rows, einsum("mij,mj->mi", r, xy[nbrs]))
+
+        # the system is block-diagonal, with one 2x2 block per free vertex
+        xy_free = solve_blocks(A, b)
+        residual = normrow(xy_free - xy[free]).max() if nfree else 0.0
+        xy[free] = xy_free
+
+        if tol is not None and residual < tol:
+            break
 
     # reconnect leaves
     for i in leaves:
         j = i_nbrs[i][0]
         xy[i] = xy[j] + xy0[i] - xy0[j]
 
+    return k, float(residual)
+
+
+def update_edge_results(
+    form,
+    force,
+    uv: npt.ArrayLike,
+    _uv: npt.ArrayLike,
+    compression_angle: float = 0.5 * pi,
+    deg: bool = False,
+    pair=None,
+) -> tuple[npt.NDArray, npt.NDArray, npt.NDArray, npt.NDArray]:
+    """Compute the angle deviations, lengths, forces and force densities of the edges of a pair of reciprocal diagrams,
+    and store them in the diagrams.
+
+    Parameters
+    ----------
+    form : :class:`compas_ags.diagrams.FormDiagram`
+        The form diagram.
+    force : :class:`compas_ags.diagrams.ForceDiagram`
+        The force diagram.
+    uv : array-like
+        The edge vectors of the form diagram.
+    _uv : array-like
+        The edge vectors of the force diagram, in the order of the edges of the form diagram.
+    compression_angle : float, optional
+        Edges of which the angle between the form and force vectors is at least this value, in radians,
+        are in compression and get a negative force and force density.
+        Default is ``0.5 * pi``.
+    deg : bool, optional
+        If ``True``, the angles are stored in degrees instead of radians.
+        Default is ``False``.
+    pair: :class:`CompiledPair`, optional
+        The compiled topology of the diagrams.
+        Default is ``None``, in which case the topology is compiled here.
+
+    Returns
+    -------
+    tuple[array, array, array, array]
+        The angles, lengths, signed forces and signed force densities of the edges of the form diagram.
+
+    Notes
+    -----
+    The angles are computed as ``arctan2(|u x v|, u . v)``, which is accurate for nearly (anti-)parallel vectors.
+    As with :func:`compas.geometry.angle_vectors_xy`, the angle is zero if one of the vectors has zero length.
+    The attributes ``l``, ``a``, ``f`` and ``q`` of the form edges, and ``a`` and ``l`` of the force edges,
+    are written in bulk with :meth:`compas_ags.diagrams.Diagram.set_edges_array`.
+
+    """
+    pair = compile_pair(form, force, pair)
+    uv = asarray(uv, dtype=float64)
+    _uv = asarray(_uv, dtype=float64)
+
+    lengths = sqrt(einsum("ij,ij->i", uv, uv))
+    forces = sqrt(einsum("ij,ij->i", _uv, _uv))
+    cross = uv[:, 0] * _uv[:, 1] - uv[:, 1] * _uv[:, 0]
+    dot = einsum("ij,ij->i", uv, _uv)
+    angles = arctan2(absolute(cross), dot)
+    angles[absolute(lengths * forces) < TOL.absolute] = 0.0
+
+    signs = where(angles < compression_angle, 1.0, -1.0)
+    q = signs * forces / lengths
+    f = signs * forces
+    if deg:
+        angles = degrees(angles)
+
+    form.set_edges_array(["l", "a", "f", "q"], stack((lengths, angles, f, q), axis=1))
+
+    _values = zeros((len(pair.force_edge_order), 2), dtype=float64)
+    _values[pair.force_edge_order] = stack((angles, forces), axis=1)
+    force.set_edges_array(["a", "l"], _values)
+
+    return angles, lengths, f, q
+
 
 def parallelise_edges(
     xy,
@@ -395,7 +1537,277 @@ def parallelise_edges(
             callback(k, xy, edges)
 
 
-def get_jacobian_and_residual(form, force, _X_goal, constraints=None):
+def parallelise_edges_numpy(
+    xy: npt.NDArray,
+    edges: npt.ArrayLike,
+    target_vectors: list,
+    target_lengths: list,
+    fixed: list[int] = None,
+    line_constraints: list[Line] = None,
+    kmax: int = 100,
+    callback: Callable = None,
+) -> None:
+    """Parallelise the edges of a mesh to given target vectors, using vectorised array operations.
+
+    Parameters
+    ----------
+    xy : array
+        The XY coordinates of the vertices as an (n x 2) array.
+    edges : array-like
+        The edges as pairs of indices in ``xy``, in an (m x 2) array.
+    target_vectors : list
+        A list with an entry for each edge representing the target vector or ``None``.
+    target_lengths : list
+        A list with an entry for each edge representing the target length or ``None``.
+    fixed : list, optional
+        The fixed nodes of the mesh.
+        Default is ``None``.
+    line_constraints : list, optional
+        Line constraints applied to the nodes.
+        Default is an ``None`` in which case no line constraints are considered.
+    kmax : int, optional
+        Maximum number of iterations.
+        Default is ``100``.
+    callback : callable, optional
+        A user-defined callback function to be executed after every iteration.
+        Default is ``None``.
+
+    Returns
+    -------
+    None
+        The vertex coordinates are modified in-place.
+
+    Notes
+    -----
+    This is an array-based version of :func:`parallelise_edges`, with the same result.
+    In every iteration, each free vertex is moved to the average of the positions proposed by its constrained edges.
+    An edge proposes the position of one of its vertices with respect to the other vertex,
+    using the target vector or the current direction of the edge,
+    and the target length or the current length of the edge.
+    Edges with zero length or zero target length are collapsed to their midpoint.
+
+    """
+    if callback:
+        if not callable(callback):
+            raise Exception("The provided callback is not callable.")
+
+    n = len(xy)
+    edges = asarray(edges, dtype=int).reshape((-1, 2))
+    u = edges[:, 0]
+    v = edges[:, 1]
+
+    has_length = array([length is not None for length in target_lengths], dtype=bool)
+    lengths_t = array([length if length is not None else 0.0 for length in target_lengths], dtype=float64)
+    has_vector = array([vector is not None and len(vector) > 0 for vector in target_vectors], dtype=bool)
+    vectors = array([vector[:2] if has else [0.0, 0.0] for vector, has in zip(target_vectors, has_vector)], dtype=float64).reshape((-1, 2))
+
+    # edges without target length and target vector are discarded
+    active = has_length | has_vector
+    u_active = u[active]
+    v_active = v[active]
+
+    is_free = ones(n, dtype=bool)
+    if fixed:
+        is_free[fixed] = False
+
+    count = zeros(n, dtype=float64)
+    add.at(count, u_active, 1.0)
+    add.at(count, v_active, 1.0)
+    update = is_free & (count > 0)
+
+    # projection of the updated vertices on their line constraints
+    has_line = zeros(n, dtype=bool)
+    if line_constraints:
+        has_line[:] = [bool(line) for line in line_constraints]
+        has_line &= update
+    projected = has_line.nonzero()[0]
+    if len(projected):
+        a = array([line_constraints[i].start[:2] for i in projected], dtype=float64)
+        ab = array([line_constraints[i].end[:2] for i in projected], dtype=float64) - a
+
+    for k in range(kmax):
+        xy0 = xy.copy()
+        uv = xy0[v] - xy0[u]
+        lengths = normrow(uv)[:, 0]
+
+        # edges with constraint on length only keep their current direction
+        nonzero = lengths > 0.0
+        t = zeros((len(edges), 2), dtype=float64)
+        t[nonzero] = uv[nonzero] / lengths[nonzero, None]
+        t[has_vector] = vectors[has_vector]
+
+        # edges with constraint on orientation only keep their current length
+        lij = where(has_length, lengths_t, lengths)
+        d = (lij[:, None] * t)[active]
+
+        x = zeros((n, 2), dtype=float64)
+        add.at(x, v_active, xy0[u_active] + d)
+        add.at(x, u_active, xy0[v_active] - d)
+        xy[update] = x[update] / count[update, None]
+
+        if len(projected):
+            ap = xy[projected] - a
+            xy[projected] = a + ab * (einsum("ij,ij->i", ap, ab) / einsum("ij,ij->i", ab, ab))[:, None]
+
+        # edges with zero length or zero target length are collapsed sequentially
+        collapse = ((lengths == 0.0) | (has_length & (lengths_t == 0.0))).nonzero()[0]
+        for e in collapse:
+            i, j = edges[e]
+            xy[i] = xy[j] = 0.5 * (xy[i] + xy[j])
+
+        if callback:
+            callback(k, xy, edges)
+
+
+class LeastSquaresQR:
+    """Minimum-norm least-squares solutions of a dense system of linear equations from a column-pivoted QR decomposition.
+
+    The decomposition is computed once.
+    It reveals the numerical rank of the matrix,
+    which is used to check if a right-hand side is in the column space of the matrix,
+    and it is reused to compute the solutions.
+
+    Parameters
+    ----------
+    A : array-like
+        Coefficient matrix (m x n).
+
+    Attributes
+    ----------
+    rank : int
+        The numerical rank of the matrix, with the same tolerance as :func:`numpy.linalg.matrix_rank`.
+    tol : float
+        The tolerance of the rank decision.
+
+    Notes
+    -----
+    The minimum-norm solution is computed with a complete orthogonal decomposition,
+    such that the result is the same as with :func:`numpy.linalg.lstsq`, also for rank-deficient matrices.
+
+    The singular values in the tolerance of :func:`numpy.linalg.matrix_rank` are estimated
+    by the largest diagonal element of the triangular factor of the decomposition.
+
+    Examples
+    --------
+    >>> A = [[1.0, 1.0], [1.0, 1.0], [0.0, 0.0]]
+    >>> solver = LeastSquaresQR(A)
+    >>> solver.rank
+    1
+    >>> solver.is_consistent([2.0, 2.0, 0.0]), solver.is_consistent([2.0, 2.0, 1.0])
+    (True, False)
+    >>> solver.solve([2.0, 2.0, 0.0]).round(6).tolist()
+    [1.0, 1.0]
+
+    """
+
+    def __init__(self, A: npt.ArrayLike) -> None:
+        A = atleast_2d(asarray(A, dtype=float64))
+        m, n = A.shape
+        self.shape = A.shape
+        Q, R, P = qr_pivoting(A, mode="economic", pivoting=True)
+        d = abs(R.diagonal())
+        self.scale = d[0] if d.size else 0.0
+        self.tol = self.scale * max(m, n) * sys.float_info.epsilon
+        self.rank = int((d > self.tol).sum())
+        self.Q1 = Q[:, : self.rank]
+        self.P = P
+        self.Z, self.T = qr(R[: self.rank].T)
+
+    def is_consistent(self, b: npt.ArrayLike) -> bool:
+        r"""Verify that the rank of the matrix augmented with a right-hand side is the same as the rank of the matrix.
+
+        Parameters
+        ----------
+        b : array-like
+            The right-hand side, as an (m,) or (m x 1) array.
+
+        Returns
+        -------
+        bool
+            ``True`` if the right-hand side is in the column space of the matrix.
+
+        Notes
+        -----
+        With :math:`\mathbf{x}` the least-squares solution, the unit vector
+        :math:`(\mathbf{x}, -1) / \sqrt{1 + \|\mathbf{x}\|^2}` estimates the right singular vector
+        of the singular value that the right-hand side adds to the augmented matrix :math:`[\mathbf{A}\ \mathbf{b}]`.
+        That singular value is therefore estimated as :math:`\|\mathbf{A}\mathbf{x} - \mathbf{b}\| / \sqrt{1 + \|\mathbf{x}\|^2}`,
+        and it is compared with the tolerance of the rank decision for the augmented matrix,
+        as in :func:`numpy.linalg.matrix_rank`.
+
+        """
+        b = asarray(b, dtype=float64).ravel()
+        residual = b - self.Q1.dot(self.Q1.T.dot(b))
+        x = self.solve(b)
+        m, n = self.shape
+        tol = max(m, n + 1) * sys.float_info.epsilon * max(self.scale, norm(b))
+        return bool(norm(residual) <= tol * sqrt(1 + x.dot(x)))
+
+    def solve(self, b: npt.ArrayLike) -> npt.NDArray:
+        """Compute the minimum-norm least-squares solution.
+
+        Parameters
+        ----------
+        b : array-like
+            Right-hand side(s) represented as an (m,) or (m x k) array.
+
+        Returns
+        -------
+        array
+            The solution, as an (n,) or (n x k) array.
+
+        """
+        b = asarray(b, dtype=float64)
+        x = zeros((self.shape[1],) + b.shape[1:], dtype=float64)
+        y = solve_triangular(self.T, self.Q1.T.dot(b), trans="T")
+        x[self.P] = self.Z.dot(y)
+        return x
+
+
+class NewtonResult:
+    """Convergence information of :func:`compas_ags.ags.form_update_from_force_newton`.
+
+    Attributes
+    ----------
+    converged : bool
+        ``True`` if the norm of the residual is smaller than the tolerance.
+    cancelled : bool
+        ``True`` if the iterations were stopped by the callback.
+    iterations : int
+        The number of iterations.
+    residuals : list of float
+        The norm of the residual at the start of every iteration.
+    steps : list of float
+        The norm of the change of the form diagram coordinates in every iteration.
+    step_lengths : list of float
+        The fraction of the Newton step that is taken in every iteration.
+        This is the step length of the line search, and ``1.0`` for the other damping modes.
+    damping : list of float
+        The damping factor of the Levenberg-Marquardt method of every iteration,
+        and ``0.0`` for the other damping modes.
+    times : list of float
+        The wall time of every iteration, in seconds.
+    jacobian_evaluations : int
+        The number of times the jacobian was computed.
+    broyden_updates : int
+        The number of rank-1 updates of the jacobian.
+
+    """
+
+    def __init__(self) -> None:
+        self.converged = False
+        self.cancelled = False
+        self.iterations = 0
+        self.residuals = []
+        self.steps = []
+        self.step_lengths = []
+        self.damping = []
+        self.times = []
+        self.jacobian_evaluations = 0
+        self.broyden_updates = 0
+
+
+def get_jacobian_and_residual(form, force, _X_goal, constraints=None, laplacian=None, check=True, pair=None):
     r"""Compute the Jacobian matrix and residual.
 
     Computes the residual and the Jacobian matrix :math:`\partial \mathbf{X}^* / \partial \mathbf{X}`
@@ -417,6 +1829,16 @@ def get_jacobian_and_residual(form, force, _X_goal, constraints=None):
     constraints: :class:`ConstraintsCollection`, optional
         A collection of form diagram constraints.
         The default is ``None``, in which case no constraints are considered.
+    laplacian: :class:`SparseFactor`, optional
+        The factorised Laplacian of the force diagram, as returned by :func:`laplacian_factor`.
+        The default is ``None``, in which case the Laplacian of the compiled pair is used.
+    check: bool, optional
+        If ``True``, verify that the rank of the Jacobian augmented with the residual
+        is the same as the rank of the Jacobian.
+        The default is ``True``.
+    pair: :class:`CompiledPair`, optional
+        The compiled topology of the diagrams.
+        The default is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
@@ -424,41 +1846,237 @@ def get_jacobian_and_residual(form, force, _X_goal, constraints=None):
         Jacobian matrix and residual vector as arrays.
         The rows corresponding to the anchor of the force diagram are removed
 
+    Raises
+    ------
+    SolutionError
+        If the rank of the augmented Jacobian is larger than the rank of the Jacobian.
+
+    Notes
+    -----
+    The rows of the Jacobian corresponding to the anchor of the force diagram are zero.
+    The residual of these rows is therefore always checked, also if ``check`` is ``False``.
+    The rank of the remaining rows is checked with :class:`LeastSquaresQR`.
+
     References
     ----------
     .. [1] Alic, V. and Åkesson, D., 2017. Bi-directional algebraic graphic statics. Computer-Aided Design, 93, pp.26-37.
 
     """
 
-    jacobian = compute_jacobian(form, force)
+    pair = compile_pair(form, force, pair)
+    jacobian = compute_jacobian(form, force, laplacian=laplacian, pair=pair)
 
-    _vcount = force.number_of_vertices()
-    _k_i = force.key_index()
-    _known = _k_i[force.anchor()]
+    _vcount = len(pair.force_vertex_index)
+    _known = pair.force_anchor
     _bc = [_known, _vcount + _known]
-    _X_iteration = array(force.vertices_attribute("x") + force.vertices_attribute("y")).reshape(-1, 1)
+    _X_iteration = force.vertices_array("xy").T.reshape(-1, 1)
     r = _X_iteration - _X_goal
 
     if constraints:
+        # the dense rows of the constraints, because the Jacobian and the rank check are dense
         (cj, cr) = constraints.compute_constraints()
         jacobian = vstack((jacobian, cj))
         r = vstack((r, cr))
 
-    # Check rank of augmented matrix
-    rank_jac = matrix_rank(jacobian)
-    rank_aug = matrix_rank(hstack([jacobian, r]))
-
-    if rank_jac < rank_aug:
-        raise SolutionError("ERROR: Rank Augmented > Rank Jacobian")
-
     # Remove rows due to anchored vertex in the force diagram
     red_r = delete(r, _bc, axis=0)
     red_jacobian = delete(jacobian, _bc, axis=0)
 
+    # Check rank of augmented matrix
+    scale = max(norm(jacobian, axis=0).max(initial=0), norm(r))
+    if norm(r[_bc]) > max(jacobian.shape[0], jacobian.shape[1] + 1) * sys.float_info.epsilon * scale:
+        raise SolutionError("ERROR: Rank Augmented > Rank Jacobian")
+    if check and not LeastSquaresQR(red_jacobian).is_consistent(red_r):
+        raise SolutionError("ERROR: Rank Augmented > Rank Jacobian")
+
     return red_jacobian, red_r
 
 
-def compute_jacobian(form, force):
+def get_residual(form, force, _X_goal, constraints=None, pair=None):
+    r"""Compute the residual without the Jacobian matrix.
+
+    Parameters
+    ----------
+    form: :class:`FormDiagram`
+        The form diagram to update.
+    force: :class:`ForceDiagram`
+        The force diagram on which the update is based.
+    _X_goal: array [2*n]
+        Contains the target force diagram coordinates (:math:`\mathbf{X}^*`) in *Fortran* order
+        (first all :math:`\mathbf{x}^*`-coordinates, then all :math:`\mathbf{y}^*`-coordinates).
+    constraints: :class:`ConstraintsCollection`, optional
+        A collection of form diagram constraints.
+        The default is ``None``, in which case no constraints are considered.
+    pair: :class:`CompiledPair`, optional
+        The compiled topology of the diagrams.
+        The default is ``None``, in which case the topology is compiled here.
+
+    Returns
+    -------
+    red_r: array
+        The residual vector, with the rows corresponding to the anchor of the force diagram removed,
+        in the same format as the residual returned by :func:`get_jacobian_and_residual`.
+
+    """
+    pair = compile_pair(form, force, pair)
+    _vcount = len(pair.force_vertex_index)
+    _known = pair.force_anchor
+    _bc = [_known, _vcount + _known]
+    _X_iteration = force.vertices_array("xy").T.reshape(-1, 1)
+    r = _X_iteration - _X_goal
+
+    if constraints:
+        (_, cr) = constraints.compute_constraints()
+        r = vstack((r, cr))
+
+    return delete(r, _bc, axis=0)
+
+
+def solve_newton_step_lsmr(
+    red_jacobian: Union[npt.NDArray, LinearOperator],
+    red_r: npt.NDArray,
+    constraints=None,
+    x0: npt.NDArray = None,
+    tol: float = 1e-12,
+    maxiter: int = None,
+    damp: float = 0.0,
+) -> tuple[npt.NDArray, npt.NDArray, bool]:
+    r"""Solve the linear system of a Newton iteration with the fix constraints eliminated.
+
+    Parameters
+    ----------
+    red_jacobian: array or :class:`scipy.sparse.linalg.LinearOperator`
+        The Jacobian matrix without constraints, with the rows of the anchor of the force diagram removed,
+        as returned by :func:`get_jacobian_and_residual`,
+        or the corresponding operator, as returned by :func:`jacobian_operator` with ``reduced=True``.
+    red_r: array
+        The corresponding residual vector.
+    constraints: :class:`ConstraintsCollection`, optional
+        A collection of form diagram constraints.
+        The default is ``None``, in which case no constraints are considered.
+    x0: array, optional
+        Initial guess for the solution, for example the step of the previous iteration.
+        The default is ``None``, in which case the iterations start from zero.
+    tol: float, optional
+        Relative tolerance of the sparse least-squares solver.
+        The default is ``1e-12``.
+    maxiter: int, optional
+        Maximum number of iterations of the sparse least-squares solver.
+        The default is ``None``, in which case it is ten times the largest dimension of the system.
+    damp: float, optional
+        Damping factor for a regularised (Levenberg-Marquardt) step.
+        The default is ``0.0``.
+
+    Returns
+    -------
+    dx: array
+        The change of the form diagram coordinates in *Fortran* order.
+    r: array
+        The residual vector of the system, including the residuals of all constraints.
+    consistent: bool
+        ``True`` if the system has an exact solution,
+        i.e. if the norm of the residual is small relative to the norm of the right-hand side.
+        This is not meaningful for damped steps.
+
+    Notes
+    -----
+    The coordinates fixed by horizontal and vertical fix constraints are not solved for.
+    Their change is set to the negative of their residual,
+    and their columns are moved to the right-hand side.
+    The remaining constraints are added as sparse rows
+    and the system is solved with LSMR, which only needs matrix-vector products.
+    The Jacobian matrix can therefore also be provided as a linear operator, without assembling it.
+
+    The constraint rows are sparse, but a Jacobian assembled by :func:`compute_jacobian` is dense,
+    even though it is converted to a sparse matrix here.
+    With an assembled Jacobian, memory and time therefore still scale with the number of rows times the number of columns,
+    and not with the number of non-zeros of the constraints.
+    Only with the operator of :func:`jacobian_operator` the products scale with the cost of the factorised solves.
+
+    For consistent systems the solution is the same as the least-squares solution of the full system.
+    If ``x0`` is provided and the Jacobian is rank deficient, the solution can contain a component
+    in the null space of the Jacobian, and is therefore not necessarily the minimum-norm solution.
+
+    """
+    ncols = red_jacobian.shape[1]
+    dx = zeros(ncols, dtype=float64)
+    operator = isinstance(red_jacobian, LinearOperator)
+    A = red_jacobian if operator else csr_matrix(red_jacobian)
+    b = -asarray(red_r, dtype=float64).ravel()
+    r = [-b]
+
+    free = arange(ncols)
+    if constraints:
+        fixed, fixed_r = constraints.compute_fixes()
+        cj, cr = constraints.compute_constraints(fixes=False, rtype="csr")
+        b = concatenate((b, -cr.ravel()))
+        r += [fixed_r, cr.ravel()]
+        dx[fixed] = -fixed_r
+        free = delete(free, fixed)
+        if operator:
+            A = _vstack_operators(A, cj)
+            b = b - A.matvec(dx)
+            A = _restrict_columns(A, free)
+        else:
+            A = sparse_vstack((A, cj)).tocsc()
+            b = b - A[:, fixed].dot(dx[fixed])
+            A = A[:, free]
+
+    if maxiter is None:
+        maxiter = 10 * max(A.shape)
+    if x0 is not None:
+        x0 = asarray(x0, dtype=float64).ravel()[free]
+
+    result = lsmr(A, b, damp=damp, atol=tol, btol=tol, maxiter=maxiter, x0=x0)
+    x, _, _, normr, _, norma, _, normx = result
+    dx[free] = x
+    # the compatibility test of LSMR with a tolerance that is not affected by rounding errors
+    # and the same lower bound as the rank test of LeastSquaresQR
+    lower = max(A.shape[0], A.shape[1] + 1) * sys.float_info.epsilon * max(norma, norm(b)) * sqrt(1 + normx**2)
+    consistent = bool(normr <= max(sqrt(tol) * (norm(b) + norma * normx), lower))
+    return dx.reshape(-1, 1), concatenate(r).reshape(-1, 1), consistent
+
+
+def _jacobian_system(form, force, laplacian=None, pair=None):
+    """Assemble and factorise the matrices shared by :func:`compute_jacobian` and :func:`jacobian_operator`."""
+    pair = compile_pair(form, force, pair)
+    # --------------------------------------------------------------------------
+    # form diagram
+    # --------------------------------------------------------------------------
+    vcount = len(pair.vertex_index)
+    edge_index = pair.edge_index
+    free = list(set(range(vcount)) - set(pair.leaves))
+    xy = form.vertices_array("xy")
+    ecount = len(pair.edges)
+    C = pair.C
+    E = equilibrium_matrix(C, xy, free, "csc")
+    uv = C.dot(xy)
+    U = diags([uv[:, 0]], [0])
+    V = diags([uv[:, 1]], [0])
+    Cti = C.transpose().tocsr()[free, :]
+
+    q = form.edges_array("q")[:, 0]
+    Q = diags([q], [0])
+
+    ind = [edge_index[edge] for edge in form.ind()]
+    dep = list(set(range(ecount)) - set(ind))
+
+    # the equilibrium matrix of the dependent edges is factorised once for all derivatives
+    # it is not square if the form diagram has mechanisms or if the independent edges do not fix all states of self-stress
+    Ed = E[:, dep]
+    Ed = SparseFactor(Ed) if Ed.shape[0] == Ed.shape[1] else LeastSquaresFactor(Ed)
+
+    # --------------------------------------------------------------------------
+    # force diagram
+    # --------------------------------------------------------------------------
+    _Ct = pair.force_C.transpose()
+    if laplacian is None:
+        laplacian = pair.laplacian
+
+    return vcount, dep, Cti.dot(Q).dot(C), Q.dot(C), U, V, _Ct, Ed, laplacian
+
+
+def compute_jacobian(form, force, laplacian=None, pair=None):
     r"""Compute the Jacobian matrix.
 
     The actual computation of the Jacobian matrix :math:`\partial \mathbf{X}^* / \partial \mathbf{X}`
@@ -473,105 +2091,151 @@ def compute_jacobian(form, force):
         The form diagram.
     force: :class:`ForceDiagram`
         The force diagram.
+    laplacian: :class:`SparseFactor`, optional
+        The factorised Laplacian of the force diagram, as returned by :func:`laplacian_factor`.
+        The default is ``None``, in which case the Laplacian of the compiled pair is used.
+    pair: :class:`CompiledPair`, optional
+        The compiled topology of the diagrams.
+        The default is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
-    jacobian
-        Jacobian matrix (2 * _vcount, 2 * vcount)
+    array
+        Dense Jacobian matrix (2 * _vcount, 2 * vcount).
+
+    Notes
+    -----
+    All columns of the Jacobian are assembled at once from the sparse connectivity and equilibrium matrices,
+    without a loop over the vertices of the form diagram.
+    The solves with the equilibrium matrix and the Laplacian couple all coordinates,
+    such that the right-hand sides of the Laplacian solve and the Jacobian itself are dense.
+    Memory and time therefore scale with the number of force diagram vertices times the number of form diagram vertices.
+    For large diagrams, use :func:`jacobian_operator` instead, which computes products with the Jacobian without assembling it.
+
+    With :math:`\mathbf{E}_{d}\mathbf{q}_{d} = -\mathbf{E}_{i}\mathbf{q}_{i}`, the derivatives of the dependent force densities are
+
+    .. math::
+
+        \frac{\partial \mathbf{q}_{d}}{\partial \mathbf{X}}
+        =
+        -\mathbf{E}_{d}^{-1}
+        \begin{bmatrix}
+        \mathbf{C}_{i}^{t}\mathbf{Q}\mathbf{C} & \mathbf{0} \\
+        \mathbf{0} & \mathbf{C}_{i}^{t}\mathbf{Q}\mathbf{C}
+        \end{bmatrix}
+
+    If :math:`\mathbf{E}_{d}` is not square, because the form diagram has mechanisms or the independent edges do not fix all states of self-stress,
+    the inverse is replaced by the least-squares solution of :class:`LeastSquaresFactor`.
+    For overdetermined systems this gives the exact derivatives as long as the form diagram is in equilibrium.
+    The derivatives of the force diagram coordinates follow from :math:`\mathbf{L}^* \mathbf{x}^* = \mathbf{C}^{*t}\mathbf{Q}\mathbf{u}`
+    and :math:`\mathbf{L}^* \mathbf{y}^* = \mathbf{C}^{*t}\mathbf{Q}\mathbf{v}`, with the anchor of the force diagram kept in place.
 
     References
     ----------
     .. [1] Alic, V. and Åkesson, D., 2017. Bi-directional algebraic graphic statics. Computer-Aided Design, 93, pp.26-37.
 
     """
+    vcount, dep, CtiQC, QC, U, V, _Ct, Ed, laplacian = _jacobian_system(form, force, laplacian, pair)
+    ecount = QC.shape[0]
+
     # --------------------------------------------------------------------------
-    # form diagram
+    # derivatives of the force densities
     # --------------------------------------------------------------------------
-    vcount = form.number_of_vertices()
-    k_i = form.key_index()
-    leaves = [k_i[key] for key in form.leaves()]
-    free = list(set(range(form.number_of_vertices())) - set(leaves))
-    vicount = len(free)
-    edges = [(k_i[u], k_i[v]) for u, v in form.edges()]
-    xy = array(form.xy(), dtype=float64).reshape((-1, 2))
-    ecount = len(edges)
-    C = connectivity_matrix(edges, "array")
-    E = equilibrium_matrix(C, xy, free, "array")
-    uv = C.dot(xy)
-    u = uv[:, 0].reshape(-1, 1)
-    v = uv[:, 1].reshape(-1, 1)
-    Ct = C.transpose()
-    Cti = array(Ct[free, :])
+    B = sparse_bmat([[CtiQC, None], [None, CtiQC]])
+    dqdX = zeros((ecount, 2 * vcount))
+    dqdX[dep] = -Ed.solve(B.toarray())
 
-    q = array(form.q(), dtype=float64).reshape((-1, 1))
-    Q = diag(q.flatten())  # TODO: Explore sparse (diags)
+    # --------------------------------------------------------------------------
+    # derivatives of the force diagram coordinates
+    # --------------------------------------------------------------------------
+    QCx = sparse_hstack([QC, csr_matrix(QC.shape)])
+    QCy = sparse_hstack([csr_matrix(QC.shape), QC])
+    b_x = _Ct.dot(U.dot(dqdX)) + _Ct.dot(QCx).toarray()
+    b_y = _Ct.dot(V.dot(dqdX)) + _Ct.dot(QCy).toarray()
 
-    independent_edges = [(k_i[u], k_i[v]) for (u, v) in list(form.edges_where({"is_ind": True}))]
-    independent_edges_idx = [edges.index(i) for i in independent_edges]
-    dependent_edges_idx = list(set(range(ecount)) - set(independent_edges_idx))
+    # all columns of the jacobian are solved with a single factorisation of the laplacian
+    d_X = laplacian.solve(hstack((b_x, b_y)))
+    return vstack((d_X[:, : 2 * vcount], d_X[:, 2 * vcount :]))
 
-    Ed = E[:, dependent_edges_idx]
-    Eid = E[:, independent_edges_idx]
-    qid = q[independent_edges_idx]
-    EdInv = inv(array(Ed))  # TODO: Explore sparse (spinv)
 
-    # --------------------------------------------------------------------------
-    # force diagram
-    # --------------------------------------------------------------------------
-    _vertex_index = force.vertex_index()
-    _vcount = force.number_of_vertices()
-    _edges = force.ordered_edges(form)
-    _edges[:] = [(_vertex_index[u], _vertex_index[v]) for u, v in _edges]
-    _L = laplacian_matrix(_edges, normalize=False, rtype="array")
-    _C = connectivity_matrix(_edges, "array")
-    _Ct = _C.transpose()
-    _Ct = array(_Ct)
-    _known = [_vertex_index[force.anchor()]]
+def jacobian_operator(form, force, laplacian=None, reduced: bool = False, constraints=None, pair=None) -> LinearOperator:
+    r"""Construct the Jacobian matrix as a linear operator, without assembling it.
 
-    # --------------------------------------------------------------------------
-    # Jacobian
-    # --------------------------------------------------------------------------
-    jacobian = zeros((_vcount * 2, vcount * 2))
-    for j in range(2):  # Loop for x and y
-        idx = list(range(j * vicount, (j + 1) * vicount))
-        for i in range(vcount):
-            dXdxi = diag(Ct[i, :])
-            dxdxi = Ct[i, :].reshape(-1, 1)
-
-            dEdXi = zeros((vicount * 2, ecount))
-            dEdXi[idx, :] = Cti.dot(dXdxi)
-
-            dEdXi_d = dEdXi[:, dependent_edges_idx]
-            dEdXi_id = dEdXi[:, independent_edges_idx]
-
-            dEdXiInv = -EdInv.dot(dEdXi_d.dot(EdInv))
-
-            dqdXi_d = -dEdXiInv.dot(Eid.dot(qid)) - EdInv.dot(dEdXi_id.dot(qid))
-            dqdXi = zeros((ecount, 1))
-            dqdXi[dependent_edges_idx] = dqdXi_d
-            dqdXi[independent_edges_idx] = 0
-            dQdXi = diag(dqdXi[:, 0])
-
-            d_XdXiTop = zeros((_L.shape[0]))
-            d_XdXiBot = zeros((_L.shape[0]))
-
-            if j == 0:
-                d_XdXiTop = solve_with_known(
-                    _L,
-                    (_Ct.dot(dQdXi.dot(u) + Q.dot(dxdxi))).flatten(),
-                    d_XdXiTop,
-                    _known,
-                )
-                d_XdXiBot = solve_with_known(_L, (_Ct.dot(dQdXi.dot(v))).flatten(), d_XdXiBot, _known)
-            elif j == 1:
-                d_XdXiTop = solve_with_known(_L, (_Ct.dot(dQdXi.dot(u))).flatten(), d_XdXiTop, _known)
-                d_XdXiBot = solve_with_known(
-                    _L,
-                    (_Ct.dot(dQdXi.dot(v) + Q.dot(dxdxi))).flatten(),
-                    d_XdXiBot,
-                    _known,
-                )
-
-            d_XdXi = hstack((d_XdXiTop, d_XdXiBot))
-            jacobian[:, i + j * vcount] = d_XdXi
+    Parameters
+    ----------
+    form: :class:`FormDiagram`
+        The form diagram.
+    force: :class:`ForceDiagram`
+        The force diagram.
+    laplacian: :class:`SparseFactor`, optional
+        The factorised Laplacian of the force diagram, as returned by :func:`laplacian_factor`.
+        The default is ``None``, in which case the Laplacian of the compiled pair is used.
+    reduced: bool, optional
+        If ``True``, the rows corresponding to the anchor of the force diagram are removed,
+        as in :func:`get_jacobian_and_residual`.
+        The default is ``False``.
+    constraints: :class:`ConstraintsCollection`, optional
+        A collection of form diagram constraints, of which the rows are added below the Jacobian.
+        The default is ``None``, in which case no constraints are considered.
+    pair: :class:`CompiledPair`, optional
+        The compiled topology of the diagrams.
+        The default is ``None``, in which case the topology is compiled here.
+
+    Returns
+    -------
+    :class:`scipy.sparse.linalg.LinearOperator`
+        Operator (2 * _vcount, 2 * vcount) with the products of the Jacobian matrix :math:`\mathbf{J}`
+        and of its transpose with vectors and matrices,
+        or (2 * _vcount - 2, 2 * vcount) if ``reduced`` is ``True``,
+        plus one row per constraint.
+
+    Notes
+    -----
+    The product :math:`\mathbf{J}\mathbf{v}` follows the steps of :func:`compute_jacobian` for a single column:
+    one solve with the factorised equilibrium matrix of the dependent edges for the change of the force densities,
+    and one solve with the factorised Laplacian of the force diagram for the change of the coordinates.
+    The product :math:`\mathbf{J}^{t}\mathbf{w}` applies the transposes of the same steps in reverse order,
+    with the transposed solves of both factorisations.
+    The factorisations are computed once, when the operator is constructed.
+
+    Examples
+    --------
+    >>> J = jacobian_operator(form, force)  # doctest: +SKIP
+    >>> allclose(J.matmat(eye(J.shape[1])), compute_jacobian(form, force))  # doctest: +SKIP
+    True
+
+    """
+    vcount, dep, CtiQC, QC, U, V, _Ct, Ed, laplacian = _jacobian_system(form, force, laplacian, pair)
+    ecount = QC.shape[0]
+    nfree = CtiQC.shape[0]
+    _vcount = _Ct.shape[0]
+    _C = _Ct.transpose().tocsr()
+    Ud = U.diagonal()
+    Vd = V.diagonal()
+    rows = arange(2 * _vcount)
+    if reduced:
+        rows = delete(rows, [laplacian.known, [_vcount + i for i in laplacian.known]])
+
+    def matvec(v):
+        v = asarray(v, dtype=float64).reshape(2, vcount).T
+        CtiQCv = CtiQC.dot(v)
+        dq = zeros(ecount)
+        dq[dep] = -Ed.solve(concatenate((CtiQCv[:, 0], CtiQCv[:, 1])))
+        QCv = QC.dot(v)
+        b = _Ct.dot(QCv + dq[:, None] * stack((Ud, Vd), axis=1))
+        d_X = laplacian.solve(b)
+        return d_X.T.ravel()[rows]
+
+    def rmatvec(w):
+        w_full = zeros(2 * _vcount)
+        w_full[rows] = asarray(w, dtype=float64).ravel()
+        z = _C.dot(laplacian.solve(w_full.reshape(2, _vcount).T, trans=True))
+        t = -Ed.solve((Ud * z[:, 0] + Vd * z[:, 1])[dep], trans=True).reshape(2, nfree).T
+        v = QC.T.dot(z) + CtiQC.T.dot(t)
+        return v.T.ravel()
+
+    jacobian = LinearOperator((len(rows), 2 * vcount), matvec=matvec, rmatvec=rmatvec, dtype=float64)
+    if constraints:
+        (cj, _) = constraints.compute_constraints(rtype="csr")
+        jacobian = _vstack_operators(jacobian, cj)
     return jacobian
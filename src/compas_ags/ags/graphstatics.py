@@ -1,48 +1,71 @@
+from time import perf_counter
 from typing import Annotated
 from typing import Callable
 from typing import Literal
+from typing import Union
 
 import numpy.typing as npt
 from numpy import array
 from numpy import delete
+from numpy import eye
 from numpy import float64
+from numpy import hstack
+from numpy import repeat
+from numpy import stack
 from numpy import vstack
-from numpy.linalg import lstsq
+from numpy import zeros
 from numpy.linalg import norm
 from scipy.sparse import diags
+from scipy.sparse.linalg import svds
 
-from compas.geometry import angle_vectors_xy
-from compas.linalg import dof
-from compas.linalg import nonpivots
 from compas.linalg import normrow
 from compas.linalg import nullspace as matrix_nullspace
-from compas.linalg import spsolve_with_known
-from compas.matrices import connectivity_matrix
 from compas.matrices import equilibrium_matrix
 from compas_ags.ags.constraints import ConstraintsCollection
+from compas_ags.ags.core import SPARSE_DOF_SIZE
+from compas_ags.ags.core import CompiledPair
+from compas_ags.ags.core import ForceDensitySolver
+from compas_ags.ags.core import LeastSquaresQR
+from compas_ags.ags.core import NewtonResult
+from compas_ags.ags.core import SparseFactor
+from compas_ags.ags.core import compile_pair
 from compas_ags.ags.core import compute_jacobian
+from compas_ags.ags.core import count_dof
 from compas_ags.ags.core import get_jacobian_and_residual
-from compas_ags.ags.core import parallelise_edges
+from compas_ags.ags.core import get_residual
+from compas_ags.ags.core import jacobian_operator
+from compas_ags.ags.core import nullspace_lsmr
+from compas_ags.ags.core import nullspace_subspace
+from compas_ags.ags.core import parallelise_edges_numpy
+from compas_ags.ags.core import rref_nonpivots
+from compas_ags.ags.core import solve_newton_step_lsmr
+from compas_ags.ags.core import update_edge_results
 from compas_ags.ags.core import update_primal_from_dual
-from compas_ags.ags.core import update_q_from_qind
 from compas_ags.diagrams import ForceDiagram
 from compas_ags.diagrams import FormDiagram
 from compas_ags.exceptions import SolutionError
 
-from .core import rref_sympy
+
+def _check_option(name: str, value, options: tuple) -> None:
+    if value not in options:
+        raise ValueError("Invalid {}: {!r}. Use one of {}.".format(name, value, ", ".join(repr(option) for option in options)))
+
 
 # ==============================================================================
 # analysis form diagram
 # ==============================================================================
 
 
-def form_identify_dof(form: FormDiagram) -> tuple[int, int, list[int]]:
+def form_identify_dof(form: FormDiagram, pair: CompiledPair = None) -> tuple[int, int, list[int]]:
     r"""Identify the DOF of a form diagram.
 
     Parameters
     ----------
     form: :class:`FormDiagram`
         The form diagram.
+    pair: :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        The default is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
@@ -77,29 +100,43 @@ def form_identify_dof(form: FormDiagram) -> tuple[int, int, list[int]]:
     vector space if they are linearly independent vectors and every vector of the
     space is a linear combination of this set.
 
+    The independent edges are the non-pivot columns of the reduced row-echelon form of the equilibrium matrix.
+    They are identified numerically with :func:`compas_ags.ags.core.rref_nonpivots`.
+
     """
-    vertex_index = form.vertex_index()
+    pair = compile_pair(form, pair=pair)
+    vertex_index = pair.vertex_index
 
     xy = form.vertices_attributes("xy")
     fixed = [vertex_index[vertex] for vertex in form.fixed()]
-    free = list(set(range(form.number_of_vertices())) - set(fixed))
-    edges = [(vertex_index[u], vertex_index[v]) for u, v in form.edges()]
-    C = connectivity_matrix(edges)
-    E = equilibrium_matrix(C, xy, free)
+    free = list(set(range(len(vertex_index))) - set(fixed))
+    edges = pair.edges
+    E = equilibrium_matrix(pair.C, xy, free, "csr")
 
-    k, m = dof(E)
-    ind = nonpivots(rref_sympy(E))
+    k, m = count_dof(E)
+    ind = rref_nonpivots(E)
 
     return int(k), int(m), [edges[i] for i in ind]
 
 
-def form_count_dof(form: FormDiagram) -> tuple[int, int]:
+def form_count_dof(form: FormDiagram, tol: float = 0.001, sparse: bool = None, gap: bool = False, pair: CompiledPair = None) -> tuple:
     r"""Count the number of degrees of freedom of a form diagram.
 
     Parameters
     ----------
     form: :class:`FormDiagram`
         The form diagram.
+    tol : float, optional
+        Relative tolerance for the singular values of the equilibrium matrix.
+    sparse : bool, optional
+        Use a sparse eigensolver instead of a dense SVD.
+        Default is ``None``, in which case the choice is based on the size of the equilibrium matrix.
+        See :func:`compas_ags.ags.core.count_dof`.
+    gap : bool, optional
+        If ``True``, also return the numerical gap between the non-zero and zero singular values.
+    pair : :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        Default is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
@@ -109,6 +146,8 @@ def form_count_dof(form: FormDiagram) -> tuple[int, int]:
     m : int
         Dimension of the left null space of the equilibrium matrix of the form
         diagram.
+    gap : float
+        The ratio of the smallest non-zero and the largest zero singular value, if ``gap`` is ``True``.
 
     Notes
     -----
@@ -124,24 +163,21 @@ def form_count_dof(form: FormDiagram) -> tuple[int, int]:
         \end{bmatrix}
 
     """
-    vertex_index = form.vertex_index()
+    pair = compile_pair(form, pair=pair)
 
     xy = form.vertices_attributes("xy")
-    fixed = [vertex_index[vertex] for vertex in form.leaves()]
-    free = list(set(range(form.number_of_vertices())) - set(fixed))
-    edges = [(vertex_index[u], vertex_index[v]) for u, v in form.edges()]
-    C = connectivity_matrix(edges)
-    E = equilibrium_matrix(C, xy, free)
+    free = list(set(range(len(pair.vertex_index))) - set(pair.leaves))
+    E = equilibrium_matrix(pair.C, xy, free, "csr")
 
-    k, m = dof(E)
-
-    return int(k), int(m)
+    return count_dof(E, tol=tol, sparse=sparse, gap=gap)
 
 
 def form_compute_nullspace(
     form: FormDiagram,
     force: ForceDiagram,
     constraints: ConstraintsCollection = None,
+    method: Literal[None, "svd", "subspace", "lsmr"] = None,
+    pair: CompiledPair = None,
 ) -> list[Annotated[npt.NDArray, Literal["N", 2]]]:
     r"""Compute the nullspaces of a form diagram assuming a set of constraints.
 
@@ -159,12 +195,29 @@ def form_compute_nullspace(
     constraints: :class:`ConstraintsCollection`, optional
         A collection of form diagram constraints.
         The default is ``None``, in which case no constraints are considered.
+    method: {None, "svd", "subspace", "lsmr"}, optional
+        With ``"svd"`` the Jacobian is assembled and the nullspace is computed with a dense SVD.
+        With ``"subspace"`` the Jacobian is assembled and the nullspace is computed with subspace iterations,
+        without a full SVD.
+        See :func:`compas_ags.ags.core.nullspace_subspace`.
+        With ``"lsmr"`` the Jacobian is not assembled and the nullspace is computed with matrix-vector products only.
+        See :func:`compas_ags.ags.core.jacobian_operator` and :func:`compas_ags.ags.core.nullspace_lsmr`.
+        The default is ``None``, in which case ``"subspace"`` is used
+        if the Jacobian has more than ``compas_ags.ags.core.SPARSE_DOF_SIZE`` columns, and ``"svd"`` otherwise.
+    pair : :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        The default is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
     nullspaces [list of arrays (vcount x 2)]
         The null displacement fields applied to the form diagram considering applied constraints.
 
+    Raises
+    ------
+    ValueError
+        If the method is not valid.
+
     Notes
     -----
     Among the nullspaces, the unrestrained rigid-body displacements available are always
@@ -177,20 +230,33 @@ def form_compute_nullspace(
     .. [1] Alic, V. and Åkesson, D., 2017. Bi-directional algebraic graphic statics. Computer-Aided Design, 93, pp.26-37.
 
     """
-    jacobian = compute_jacobian(form, force)  # Jacobian matrix of size (2 _vcount, 2 vcount)
+    _check_option("method", method, (None, "svd", "subspace", "lsmr"))
+    pair = compile_pair(form, force, pair)
+
+    if method == "lsmr":
+        jacobian = jacobian_operator(form, force, reduced=True, constraints=constraints, pair=pair)
+        nullstates = nullspace_lsmr(jacobian).T
+        return [nullstate.reshape((2, -1)).T for nullstate in nullstates]
+
+    jacobian = compute_jacobian(form, force, pair=pair)  # Jacobian matrix of size (2 _vcount, 2 vcount)
     if constraints:
+        # the dense rows of the constraints, because the Jacobian and its nullspace computations are dense
         (cj, _) = constraints.compute_constraints()
         jacobian = vstack((jacobian, cj))  # Add rows to the Jacobian matrix representing constraints
 
     # Remove the rows of the jacobian to account for the anchored vertex in the force diagram (influence x and y directions)
-    _vcount = force.number_of_vertices()
-    _k_i = force.vertex_index()
-    _anchor = _k_i[force.anchor()]
+    _vcount = len(pair.force_vertex_index)
+    _anchor = pair.force_anchor
     _anchor_xy = [_anchor, _vcount + _anchor]
 
     reduced_jacobian = delete(jacobian, _anchor_xy, axis=0)
 
-    nullstates = matrix_nullspace(reduced_jacobian).T  # unit vectors representing the possible nullstates
+    if method is None:
+        method = "subspace" if reduced_jacobian.shape[1] > SPARSE_DOF_SIZE else "svd"
+    if method == "subspace":
+        nullstates = nullspace_subspace(reduced_jacobian).T
+    else:
+        nullstates = matrix_nullspace(reduced_jacobian).T  # unit vectors representing the possible nullstates
 
     nullspaces = []
     for nullstate in nullstates:  # reshaping the nullstates a list of (vcount x 2) arrays
@@ -205,7 +271,7 @@ def form_compute_nullspace(
 # ==============================================================================
 
 
-def form_update_q_from_qind(form: FormDiagram) -> FormDiagram:
+def form_update_q_from_qind(form: FormDiagram, solver: ForceDensitySolver = None, pair: CompiledPair = None) -> FormDiagram:
     """Update the force densities of the dependent edges of a form diagram using
     the values of the independent ones.
 
@@ -213,6 +279,13 @@ def form_update_q_from_qind(form: FormDiagram) -> FormDiagram:
     ----------
     form: :class:`FormDiagram`
         The form diagram.
+    solver : :class:`ForceDensitySolver`, optional
+        A solver constructed previously with :meth:`ForceDensitySolver.from_form`.
+        It can be reused as long as the geometry of the form diagram and the selection of independent edges do not change.
+        Default is ``None``, in which case a new solver is constructed.
+    pair : :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        Default is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
@@ -223,36 +296,33 @@ def form_update_q_from_qind(form: FormDiagram) -> FormDiagram:
     --------
     >>>
     """
-    vertex_index = form.vertex_index()
-    edge_index = form.edge_index()
-
-    vcount = form.number_of_vertices()
-    ecount = form.number_of_edges()
-    fixed = form.leaves()
-    fixed = [vertex_index[vertex] for vertex in fixed]
-    free = list(set(range(vcount)) - set(fixed))
-    ind = [edge_index[edge] for edge in form.ind()]
-    dep = list(set(range(ecount)) - set(ind))
-    edges = [(vertex_index[u], vertex_index[v]) for u, v in form.edges()]
-    xy = array(form.xy(), dtype=float64).reshape((-1, 2))
-    q = array(form.q(), dtype=float64).reshape((-1, 1))
-    C = connectivity_matrix(edges, "csr")
-    E = equilibrium_matrix(C, xy, free, "csr")
-
-    update_q_from_qind(E, q, dep, ind)
-
-    uv = C.dot(xy)
+    pair = compile_pair(form, pair=pair)
+
+    if solver is None:
+        solver = ForceDensitySolver.from_form(form, pair=pair)
+
+    xy = form.vertices_array("xy")
+    q = form.edges_array("q")
+
+    q[solver.dep] = solver.solve(q[solver.ind])
+
+    uv = pair.C.dot(xy)
     lengths = normrow(uv)
     forces = q * lengths
 
-    for edge in form.edges():
-        index = edge_index[edge]
-        form.edge_attributes(edge, ["q", "f", "l"], [q[index, 0], forces[index, 0], lengths[index, 0]])
+    form.set_edges_array(["q", "f", "l"], hstack((q, forces, lengths)))
 
     return form
 
 
-def form_update_from_force(form: FormDiagram, force: ForceDiagram, kmax: int = 100) -> tuple[FormDiagram, ForceDiagram]:
+def form_update_from_force(
+    form: FormDiagram,
+    force: ForceDiagram,
+    kmax: int = 100,
+    tol: float = None,
+    full_output: bool = False,
+    pair: CompiledPair = None,
+) -> Union[tuple[FormDiagram, ForceDiagram], tuple[FormDiagram, ForceDiagram, tuple[int, float]]]:
     r"""Update the form diagram after a modification of the force diagram.
 
     Parameters
@@ -264,6 +334,15 @@ def form_update_from_force(form: FormDiagram, force: ForceDiagram, kmax: int = 1
     kmax: int, optional
         Maximum number of least-square iterations for solving the duality form-force.
         The default value is ``20``.
+    tol: float, optional
+        Stop the least-square iterations once no vertex of the form diagram moves more than this distance.
+        The default value is ``None``, in which case all ``kmax`` iterations are performed.
+    full_output: bool, optional
+        If ``True``, also return the number of least-square iterations and the largest displacement of a vertex in the last iteration.
+        The default value is ``False``.
+    pair: :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        The default is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
@@ -271,6 +350,9 @@ def form_update_from_force(form: FormDiagram, force: ForceDiagram, kmax: int = 1
         The form diagram with updated force densities.
     force: :class:`ForceDiagram`
         The updated force diagram.
+    tuple[int, float]
+        The number of iterations and the largest displacement in the last iteration, if ``full_output`` is ``True``.
+        The iterations met ``tol`` if the displacement is smaller than ``tol``.
 
     Notes
     -----
@@ -291,22 +373,20 @@ def form_update_from_force(form: FormDiagram, force: ForceDiagram, kmax: int = 1
     and  :math:`\mathbf{b}` ....
 
     """
+    pair = compile_pair(form, force, pair)
     # --------------------------------------------------------------------------
     # form diagram
     # --------------------------------------------------------------------------
-    vertex_index = form.vertex_index()
-    edge_index = form.edge_index()
-    i_j = {index: [vertex_index[nbr] for nbr in form.vertex_neighbors(vertex)] for index, vertex in enumerate(form.vertices())}
-    ij_e = {(vertex_index[u], vertex_index[v]): edge_index[u, v] for u, v in edge_index}
-    ij_e.update({(vertex_index[v], vertex_index[u]): edge_index[u, v] for u, v in edge_index})
+    vertex_index = pair.vertex_index
+    i_j = pair.i_j
+    ij_e = pair.ij_e
 
-    xy = array(form.xy(), dtype=float64)
-    edges = [(vertex_index[u], vertex_index[v]) for u, v in form.edges()]
-    C = connectivity_matrix(edges, "csr")
+    xy = form.vertices_array("xy")
+    C = pair.C
     # --------------------------------------------------------------------------
     # constraints
     # --------------------------------------------------------------------------
-    leaves = [vertex_index[vertex] for vertex in form.leaves()]
+    leaves = pair.leaves
     fixed = [vertex_index[vertex] for vertex in form.fixed()]
     free = list(set(range(form.number_of_vertices())) - set(fixed) - set(leaves))
     line_constraints_all = form.vertices_attribute("line_constraint")
@@ -315,20 +395,14 @@ def form_update_from_force(form: FormDiagram, force: ForceDiagram, kmax: int = 1
     # --------------------------------------------------------------------------
     # force diagram
     # --------------------------------------------------------------------------
-    _vertex_index = force.vertex_index()
-    _edge_index = force.edge_index(form)
-    _edge_index.update({(v, u): _edge_index[u, v] for u, v in _edge_index})
-
-    _xy = array(force.xy(), dtype=float64)
-    _edges = force.ordered_edges(form)
-    _edges[:] = [(_vertex_index[u], _vertex_index[v]) for u, v in _edges]
-    _C = connectivity_matrix(_edges, "csr")
+    _xy = force.vertices_array("xy")
+    _C = pair.force_C
     # --------------------------------------------------------------------------
     # compute the coordinates of thet *free* vertices
     # as a function of the fixed vertices and the previous coordinates of the *free* vertices
     # re-add the leaves and leaf-edges
     # --------------------------------------------------------------------------
-    update_primal_from_dual(
+    iterations, residual = update_primal_from_dual(
         xy,
         _xy,
         free,
@@ -339,41 +413,16 @@ def form_update_from_force(form: FormDiagram, force: ForceDiagram, kmax: int = 1
         target_vectors=target_vectors,
         leaves=leaves,
         kmax=kmax,
+        tol=tol,
     )
     # --------------------------------------------------------------------------
     # update
     # --------------------------------------------------------------------------
-    uv = C.dot(xy)
-    _uv = _C.dot(_xy)
-    angles = [angle_vectors_xy(a, b, deg=True) for a, b in zip(uv, _uv)]
-    lengths = normrow(uv)
-    forces = normrow(_uv)
-    q = forces / lengths
-    # --------------------------------------------------------------------------
-    # update form diagram
-    # --------------------------------------------------------------------------
-    for vertex, attr in form.vertices(True):
-        index = vertex_index[vertex]
-        attr["x"] = xy[index, 0]
-        attr["y"] = xy[index, 1]
-    for edge, attr in form.edges(True):
-        index = edge_index[edge]
-        attr["l"] = lengths[index, 0]
-        attr["a"] = angles[index]
-        if angles[index] < 90:
-            attr["f"] = forces[index, 0]
-            attr["q"] = q[index, 0]
-        else:
-            attr["f"] = -forces[index, 0]
-            attr["q"] = -q[index, 0]
-    # --------------------------------------------------------------------------
-    # update force diagram
-    # --------------------------------------------------------------------------
-    for edge, attr in force.edges(True):
-        index = _edge_index[edge]
-        attr["a"] = angles[index]
-        attr["l"] = forces[index, 0]
+    form.set_vertices_array("xy", xy)
+    update_edge_results(form, force, C.dot(xy), _C.dot(_xy), deg=True, pair=pair)
 
+    if full_output:
+        return form, force, (iterations, residual)
     return form, force
 
 
@@ -383,7 +432,15 @@ def form_update_from_force_newton(
     constraints: ConstraintsCollection = None,
     tol: float = 1e-10,
     max_iter: int = 20,
-) -> FormDiagram:
+    check: Literal["always", "first", "failure"] = "always",
+    linear_solver: Literal["qr", "lsmr", "krylov"] = "qr",
+    method: Literal["newton", "broyden"] = "newton",
+    damping: Literal[None, "linesearch", "lm"] = None,
+    callback: Callable = None,
+    verbose: bool = False,
+    full_output: bool = False,
+    pair: CompiledPair = None,
+) -> Union[FormDiagram, tuple[FormDiagram, NewtonResult]]:
     r"""Update the form diagram after a modification of the force diagram.
 
     Compute the geometry of the form diagram from the geometry of the force diagram
@@ -409,54 +466,246 @@ def form_update_from_force_newton(
     max_iter: int, optional
         Maximum number of iterations before stop Newton Method.
         The default value is ``20``.
+    check: {"always", "first", "failure"}, optional
+        When to verify that the rank of the Jacobian augmented with the residual is the same as the rank of the Jacobian.
+        With ``"always"`` the rank is checked in every iteration, with ``"first"`` only in the first iteration,
+        and with ``"failure"`` only if the method does not converge.
+        The default value is ``"always"``.
+    linear_solver: {"qr", "lsmr", "krylov"}, optional
+        The solver for the linear system of every iteration.
+        With ``"qr"`` the constraints are added to the dense Jacobian and the system is solved with a dense QR decomposition.
+        With ``"lsmr"`` the coordinates fixed by horizontal and vertical fix constraints are eliminated,
+        the other constraints are added as sparse rows, and the system is solved with LSMR.
+        See :func:`compas_ags.ags.core.solve_newton_step_lsmr`.
+        With ``"krylov"`` the system is solved in the same way,
+        but the Jacobian is not assembled and only its products with vectors are computed.
+        See :func:`compas_ags.ags.core.jacobian_operator`.
+        The default value is ``"qr"``.
+    method: {"newton", "broyden"}, optional
+        With ``"newton"`` the jacobian is computed in every iteration.
+        With ``"broyden"`` the jacobian is computed in the first iteration
+        and updated with rank-1 (Broyden) updates after that.
+        It is recomputed only if an iteration does not halve the norm of the residual.
+        The default value is ``"newton"``.
+    damping: {None, "linesearch", "lm"}, optional
+        With ``None`` the full step is taken in every iteration.
+        With ``"linesearch"`` the step is halved until the norm of the residual decreases sufficiently.
+        With ``"lm"`` the step is computed with Levenberg-Marquardt damping,
+        and the damping factor is increased until the norm of the residual decreases.
+        The default value is ``None``.
+    callback: callable, optional
+        A function that is called after every iteration with the iteration number
+        and the :class:`compas_ags.ags.core.NewtonResult` collected so far.
+        If it returns ``True``, the iterations are stopped.
+        The default value is ``None``.
+    verbose: bool, optional
+        If ``True``, print the norm of the residual in every iteration.
+        The default value is ``False``.
+        Use ``full_output`` or ``callback`` to monitor the iterations without printing.
+    full_output: bool, optional
+        If ``True``, also return the convergence information,
+        and report a failure to converge in the result instead of raising an error.
+        The default value is ``False``.
+    pair: :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        The default value is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
     form: :class:`FormDiagram`
         The updated form diagram.
+    result: :class:`compas_ags.ags.core.NewtonResult`
+        The convergence information, if ``full_output`` is ``True``.
+
+    Raises
+    ------
+    SolutionError
+        If the rank of the augmented Jacobian is larger than the rank of the Jacobian,
+        or if the method does not converge and ``full_output`` is ``False``.
+    ValueError
+        If one of the options is not valid,
+        or if the ``"krylov"`` solver is combined with ``method="broyden"``.
+
+    Notes
+    -----
+    With the ``"qr"`` solver, the column-pivoted QR decomposition of the Jacobian used for the rank check
+    is reused to compute the least-squares solution of every iteration.
+    The decomposition is dense, and the rows of the constraints are therefore added as dense rows.
+    The ``"lsmr"`` and ``"krylov"`` solvers use the sparse rows of the constraints directly.
+    With the ``"lsmr"`` solver, the rank check is based on the stopping criterion of LSMR.
+    The Jacobian is still assembled as a dense matrix by :func:`compas_ags.ags.core.compute_jacobian`,
+    such that only the constraints are handled sparsely,
+    and memory and time of every iteration still grow with the number of form diagram vertices times the number of force diagram vertices.
+
+    With the ``"krylov"`` solver, every iteration factorises the equilibrium matrix of the dependent edges
+    and every product with the Jacobian costs one solve with this factorisation and one with the factorised Laplacian.
+    This is a Newton-Krylov method and it cannot be combined with ``method="broyden"``.
+
+    The Broyden updates only apply to the jacobian of the force diagram coordinates.
+    The rows of the constraints are computed exactly in every iteration.
+
+    The damped Levenberg-Marquardt system always has a unique solution,
+    and the rank of the augmented Jacobian is therefore not checked with ``damping="lm"``.
 
     References
     ----------
     .. [1] Alic, V. and Åkesson, D., 2017. Bi-directional algebraic graphic statics. Computer-Aided Design, 93, pp.26-37.
 
     """
-    X = array(form.vertices_attribute("x") + form.vertices_attribute("y")).reshape(-1, 1)
-    _X_goal = array(force.vertices_attribute("x") + force.vertices_attribute("y")).reshape(-1, 1)
+    if callback:
+        if not callable(callback):
+            raise Exception("The provided callback is not callable.")
+    _check_option("check", check, ("always", "first", "failure"))
+    _check_option("linear_solver", linear_solver, ("qr", "lsmr", "krylov"))
+    _check_option("method", method, ("newton", "broyden"))
+    _check_option("damping", damping, (None, "linesearch", "lm"))
+    if linear_solver == "krylov" and method == "broyden":
+        raise ValueError("The Broyden updates require an assembled jacobian, use another linear solver.")
+
+    X = form.vertices_array("xy").T.reshape(-1, 1)
+    _X_goal = force.vertices_array("xy").T.reshape(-1, 1)
+
+    # The topology of the diagrams does not change during the iterations
+    pair = compile_pair(form, force, pair)
+    vcount = len(pair.vertex_index)
+
+    def update(X):
+        # Update form diagram and the force diagram based on form
+        form.set_vertices_array("xy", X.reshape(2, vcount).T)
+        form_update_q_from_qind(form, pair=pair)
+        force_update_from_form(force, form, pair=pair)
+
+    def solve(jacobian, r, damp):
+        if linear_solver in ("lsmr", "krylov"):
+            # Eliminate the fixed coordinates and solve the remaining sparse system
+            return solve_newton_step_lsmr(jacobian, r, constraints, damp=damp)
+
+        # Add the constraints to the jacobian matrix and residual vector
+        # as dense rows, because the QR decomposition of the stacked system is dense
+        red_jacobian, red_r = jacobian, r
+        if constraints:
+            (cj, cr) = constraints.compute_constraints()
+            red_jacobian = vstack((red_jacobian, cj))
+            red_r = vstack((red_r, cr))
 
-    vcount = form.number_of_vertices()
-    index_vertex = form.index_vertex()
+        # Do the least squares solution
+        if damp:
+            ncols = red_jacobian.shape[1]
+            solver = LeastSquaresQR(vstack((red_jacobian, damp * eye(ncols))))
+            return solver.solve(-vstack((red_r, zeros((ncols, 1))))), red_r, True
+        solver = LeastSquaresQR(red_jacobian)
+        return solver.solve(-red_r), red_r, solver.is_consistent(red_r)
+
+    result = NewtonResult()
+    jacobian = None
+    r_previous = None
+    dx = None
+    damp = 0.0
+
+    form_update_q_from_qind(form, pair=pair)
+    force_update_from_form(force, form, pair=pair)
 
     # Begin Newton
     diff = 100
     n_iter = 1
     while diff > tol:
-        # Update force diagram based on form at each iteration
-        form_update_q_from_qind(form)
-        force_update_from_form(force, form)
+        start = perf_counter()
+
+        # Get jacobian matrix and residual vector of the force diagram
+        if method == "broyden" and jacobian is not None:
+            red_r = get_residual(form, force, _X_goal, constraints, pair=pair)
+            r = red_r[: jacobian.shape[0]]
+            if norm(red_r) < 0.5 * diff:
+                # Rank-1 update of the previous jacobian
+                jacobian = jacobian + (r - r_previous - jacobian.dot(dx)).dot(dx.T) / dx.T.dot(dx)
+                result.broyden_updates += 1
+            else:
+                # The convergence stalls, recompute the jacobian
+                jacobian = None
+        if linear_solver == "krylov":
+            jacobian = jacobian_operator(form, force, reduced=True, pair=pair)
+            r = get_residual(form, force, _X_goal, pair=pair)
+            result.jacobian_evaluations += 1
+        elif method != "broyden" or jacobian is None:
+            jacobian, r = get_jacobian_and_residual(form, force, _X_goal, check=False, pair=pair)
+            result.jacobian_evaluations += 1
+        r_previous = r
+
+        if damping == "lm" and not damp:
+            if linear_solver == "krylov":
+                damp = 1e-3 * svds(jacobian, k=1, return_singular_vectors=False)[0]
+            else:
+                damp = 1e-3 * norm(jacobian, axis=0).max()
+
+        dx, red_r, consistent = solve(jacobian, r, damp)
+
+        if damping != "lm" and not consistent and (check == "always" or (check == "first" and n_iter == 1)):
+            raise SolutionError("ERROR: Rank Augmented > Rank Jacobian")
 
-        # Get jacobian maxtrix and residual vector considering constraints
-        red_jacobian, red_r = get_jacobian_and_residual(form, force, _X_goal, constraints)
+        diff = norm(red_r)
 
-        # Do the least squares solution
-        dx = lstsq(red_jacobian, -red_r)[0]
+        # Update form diagram at end of iteration
+        if damping == "linesearch":
+            current = norm(get_residual(form, force, _X_goal, constraints, pair=pair))
+            step = 1.0
+            for _ in range(10):
+                update(X + step * dx)
+                if norm(get_residual(form, force, _X_goal, constraints, pair=pair)) < (1 - 1e-4 * step) * current:
+                    break
+                step *= 0.5
+            else:
+                update(X + step * dx)
+            dx = step * dx
+            lm = 0.0
+        elif damping == "lm":
+            current = norm(get_residual(form, force, _X_goal, constraints, pair=pair))
+            for _ in range(10):
+                update(X + dx)
+                if norm(get_residual(form, force, _X_goal, constraints, pair=pair)) < current:
+                    break
+                damp *= 3
+                dx = solve(jacobian, r, damp)[0]
+            else:
+                update(X + dx)
+            step = 1.0
+            lm = damp
+            damp /= 3
+        else:
+            step = 1.0
+            lm = 0.0
+            update(X + dx)
 
         X = X + dx
 
-        # Update form diagram at end of iteration
-        for i in range(vcount):
-            vertex = index_vertex[i]
-            form.vertex_attribute(vertex, "x", X[i].item())
-            form.vertex_attribute(vertex, "y", X[i + vcount].item())
+        result.iterations = n_iter
+        result.residuals.append(float(diff))
+        result.steps.append(float(norm(dx)))
+        result.step_lengths.append(float(step))
+        result.damping.append(float(lm))
+        result.times.append(perf_counter() - start)
+
+        if callback and callback(n_iter, result):
+            result.cancelled = True
+            break
 
-        diff = norm(red_r)
         if n_iter > max_iter:
+            if check == "failure" and damping != "lm" and not consistent:
+                raise SolutionError("ERROR: Rank Augmented > Rank Jacobian")
+            if full_output:
+                break
             raise SolutionError("Did not converge")
 
-        print("i: {0:0} diff: {1:.2e}".format(n_iter, float(diff)))
+        if verbose:
+            print("i: {0:0} diff: {1:.2e}".format(n_iter, float(diff)))
         n_iter += 1
 
-    print("Converged in {0} iterations".format(n_iter))
+    result.converged = bool(diff <= tol)
+
+    if verbose and result.converged:
+        print("Converged in {0} iterations, {1} jacobian evaluations, {2} Broyden updates".format(n_iter, result.jacobian_evaluations, result.broyden_updates))
 
+    if full_output:
+        return form, result
     return form
 
 
@@ -465,7 +714,7 @@ def form_update_from_force_newton(
 # ==============================================================================
 
 
-def force_update_from_form(force: ForceDiagram, form: FormDiagram) -> ForceDiagram:
+def force_update_from_form(force: ForceDiagram, form: FormDiagram, laplacian: SparseFactor = None, pair: CompiledPair = None) -> ForceDiagram:
     """Update the force diagram after modifying the (force densities of) the form diagram.
 
     Parameters
@@ -474,6 +723,12 @@ def force_update_from_form(force: ForceDiagram, form: FormDiagram) -> ForceDiagr
         The force diagram on which the update is based.
     form : :class:`FormDiagram`
         The form diagram to update.
+    laplacian : :class:`compas_ags.ags.core.SparseFactor`, optional
+        The factorised Laplacian of the force diagram, as returned by :func:`compas_ags.ags.core.laplacian_factor`.
+        The default is ``None``, in which case the Laplacian of the compiled pair is used.
+    pair : :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        The default is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
@@ -481,43 +736,128 @@ def force_update_from_form(force: ForceDiagram, form: FormDiagram) -> ForceDiagr
         The updated force diagram.
 
     """
+    pair = compile_pair(form, force, pair)
     # --------------------------------------------------------------------------
     # form diagram
     # --------------------------------------------------------------------------
-    vertex_index = form.vertex_index()
-
-    xy = array(form.xy(), dtype=float64)
-    edges = [[vertex_index[u], vertex_index[v]] for u, v in form.edges_where({"_is_edge": True})]
-    C = connectivity_matrix(edges, "csr")
-    Q = diags([form.q()], [0])
-    uv = C.dot(xy)
+    xy = form.vertices_array("xy")
+    Q = diags([form.edges_array("q")[:, 0]], [0])
+    uv = pair.C.dot(xy)
     # --------------------------------------------------------------------------
     # force diagram
     # --------------------------------------------------------------------------
-    _vertex_index = force.vertex_index()
-
-    _known = [_vertex_index[force.anchor()]]
-    _xy = array(force.xy(), dtype=float64)
-    _edges = force.ordered_edges(form)
-    _edges[:] = [(_vertex_index[u], _vertex_index[v]) for u, v in _edges]
-    _C = connectivity_matrix(_edges, "csr")
-    _Ct = _C.transpose()
+    _xy = force.vertices_array("xy")
+    _Ct = pair.force_C.transpose()
+    if laplacian is None:
+        laplacian = pair.laplacian
     # --------------------------------------------------------------------------
     # compute reciprocal for given q
     # --------------------------------------------------------------------------
-    _xy = spsolve_with_known(_Ct.dot(_C), _Ct.dot(Q).dot(uv), _xy, _known)
+    _xy = laplacian.solve(_Ct.dot(Q).dot(uv), _xy)
     # --------------------------------------------------------------------------
     # update force diagram
     # --------------------------------------------------------------------------
-    for vertex, attr in force.vertices(True):
-        index = _vertex_index[vertex]
-        attr["x"] = _xy[index, 0]
-        attr["y"] = _xy[index, 1]
+    force.set_vertices_array("xy", _xy)
 
     return force
 
 
-def force_update_from_form_geometrical(force: ForceDiagram, form: FormDiagram, kmax: int = 100) -> ForceDiagram:
+def update_diagrams_from_qind(
+    form: FormDiagram,
+    force: ForceDiagram,
+    qind: npt.ArrayLike,
+    case: int = None,
+    solver: ForceDensitySolver = None,
+    laplacian: SparseFactor = None,
+    pair: CompiledPair = None,
+) -> tuple[npt.NDArray, npt.NDArray, npt.NDArray]:
+    """Compute the force densities, forces and force diagrams of multiple load cases at once.
+
+    Parameters
+    ----------
+    form : :class:`FormDiagram`
+        The form diagram.
+    force : :class:`ForceDiagram`
+        The force diagram.
+    qind : array-like
+        The force densities of the independent edges, as an (ni x k) array with one column per load case.
+        The rows follow the order of the independent edges returned by ``form.ind()``.
+    case : int, optional
+        The index of the load case that should be stored in the diagrams.
+        Default is ``None``, in which case the diagrams are not modified.
+    solver : :class:`ForceDensitySolver`, optional
+        A solver constructed previously with :meth:`ForceDensitySolver.from_form`.
+        Default is ``None``, in which case a new solver is constructed.
+    laplacian : :class:`compas_ags.ags.core.SparseFactor`, optional
+        The factorised Laplacian of the force diagram, as returned by :func:`compas_ags.ags.core.laplacian_factor`.
+        Default is ``None``, in which case the Laplacian of the compiled pair is used.
+    pair : :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        Default is ``None``, in which case the topology is compiled here.
+
+    Returns
+    -------
+    q : array
+        The force densities of all edges of the form diagram, as an (m x k) array.
+    f : array
+        The forces in all edges of the form diagram, as an (m x k) array.
+    _xy : array
+        The vertex coordinates of the force diagram of every load case, as a (k x n x 2) array.
+
+    Notes
+    -----
+    The geometry of the form diagram is the same for all load cases.
+    The force density system and the Laplacian of the force diagram are therefore factorised only once,
+    and all load cases are solved as multiple right-hand sides.
+
+    """
+    pair = compile_pair(form, force, pair)
+    # --------------------------------------------------------------------------
+    # form diagram
+    # --------------------------------------------------------------------------
+    if solver is None:
+        solver = ForceDensitySolver.from_form(form, pair=pair)
+
+    qind = array(qind, dtype=float64).reshape((len(solver.ind), -1))
+    ncases = qind.shape[1]
+    xy = form.vertices_array("xy")
+    uv = pair.C.dot(xy)
+    lengths = normrow(uv)
+
+    q = zeros((len(pair.edges), ncases), dtype=float64)
+    q[solver.ind] = qind
+    q[solver.dep] = solver.solve(qind)
+    f = q * lengths
+    # --------------------------------------------------------------------------
+    # force diagram
+    # --------------------------------------------------------------------------
+    _xy = force.vertices_array("xy")
+    _Ct = pair.force_C.transpose()
+    if laplacian is None:
+        laplacian = pair.laplacian
+
+    b = hstack((_Ct.dot(q * uv[:, [0]]), _Ct.dot(q * uv[:, [1]])))
+    x = hstack((repeat(_xy[:, [0]], ncases, axis=1), repeat(_xy[:, [1]], ncases, axis=1)))
+    x = laplacian.solve(b, x)
+    _xy = stack((x[:, :ncases].T, x[:, ncases:].T), axis=2)
+    # --------------------------------------------------------------------------
+    # update diagrams
+    # --------------------------------------------------------------------------
+    if case is not None:
+        form.set_edges_array(["q", "f", "l"], stack((q[:, case], f[:, case], lengths[:, 0]), axis=1))
+        force.set_vertices_array("xy", _xy[case])
+
+    return q, f, _xy
+
+
+def force_update_from_form_geometrical(
+    force: ForceDiagram,
+    form: FormDiagram,
+    kmax: int = 100,
+    tol: float = None,
+    full_output: bool = False,
+    pair: CompiledPair = None,
+) -> Union[ForceDiagram, tuple[ForceDiagram, tuple[int, float]]]:
     """Update the force diagram after modifying the (geometry of) the form diagram.
 
     Parameters
@@ -529,36 +869,41 @@ def force_update_from_form_geometrical(force: ForceDiagram, form: FormDiagram, k
     kmax: int, optional
         Maximum number of least-square iterations for solving the duality form-force.
         The default value is ``20``.
+    tol: float, optional
+        Stop the least-square iterations once no vertex of the force diagram moves more than this distance.
+        The default value is ``None``, in which case all ``kmax`` iterations are performed.
+    full_output: bool, optional
+        If ``True``, also return the number of least-square iterations and the largest displacement of a vertex in the last iteration.
+        The default value is ``False``.
+    pair: :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        The default value is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
     force :class:`ForceDiagram`
         The updated force diagram.
+    tuple[int, float]
+        The number of iterations and the largest displacement in the last iteration, if ``full_output`` is ``True``.
+        The iterations met ``tol`` if the displacement is smaller than ``tol``.
 
     """
+    pair = compile_pair(form, force, pair)
     # --------------------------------------------------------------------------
     # form diagram
     # --------------------------------------------------------------------------
-    vertex_index = form.vertex_index()
-
-    xy = array(form.xy(), dtype=float64)
-    edges = [(vertex_index[u], vertex_index[v]) for u, v in form.edges()]
-    C = connectivity_matrix(edges, "csr")
+    xy = form.vertices_array("xy")
+    C = pair.C
 
     # --------------------------------------------------------------------------
     # force diagram
     # --------------------------------------------------------------------------
-    _vertex_index = force.vertex_index()
-    _edge_index = force.edge_index(form)
-    _edge_index.update({(v, u): _edge_index[u, v] for u, v in _edge_index})
+    _vertex_index = pair.force_vertex_index
 
-    _xy = array(force.xy(), dtype=float64)
-    _edges = force.ordered_edges(form)
-    _edges[:] = [(_vertex_index[u], _vertex_index[v]) for u, v in _edges]
+    _xy = force.vertices_array("xy")
 
-    _i_j = {index: [_vertex_index[nbr] for nbr in force.vertex_neighbors(vertex)] for index, vertex in enumerate(force.vertices())}
-    _ij_e = {(_vertex_index[u], _vertex_index[v]): _edge_index[u, v] for u, v in _edge_index}
-    _ij_e.update({(_vertex_index[v], _vertex_index[u]): _edge_index[u, v] for u, v in _edge_index})
+    _i_j = pair.force_i_j
+    _ij_e = pair.force_ij_e
 
     # --------------------------------------------------------------------------
     # constraints
@@ -570,13 +915,14 @@ def force_update_from_form_geometrical(force: ForceDiagram, form: FormDiagram, k
     _line_constraints_all = force.vertices_attribute("line_constraint")
     _line_constraints = [_line_constraints_all[i] for i in _free]
     _target_lengths = form.edges_attribute("target_force")
-    _target_vectors = [force.edge_attribute(edge, "target_vector") for edge in force.ordered_edges(form)]
+    _target_vectors_all = force.edges_attribute("target_vector")
+    _target_vectors = [_target_vectors_all[index] for index in pair.force_edge_order]
 
     # --------------------------------------------------------------------------
     # compute the coordinates of the *free* vertices of the force diagram
     # as a function of the fixed vertices and the previous coordinates of the *free* vertices
     # --------------------------------------------------------------------------
-    update_primal_from_dual(
+    iterations, residual = update_primal_from_dual(
         _xy,
         xy,
         _free,
@@ -587,16 +933,16 @@ def force_update_from_form_geometrical(force: ForceDiagram, form: FormDiagram, k
         target_lengths=_target_lengths,
         target_vectors=_target_vectors,
         kmax=kmax,
+        tol=tol,
     )
 
     # --------------------------------------------------------------------------
     # update force diagram
     # --------------------------------------------------------------------------
-    for vertex, attr in force.vertices(True):
-        index = _vertex_index[vertex]
-        attr["x"] = _xy[index, 0]
-        attr["y"] = _xy[index, 1]
+    force.set_vertices_array("xy", _xy)
 
+    if full_output:
+        return force, (iterations, residual)
     return force
 
 
@@ -623,18 +969,13 @@ def force_update_from_constraints(force: ForceDiagram, kmax: int = 100) -> Force
     # parameters from force diagram
     # --------------------------------------------------------------------------
     _k_i = force.vertex_index()
-    _xy = force.vertices_attributes("xy")
-    _edges = list(force.edges())
-    _edges = [(_k_i[u], _k_i[v]) for u, v in _edges]
-    _i_nbrs = {_k_i[key]: [_k_i[nbr] for nbr in force.vertex_neighbors(key)] for key in force.vertices()}
-    _uv_i = {uv: index for index, uv in enumerate(_edges)}
-    _ij_e = {(u, v): index for (u, v), index in iter(_uv_i.items())}
+    _xy = force.vertices_array("xy")
+    _edges = [(_k_i[u], _k_i[v]) for u, v in force.edges()]
 
     # --------------------------------------------------------------------------
     # fixity from constraints on force diagram
     # --------------------------------------------------------------------------
-    fixed_force = [key for key in force.vertices_where({"is_fixed": True})]
-    _fixed = [_k_i[key] for key in fixed_force]
+    _fixed = [_k_i[key] for key in force.vertices_where({"is_fixed": True})]
     line_constraints = force.vertices_attribute("line_constraint")
 
     # --------------------------------------------------------------------------
@@ -646,11 +987,9 @@ def force_update_from_constraints(force: ForceDiagram, kmax: int = 100) -> Force
     # --------------------------------------------------------------------------
     # Paralelise edge given force targets and/or target_lengths
     # --------------------------------------------------------------------------
-    parallelise_edges(
+    parallelise_edges_numpy(
         _xy,
         _edges,
-        _i_nbrs,
-        _ij_e,
         target_vectors,
         target_lengths,
         fixed=_fixed,
@@ -661,11 +1000,7 @@ def force_update_from_constraints(force: ForceDiagram, kmax: int = 100) -> Force
     # --------------------------------------------------------------------------
     # update force diagram geometry
     # --------------------------------------------------------------------------
-    for key in force.vertices():
-        i = _k_i[key]
-        x, y = _xy[i]
-        force.vertex_attribute(key, "x", x)
-        force.vertex_attribute(key, "y", y)
+    force.set_vertices_array("xy", _xy)
 
     return force
 
@@ -681,6 +1016,8 @@ def update_diagrams_from_constraints(
     max_iter: int = 20,
     kmax: int = 20,
     callback: Callable = None,
+    tol: float = None,
+    pair: CompiledPair = None,
 ) -> tuple[FormDiagram, ForceDiagram]:
     """Update the form and force diagram after constraints / or movements are imposed to the diagrams.
 
@@ -699,6 +1036,12 @@ def update_diagrams_from_constraints(
     callback: callable, optional
         Callable function at the end of each iteration.
         The default value is ``None``.
+    tol: float, optional
+        Stopping criterion of the least-square iterations for solving the duality form-force.
+        The default value is ``None``, in which case all ``kmax`` iterations are performed.
+    pair: :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        The default value is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
@@ -712,6 +1055,8 @@ def update_diagrams_from_constraints(
     form.dual = force
     force.dual = form
 
+    pair = compile_pair(form, force, pair)
+
     niter = 0
 
     while niter < max_iter:
@@ -722,13 +1067,13 @@ def update_diagrams_from_constraints(
             callback(form, force)
 
         # Find geometrical dual form diagram respecting form constraints -> Using Least-Squares
-        form_update_from_force(form, force, kmax=kmax)
+        form_update_from_force(form, force, kmax=kmax, tol=tol, pair=pair)
 
         if callback:
             callback(form, force)
 
         # Find geometrical dual force diagram respecting force constraints -> Using Least-Squares
-        force_update_from_form_geometrical(force, form, kmax=kmax)
+        force_update_from_form_geometrical(force, form, kmax=kmax, tol=tol, pair=pair)
 
         if callback:
             callback(form, force)
@@ -1,16 +1,17 @@
-from numpy import array
-from numpy import float64
+from numpy import pi
+from numpy import sqrt
 from scipy.optimize import minimize
 
-from compas.geometry import angle_vectors_xy
 from compas.linalg import normrow
-from compas.matrices import connectivity_matrix
+from compas_ags.ags.core import CompiledPair
+from compas_ags.ags.core import compile_pair
+from compas_ags.ags.core import update_edge_results
 from compas_ags.ags.core import update_primal_from_dual
 from compas_ags.diagrams import ForceDiagram
 from compas_ags.diagrams import FormDiagram
 
 
-def compute_loadpath(form: FormDiagram, force: ForceDiagram):
+def compute_loadpath(form: FormDiagram, force: ForceDiagram, pair: CompiledPair = None):
     """Compute the internal work of a structure.
 
     Parameters
@@ -19,6 +20,9 @@ def compute_loadpath(form: FormDiagram, force: ForceDiagram):
         The form diagram.
     force : :class:`ForceDiagram`
         The force diagram.
+    pair : :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        Default is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
@@ -26,10 +30,10 @@ def compute_loadpath(form: FormDiagram, force: ForceDiagram):
         The internal work done by the structure.
 
     """
-    return compute_internal_work(form, force)
+    return compute_internal_work(form, force, pair=pair)
 
 
-def compute_external_work(form: FormDiagram, force: ForceDiagram):
+def compute_external_work(form: FormDiagram, force: ForceDiagram, pair: CompiledPair = None):
     """Compute the external work of a structure.
 
     The external work done by a structure is equal to the work done by the external
@@ -42,6 +46,9 @@ def compute_external_work(form: FormDiagram, force: ForceDiagram):
         The form diagram.
     force : :class:`ForceDiagram`
         The force diagram.
+    pair : :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        Default is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
@@ -49,19 +56,15 @@ def compute_external_work(form: FormDiagram, force: ForceDiagram):
         The external work done by the structure.
 
     """
-    vertex_index = form.vertex_index()
-    xy = array(form.xy(), dtype=float64)
-    edges = [(vertex_index[u], vertex_index[v]) for u, v in form.edges()]
-    C = connectivity_matrix(edges, "csr")
+    pair = compile_pair(form, force, pair)
+    xy = form.vertices_array("xy")
+    C = pair.C
 
-    _vertex_index = force.vertex_index()
-    _xy = force.xy()
-    _edges = force.ordered_edges(form)
-    _edges[:] = [(_vertex_index[u], _vertex_index[v]) for u, v in _edges]
-    _C = connectivity_matrix(_edges, "csr")
+    _xy = force.vertices_array("xy")
+    _C = pair.force_C
 
-    leaves = set(form.leaves())
-    external = [i for i, (u, v) in enumerate(form.edges()) if u in leaves or v in leaves]
+    leaves = set(pair.leaves)
+    external = [i for i, (u, v) in enumerate(pair.edges) if u in leaves or v in leaves]
 
     lengths = normrow(C.dot(xy))
     forces = normrow(_C.dot(_xy))
@@ -69,7 +72,7 @@ def compute_external_work(form: FormDiagram, force: ForceDiagram):
     return lengths[external].T.dot(forces[external])[0, 0]
 
 
-def compute_internal_work(form: FormDiagram, force: ForceDiagram):
+def compute_internal_work(form: FormDiagram, force: ForceDiagram, pair: CompiledPair = None):
     """Compute the work done by the internal forces of a structure.
 
     Parameters
@@ -78,6 +81,9 @@ def compute_internal_work(form: FormDiagram, force: ForceDiagram):
         The form diagram.
     force : :class:`ForceDiagram`
         The force diagram.
+    pair : :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        Default is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
@@ -85,19 +91,15 @@ def compute_internal_work(form: FormDiagram, force: ForceDiagram):
         The internal work done by the structure.
 
     """
-    vertex_index = form.vertex_index()
-    xy = array(form.xy(), dtype=float64)
-    edges = [(vertex_index[u], vertex_index[v]) for u, v in form.edges()]
-    C = connectivity_matrix(edges, "csr")
+    pair = compile_pair(form, force, pair)
+    xy = form.vertices_array("xy")
+    C = pair.C
 
-    _vertex_index = force.vertex_index()
-    _xy = force.xy()
-    _edges = force.ordered_edges(form)
-    _edges[:] = [(_vertex_index[u], _vertex_index[v]) for u, v in _edges]
-    _C = connectivity_matrix(_edges, "csr")
+    _xy = force.vertices_array("xy")
+    _C = pair.force_C
 
-    leaves = set(form.leaves())
-    internal = [i for i, (u, v) in enumerate(form.edges()) if u not in leaves and v not in leaves]
+    leaves = set(pair.leaves)
+    internal = [i for i, (u, v) in enumerate(pair.edges) if u not in leaves and v not in leaves]
 
     lengths = normrow(C.dot(xy))
     forces = normrow(_C.dot(_xy))
@@ -105,7 +107,7 @@ def compute_internal_work(form: FormDiagram, force: ForceDiagram):
     return lengths[internal].T.dot(forces[internal])[0, 0]
 
 
-def compute_internal_work_tension(form: FormDiagram, force: ForceDiagram):
+def compute_internal_work_tension(form: FormDiagram, force: ForceDiagram, pair: CompiledPair = None):
     """Compute the work done by the internal tensile forces of a structure.
 
     Parameters
@@ -114,6 +116,9 @@ def compute_internal_work_tension(form: FormDiagram, force: ForceDiagram):
         The form diagram.
     force : :class:`ForceDiagram`
         The force diagram.
+    pair : :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        Default is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
@@ -121,20 +126,16 @@ def compute_internal_work_tension(form: FormDiagram, force: ForceDiagram):
         The internal work done by the tensile forces in a structure.
 
     """
-    vertex_index = form.vertex_index()
-    xy = array(form.xy(), dtype=float64)
-    edges = [(vertex_index[u], vertex_index[v]) for u, v in form.edges()]
-    C = connectivity_matrix(edges, "csr")
-    q = array(form.q(), dtype=float64).reshape((-1, 1))
-
-    _vertex_index = force.vertex_index()
-    _xy = force.xy()
-    _edges = force.ordered_edges(form)
-    _edges[:] = [(_vertex_index[u], _vertex_index[v]) for u, v in _edges]
-    _C = connectivity_matrix(_edges, "csr")
-
-    leaves = set(form.leaves())
-    internal = [i for i, (u, v) in enumerate(form.edges()) if u not in leaves and v not in leaves]
+    pair = compile_pair(form, force, pair)
+    xy = form.vertices_array("xy")
+    C = pair.C
+    q = form.edges_array("q")
+
+    _xy = force.vertices_array("xy")
+    _C = pair.force_C
+
+    leaves = set(pair.leaves)
+    internal = [i for i, (u, v) in enumerate(pair.edges) if u not in leaves and v not in leaves]
     tension = [i for i in internal if q[i, 0] > 0]
 
     lengths = normrow(C.dot(xy))
@@ -143,7 +144,7 @@ def compute_internal_work_tension(form: FormDiagram, force: ForceDiagram):
     return lengths[tension].T.dot(forces[tension])[0, 0]
 
 
-def compute_internal_work_compression(form: FormDiagram, force: ForceDiagram):
+def compute_internal_work_compression(form: FormDiagram, force: ForceDiagram, pair: CompiledPair = None):
     """Compute the work done by the internal compressive forces of a structure.
 
     Parameters
@@ -152,6 +153,9 @@ def compute_internal_work_compression(form: FormDiagram, force: ForceDiagram):
         The form diagram.
     force : :class:`ForceDiagram`
         The force diagram.
+    pair : :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        Default is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
@@ -159,20 +163,16 @@ def compute_internal_work_compression(form: FormDiagram, force: ForceDiagram):
         The internal work done by the compressive forces in a structure.
 
     """
-    vertex_index = form.vertex_index()
-    xy = array(form.xy(), dtype=float64)
-    edges = [(vertex_index[u], vertex_index[v]) for u, v in form.edges()]
-    C = connectivity_matrix(edges, "csr")
-    q = array(form.q(), dtype=float64).reshape((-1, 1))
-
-    _vertex_index = force.vertex_index()
-    _xy = force.xy()
-    _edges = force.ordered_edges(form)
-    _edges[:] = [(_vertex_index[u], _vertex_index[v]) for u, v in _edges]
-    _C = connectivity_matrix(_edges, "csr")
-
-    leaves = set(form.leaves())
-    internal = [i for i, (u, v) in enumerate(form.edges()) if u not in leaves and v not in leaves]
+    pair = compile_pair(form, force, pair)
+    xy = form.vertices_array("xy")
+    C = pair.C
+    q = form.edges_array("q")
+
+    _xy = force.vertices_array("xy")
+    _C = pair.force_C
+
+    leaves = set(pair.leaves)
+    internal = [i for i, (u, v) in enumerate(pair.edges) if u not in leaves and v not in leaves]
     compression = [i for i in internal if q[i, 0] < 0]
 
     lengths = normrow(C.dot(xy))
@@ -181,7 +181,7 @@ def compute_internal_work_compression(form: FormDiagram, force: ForceDiagram):
     return lengths[compression].T.dot(forces[compression])[0, 0]
 
 
-def optimise_loadpath(form: FormDiagram, force, algo="COBYLA"):
+def optimise_loadpath(form: FormDiagram, force, algo="COBYLA", kmax=100, tol=None, full_output=False, pair: CompiledPair = None):
     """Optimise the loadpath using the parameters of the force domain. The parameters
     of the force domain are the coordinates of the vertices of the force diagram.
 
@@ -193,6 +193,19 @@ def optimise_loadpath(form: FormDiagram, force, algo="COBYLA"):
         The force diagram.
     algo : {'COBYLA', L-BFGS-B', 'SLSQ', 'MMA', 'GMMA'}, optional
         The optimisation algorithm.
+    kmax : int, optional
+        Maximum number of least-square iterations for updating the form diagram in every evaluation.
+        The default value is ``100``.
+    tol : float, optional
+        Stop the least-square iterations once no vertex of the form diagram moves more than this distance.
+        The default value is ``None``, in which case all ``kmax`` iterations are performed.
+    full_output : bool, optional
+        If ``True``, also return the number of least-square iterations and the largest displacement of a vertex
+        in the last iteration of the update of the form diagram in the last evaluation.
+        The default value is ``False``.
+    pair : :class:`compas_ags.ags.core.CompiledPair`, optional
+        The compiled topology of the diagrams.
+        The default value is ``None``, in which case the topology is compiled here.
 
     Returns
     -------
@@ -200,6 +213,9 @@ def optimise_loadpath(form: FormDiagram, force, algo="COBYLA"):
         The optimised form diagram.
     force: :class:`ForceDiagram`
         The optimised force diagram.
+    tuple[int, float]
+        The number of iterations and the largest displacement in the last iteration, if ``full_output`` is ``True``.
+        The iterations met ``tol`` if the displacement is smaller than ``tol``.
 
     Notes
     -----
@@ -221,37 +237,34 @@ def optimise_loadpath(form: FormDiagram, force, algo="COBYLA"):
     vice versa, parallelisation is no longer effective.
 
     """
-    vertex_index = form.vertex_index()
-    edge_index = form.edge_index()
-    i_j = {vertex_index[vertex]: [vertex_index[nbr] for nbr in form.vertex_neighbors(vertex)] for vertex in form.vertices()}
-    ij_e = {(vertex_index[u], vertex_index[v]): edge_index[u, v] for u, v in edge_index}
-    ij_e.update({(vertex_index[v], vertex_index[u]): edge_index[u, v] for u, v in edge_index})
+    pair = compile_pair(form, force, pair)
+    vertex_index = pair.vertex_index
+    i_j = pair.i_j
+    ij_e = pair.ij_e
 
-    xy = array(form.xy(), dtype=float64)
-    edges = [(vertex_index[u], vertex_index[v]) for u, v in form.edges()]
-    C = connectivity_matrix(edges, "csr")
+    xy = form.vertices_array("xy")
+    C = pair.C
 
-    leaves = [vertex_index[key] for key in form.leaves()]
+    leaves = pair.leaves
     fixed = [vertex_index[key] for key in form.fixed()]
     free = list(set(range(form.number_of_vertices())) - set(fixed) - set(leaves))
-    internal = [i for i, (u, v) in enumerate(form.edges()) if vertex_index[u] not in leaves and vertex_index[v] not in leaves]
+    internal = [i for i, (u, v) in enumerate(pair.edges) if u not in leaves and v not in leaves]
 
-    _vertex_index = force.vertex_index()
-    _edge_index = force.edge_index(form)
-    _edge_index.update({(v, u): _edge_index[u, v] for u, v in _edge_index})
+    _vertex_index = pair.force_vertex_index
 
-    _xy = array(force.xy(), dtype=float64)
-    _edges = force.ordered_edges(form)
-    _edges[:] = [(_vertex_index[u], _vertex_index[v]) for u, v in _edges]
-    _C = connectivity_matrix(_edges, "csr")
+    _xy = force.vertices_array("xy")
+    _C = pair.force_C
 
     _free = [key for key, attr in force.vertices(True) if attr["is_param"]]
     _free = [_vertex_index[key] for key in _free]
 
+    # the convergence of the update of the form diagram in the last evaluation
+    output = [0, 0.0]
+
     def objfunc(_x):
         _xy[_free, 0] = _x
 
-        update_primal_from_dual(xy, _xy, free, i_j, ij_e, _C, leaves=leaves)
+        output[:] = update_primal_from_dual(xy, _xy, free, i_j, ij_e, _C, leaves=leaves, kmax=kmax, tol=tol)
 
         length = normrow(C.dot(xy))
         force = normrow(_C.dot(_xy))
@@ -264,37 +277,11 @@ def optimise_loadpath(form: FormDiagram, force, algo="COBYLA"):
 
     result = minimize(objfunc, x0, method=algo, tol=1e-12, options={"maxiter": 1000})  # noqa: F841
 
-    uv = C.dot(xy)
-    _uv = _C.dot(_xy)
-    angles = [angle_vectors_xy(a, b) for a, b in zip(uv, _uv)]
-    lengths = normrow(uv)
-    forces = normrow(_uv)
-    q = forces / lengths
-
-    for vertex, attr in form.vertices(True):
-        index = vertex_index[vertex]
-        attr["x"] = xy[index, 0]
-        attr["y"] = xy[index, 1]
-
-    for edge, attr in form.edges(True):
-        index = edge_index[edge]
-        attr["l"] = lengths[index, 0]
-        attr["a"] = angles[index]
-        if (angles[index] - 3.14159) ** 2 < 0.25 * 3.14159:
-            attr["f"] = -forces[index, 0]
-            attr["q"] = -q[index, 0]
-        else:
-            attr["f"] = forces[index, 0]
-            attr["q"] = q[index, 0]
-
-    for vertex, attr in force.vertices(True):
-        index = _vertex_index[vertex]
-        attr["x"] = _xy[index, 0]
-        attr["y"] = _xy[index, 1]
-
-    for edge, attr in force.edges(True):
-        index = _edge_index[edge]
-        attr["a"] = angles[index]
-        attr["l"] = forces[index, 0]
+    # edges of which the form and force vectors are roughly opposite are in compression
+    form.set_vertices_array("xy", xy)
+    force.set_vertices_array("xy", _xy)
+    update_edge_results(form, force, C.dot(xy), _C.dot(_xy), compression_angle=pi - sqrt(0.25 * pi), pair=pair)
 
+    if full_output:
+        return form, force, tuple(output)
     return form, force
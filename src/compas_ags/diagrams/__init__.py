@@ -1,9 +1,11 @@
+from .arraystore import ArrayStore
 from .formgraph import FormGraph
 from .diagram import Diagram
 from .formdiagram import FormDiagram
 from .forcediagram import ForceDiagram
 
 __all__ = [
+    "ArrayStore",
     "FormGraph",
     "Diagram",
     "FormDiagram",
@@ -0,0 +1,174 @@
+from collections.abc import MutableMapping
+
+from numpy import array
+from numpy import bool_
+from numpy import float64
+
+
+class ArrayAttributes(MutableMapping, dict):
+    """Attribute dict of a vertex or edge of which some of the attributes are stored in shared arrays.
+
+    Parameters
+    ----------
+    attr : dict
+        The original attribute dict.
+    arrays : dict
+        The shared arrays per attribute name.
+    defaults : dict
+        The default values per attribute name, used when an attribute stored in an array is deleted.
+    index : int
+        The index of the vertex or edge in the arrays.
+
+    Notes
+    -----
+    The class derives from :class:`dict` such that it can replace the attribute dicts of a mesh,
+    but all access goes through the mapping interface.
+
+    """
+
+    __slots__ = ("_arrays", "_defaults", "_index")
+
+    def __init__(self, attr: dict, arrays: dict, defaults: dict, index: int) -> None:
+        dict.__init__(self, {name: value for name, value in attr.items() if name not in arrays})
+        self._arrays = arrays
+        self._defaults = defaults
+        self._index = index
+
+    def __getitem__(self, name):
+        if name in self._arrays:
+            return self._arrays[name][self._index].item()
+        return dict.__getitem__(self, name)
+
+    def __setitem__(self, name, value):
+        if name in self._arrays:
+            self._arrays[name][self._index] = value
+        else:
+            dict.__setitem__(self, name, value)
+
+    def __delitem__(self, name):
+        if name in self._arrays:
+            self._arrays[name][self._index] = self._defaults[name]
+        else:
+            dict.__delitem__(self, name)
+
+    def __contains__(self, name):
+        return name in self._arrays or dict.__contains__(self, name)
+
+    def __iter__(self):
+        yield from self._arrays
+        yield from dict.__iter__(self)
+
+    def __len__(self):
+        return len(self._arrays) + dict.__len__(self)
+
+    def __repr__(self):
+        return repr(self.copy())
+
+    def __reduce__(self):
+        return dict, (self.copy(),)
+
+    def clear(self):
+        dict.clear(self)
+        for name in self._arrays:
+            del self[name]
+
+    def copy(self) -> dict:
+        """Copy the attributes into a regular dict.
+
+        Returns
+        -------
+        dict
+
+        """
+        attr = {name: self[name] for name in self._arrays}
+        attr.update(dict.items(self))
+        return attr
+
+
+class ArrayStore:
+    """Struct-of-arrays store of the numerical attributes of the vertices and edges of a diagram.
+
+    Parameters
+    ----------
+    diagram : :class:`compas_ags.diagrams.Diagram`
+        The diagram.
+
+    Attributes
+    ----------
+    diagram : :class:`compas_ags.diagrams.Diagram`
+        The diagram.
+    vertices : list
+        The vertex identifiers, in the order of the arrays.
+    edges : list
+        The edge identifiers, in the order of the arrays.
+    vertex_arrays : dict
+        The arrays of the vertex attributes listed in :attr:`compas_ags.diagrams.Diagram.array_vertex_attributes`.
+    edge_arrays : dict
+        The arrays of the edge attributes listed in :attr:`compas_ags.diagrams.Diagram.array_edge_attributes`.
+
+    Notes
+    -----
+    Attributes with a boolean default value are stored in boolean arrays,
+    all other attributes in float64 arrays.
+    While the store is attached, the attribute dicts of the vertices and edges of the diagram
+    are replaced by :class:`ArrayAttributes`, such that the regular attribute API reads from and writes to the arrays.
+    Values of attributes that are stored in the arrays are always explicit,
+    i.e. they do not follow later changes of the default attribute values of the diagram.
+
+    Use :meth:`compas_ags.diagrams.Diagram.attach_arrays` rather than constructing a store directly.
+
+    """
+
+    def __init__(self, diagram) -> None:
+        self.diagram = diagram
+        self.vertices = list(diagram.vertices())
+        self.edges = list(diagram.edges())
+        self.vertex_arrays = {}
+        self.edge_arrays = {}
+        self._vertex_defaults = {}
+        self._edge_defaults = {}
+
+        for name in diagram.array_vertex_attributes:
+            default = diagram.default_vertex_attributes.get(name)
+            self._vertex_defaults[name] = default
+            self.vertex_arrays[name] = array(diagram.vertices_attribute(name, keys=self.vertices), dtype=_dtype(default)).reshape(-1)
+
+        for name in diagram.array_edge_attributes:
+            default = diagram.default_edge_attributes.get(name)
+            self._edge_defaults[name] = default
+            self.edge_arrays[name] = array(diagram.edges_attribute(name, keys=self.edges), dtype=_dtype(default)).reshape(-1)
+
+        for index, vertex in enumerate(self.vertices):
+            diagram.vertex[vertex] = ArrayAttributes(diagram.vertex[vertex], self.vertex_arrays, self._vertex_defaults, index)
+
+        for index, edge in enumerate(self.edges):
+            key = str(tuple(sorted(edge)))
+            diagram.edgedata[key] = ArrayAttributes(diagram.edgedata.get(key, {}), self.edge_arrays, self._edge_defaults, index)
+
+    def detach(self) -> None:
+        """Write the values of the arrays back into regular attribute dicts of the diagram.
+
+        Returns
+        -------
+        None
+
+        """
+        diagram = self.diagram
+
+        for vertex, attr in diagram.vertex.items():
+            if isinstance(attr, ArrayAttributes) and attr._arrays is self.vertex_arrays:
+                diagram.vertex[vertex] = _explicit(attr, self._vertex_defaults)
+
+        for key, attr in diagram.edgedata.items():
+            if isinstance(attr, ArrayAttributes) and attr._arrays is self.edge_arrays:
+                diagram.edgedata[key] = _explicit(attr, self._edge_defaults)
+
+
+def _dtype(default):
+    return bool_ if isinstance(default, bool) else float64
+
+
+def _explicit(attr: ArrayAttributes, defaults: dict) -> dict:
+    # only store values that differ from the defaults explicitly
+    explicit = {name: value for name, value in attr.copy().items() if name not in defaults or value != defaults[name]}
+    return explicit
@@ -1,4 +1,33 @@
+from typing import Callable
+from typing import Optional
+from typing import Union
+
+import numpy.typing as npt
+from numpy import array
+from numpy import column_stack
+from numpy import float64
+
 from compas.datastructures import Mesh
+from compas.datastructures.attributes import EdgeAttributeView
+from compas_ags.diagrams.arraystore import ArrayStore
+
+
+class _EdgeAttributeView(EdgeAttributeView):
+    # marks the topology of the diagram as changed if edges are (un)marked as part of the diagram through the view
+
+    def __init__(self, diagram, defaults, attr):
+        super().__init__(defaults, attr)
+        self.diagram = diagram
+
+    def __setitem__(self, name, value):
+        super().__setitem__(name, value)
+        if name == "_is_edge":
+            self.diagram.topology_changed()
+
+    def __delitem__(self, name):
+        super().__delitem__(name)
+        if name == "_is_edge":
+            self.diagram.topology_changed()
 
 
 class Diagram(Mesh):
@@ -8,12 +37,30 @@ class Diagram(Mesh):
     ----------
     dual : :class:`compas_ags.diagrams.Diagram`
         The dual diagram of this diagram.
+    topology_version : int
+        A counter that is incremented whenever the topology of the diagram changes,
+        i.e. when vertices or faces are added or removed, or when edges are marked as (not) being part of the diagram.
+        It can be used to invalidate data derived from the topology, such as :class:`compas_ags.ags.CompiledPair`.
+    array_vertex_attributes : tuple
+        The names of the vertex attributes that are stored in contiguous arrays if an :class:`ArrayStore` is attached.
+    array_edge_attributes : tuple
+        The names of the edge attributes that are stored in contiguous arrays if an :class:`ArrayStore` is attached.
+    arrays : :class:`compas_ags.diagrams.ArrayStore` or None
+        The attached array store, if any.
 
     """
 
+    array_vertex_attributes = ("x", "y")
+    array_edge_attributes = ()
+
+    _topology_version = 0
+    _use_arrays = False
+    _store = None
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._dual = None
+        self._topology_cache = {}
 
     @property
     def dual(self):
@@ -23,6 +70,178 @@ class Diagram(Mesh):
     def dual(self, dual):
         self._dual = dual
 
+    @property
+    def topology_version(self):
+        return self._topology_version
+
+    def topology_changed(self):
+        """Mark the topology of the diagram as changed.
+
+        This is called automatically by the methods of the diagram that modify its topology,
+        and when the ``_is_edge`` attribute of an edge is modified through the attribute API.
+        It only needs to be called explicitly after modifying the underlying dictionaries directly.
+
+        Returns
+        -------
+        None
+
+        """
+        self._topology_version += 1
+        if self._store is not None:
+            # the store is rebuilt lazily for the new topology
+            self._store.detach()
+            self._store = None
+
+    def _cached(self, name: str, compile: Callable, *diagrams: "Diagram"):
+        """Retrieve data derived from the topology of the diagram from the cache.
+
+        Parameters
+        ----------
+        name : str
+            The name of the data.
+        compile : callable
+            Function compiling the data if it is not in the cache,
+            or if the cached data is out of date because the topology of the diagram has changed.
+        *diagrams : :class:`compas_ags.diagrams.Diagram`
+            Other diagrams the data depends on.
+            The data is also compiled again if one of these is replaced, or if its topology has changed.
+
+        Returns
+        -------
+        object
+
+        """
+        versions = (self.topology_version,) + tuple(diagram.topology_version for diagram in diagrams)
+        cached = self._topology_cache.get(name)
+        if cached is None or cached[1] != versions or any(a is not b for a, b in zip(cached[0], diagrams)):
+            cached = self._topology_cache[name] = diagrams, versions, compile()
+        return cached[2]
+
+    # --------------------------------------------------------------------------
+    # Topology modifications
+    # --------------------------------------------------------------------------
+
+    def clear(self):
+        super().clear()
+        self.topology_changed()
+
+    def add_vertex(self, *args, **kwargs):
+        result = super().add_vertex(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def add_face(self, *args, **kwargs):
+        result = super().add_face(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def delete_vertex(self, *args, **kwargs):
+        result = super().delete_vertex(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def delete_face(self, *args, **kwargs):
+        result = super().delete_face(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def remove_unused_vertices(self, *args, **kwargs):
+        result = super().remove_unused_vertices(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def remove_duplicate_vertices(self, *args, **kwargs):
+        result = super().remove_duplicate_vertices(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def cull_vertices(self, *args, **kwargs):
+        result = super().cull_vertices(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def quads_to_triangles(self, *args, **kwargs):
+        result = super().quads_to_triangles(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def flip_cycles(self, *args, **kwargs):
+        result = super().flip_cycles(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def unify_cycles(self, *args, **kwargs):
+        result = super().unify_cycles(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def insert_vertex(self, *args, **kwargs):
+        result = super().insert_vertex(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def collapse_edge(self, *args, **kwargs):
+        result = super().collapse_edge(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def split_edge(self, *args, **kwargs):
+        result = super().split_edge(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def split_face(self, *args, **kwargs):
+        result = super().split_face(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def merge_faces(self, *args, **kwargs):
+        result = super().merge_faces(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def unweld_vertices(self, *args, **kwargs):
+        result = super().unweld_vertices(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def weld(self, *args, **kwargs):
+        result = super().weld(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def join(self, *args, **kwargs):
+        result = super().join(*args, **kwargs)
+        self.topology_changed()
+        return result
+
+    def edge_attribute(self, edge, name, value=None):
+        result = super().edge_attribute(edge, name, value)
+        if name == "_is_edge" and value is not None:
+            self.topology_changed()
+        return result
+
+    def edge_attributes(self, edge, names=None, values=None):
+        result = super().edge_attributes(edge, names, values)
+        if isinstance(result, EdgeAttributeView):
+            return _EdgeAttributeView(self, result.defaults, result.attr)
+        return result
+
+    def unset_edge_attribute(self, edge, name):
+        result = super().unset_edge_attribute(edge, name)
+        if name == "_is_edge":
+            self.topology_changed()
+        return result
+
+    def update_default_edge_attributes(self, attr_dict=None, **kwattr):
+        super().update_default_edge_attributes(attr_dict, **kwattr)
+        if "_is_edge" in (attr_dict or {}) or "_is_edge" in kwattr:
+            self.topology_changed()
+
+    # --------------------------------------------------------------------------
+    # Indices
+    # --------------------------------------------------------------------------
+
     def vertex_index(self):
         return {vertex: index for index, vertex in enumerate(self.vertices())}
 
@@ -34,3 +253,194 @@ class Diagram(Mesh):
 
     def index_edge(self):
         return {index: edge for index, edge in enumerate(self.edges())}
+
+    # --------------------------------------------------------------------------
+    # Arrays
+    # --------------------------------------------------------------------------
+
+    @property
+    def arrays(self) -> Optional[ArrayStore]:
+        if self._use_arrays and self._store is None:
+            self._store = ArrayStore(self)
+        return self._store
+
+    def attach_arrays(self) -> ArrayStore:
+        """Store the numerical attributes of the vertices and edges in contiguous arrays.
+
+        Returns
+        -------
+        :class:`compas_ags.diagrams.ArrayStore`
+
+        Notes
+        -----
+        The attribute API of the diagram keeps working as before, but reads from and writes to the arrays.
+        After a change of the topology, the store is rebuilt when it is next needed.
+        The solvers read and write the arrays directly through :meth:`vertices_array`, :meth:`edges_array`,
+        :meth:`set_vertices_array` and :meth:`set_edges_array`.
+
+        """
+        self._use_arrays = True
+        return self.arrays
+
+    def detach_arrays(self) -> None:
+        """Move the attributes stored in arrays back into the regular attribute dicts.
+
+        Returns
+        -------
+        None
+
+        """
+        if self._store is not None:
+            self._store.detach()
+        self._store = None
+        self._use_arrays = False
+
+    @property
+    def __data__(self):
+        data = super().__data__
+        if self._store is not None:
+            data["vertex"] = {vertex: attr.copy() for vertex, attr in data["vertex"].items()}
+            data["edgedata"] = {key: attr.copy() for key, attr in data["edgedata"].items()}
+        return data
+
+    def __getstate__(self):
+        # the attribute dicts are pickled as regular dicts, the store is rebuilt when it is next needed
+        state = super().__getstate__()
+        state["__dict__"] = {name: value for name, value in state["__dict__"].items() if name != "_store"}
+        return state
+
+    def vertices_array(self, names: Union[str, list[str]]) -> npt.NDArray:
+        """Get the values of numerical vertex attributes as an array.
+
+        Parameters
+        ----------
+        names : str or list of str
+            The names of the attributes, e.g. ``["x", "y"]``.
+            A string is split into single-character names, e.g. ``"xy"``.
+
+        Returns
+        -------
+        array
+            The values with shape (number of vertices, number of names), in the order of the vertices.
+
+        Raises
+        ------
+        KeyError
+            If an attribute has no default value and is not defined for all vertices.
+
+        """
+        arrays = self.arrays
+        if arrays is not None and all(name in arrays.vertex_arrays for name in names):
+            return column_stack([arrays.vertex_arrays[name] for name in names]).astype(float64)
+        return self._attributes_array(names, self.vertices_attributes(names), self.default_vertex_attributes)
+
+    def set_vertices_array(self, names: Union[str, list[str]], values: npt.ArrayLike) -> None:
+        """Set the values of numerical vertex attributes from an array.
+
+        Parameters
+        ----------
+        names : str or list of str
+            The names of the attributes, e.g. ``["x", "y"]``.
+            A string is split into single-character names, e.g. ``"xy"``.
+        values : array-like
+            The values with shape (number of vertices, number of names), in the order of the vertices.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            If the number of values does not match the number of vertices times the number of names.
+
+        """
+        values = self._values_array(names, values, self.number_of_vertices(), "vertices")
+        names, values = self._set_stored(names, values, self.arrays.vertex_arrays if self.arrays is not None else {})
+        if not names:
+            return
+        for vertex, row in zip(self.vertices(), values.tolist()):
+            attr = self.vertex[vertex]
+            for name, value in zip(names, row):
+                attr[name] = value
+
+    def edges_array(self, names: Union[str, list[str]]) -> npt.NDArray:
+        """Get the values of numerical edge attributes as an array.
+
+        Parameters
+        ----------
+        names : str or list of str
+            The names of the attributes, e.g. ``["q", "l"]``.
+            A string is split into single-character names, e.g. ``"q"``.
+
+        Returns
+        -------
+        array
+            The values with shape (number of edges, number of names), in the order of the edges.
+
+        Raises
+        ------
+        KeyError
+            If an attribute has no default value and is not defined for all edges.
+
+        """
+        arrays = self.arrays
+        if arrays is not None and all(name in arrays.edge_arrays for name in names):
+            return column_stack([arrays.edge_arrays[name] for name in names]).astype(float64)
+        return self._attributes_array(names, self.edges_attributes(names), self.default_edge_attributes)
+
+    def set_edges_array(self, names: Union[str, list[str]], values: npt.ArrayLike) -> None:
+        """Set the values of numerical edge attributes from an array.
+
+        Parameters
+        ----------
+        names : str or list of str
+            The names of the attributes, e.g. ``["q", "l"]``.
+            A string is split into single-character names, e.g. ``"q"``.
+        values : array-like
+            The values with shape (number of edges, number of names), in the order of the edges.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        ValueError
+            If the number of values does not match the number of edges times the number of names.
+
+        """
+        values = self._values_array(names, values, self.number_of_edges(), "edges")
+        names, values = self._set_stored(names, values, self.arrays.edge_arrays if self.arrays is not None else {})
+        if not names:
+            return
+        for (edge, attr), row in zip(self.edges(True), values.tolist()):
+            for name, value in zip(names, row):
+                attr[name] = value
+
+    @staticmethod
+    def _attributes_array(names, rows: list, defaults: dict) -> npt.NDArray:
+        # attributes without a default value are None for the elements that do not define them
+        for column, name in enumerate(names):
+            if name not in defaults and any(row[column] is None for row in rows):
+                raise KeyError("Attribute {!r} is not defined. A string of names is split into single characters, use a list for longer names.".format(name))
+        return array(rows, dtype=float64).reshape((-1, len(names)))
+
+    @staticmethod
+    def _values_array(names, values: npt.ArrayLike, count: int, elements: str) -> npt.NDArray:
+        values = array(values, dtype=float64)
+        if values.size != count * len(names):
+            raise ValueError("The number of values ({}) does not match the number of {} ({}) times the number of names ({}).".format(values.size, elements, count, len(names)))
+        return values.reshape((count, len(names)))
+
+    @staticmethod
+    def _set_stored(names, values: npt.NDArray, stored: dict) -> tuple:
+        # copy the columns of attributes that are stored in arrays
+        # and return the names and values of the remaining attributes
+        remaining = []
+        for column, name in enumerate(names):
+            if name in stored:
+                stored[name][:] = values[:, column]
+            else:
+                remaining.append(column)
+        return [names[column] for column in remaining], values[:, remaining]
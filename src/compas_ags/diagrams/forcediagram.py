@@ -10,6 +10,9 @@ from compas_ags.diagrams import FormDiagram  # noqa: F401
 class ForceDiagram(Diagram):
     """Mesh-based data structure for force diagrams in AGS."""
 
+    array_vertex_attributes = ("x", "y", "is_fixed", "is_param")
+    array_edge_attributes = ("l", "a")
+
     dual: FormDiagram
 
     def __init__(self, **kwargs):
@@ -22,6 +25,7 @@ class ForceDiagram(Diagram):
         )
         self.update_default_edge_attributes(
             l=0.0,
+            a=0.0,
             target_vector=None,
         )
 
@@ -110,14 +114,17 @@ class ForceDiagram(Diagram):
             The next edge as a ((u, v), data) tuple, if ``data=True``.
 
         """
+        dual_methods = {name: getattr(self.dual, name, None) for name in conditions}
+        dual_edges = self._dual_edge_maps()[0]
+
         for edge in list(self.edges()):
             is_match = True
 
-            dual_edge = self.dual_edge(edge)
+            dual_edge = dual_edges.get(edge)
             dual_edge_attr = self.dual.edge_attributes(dual_edge)
 
             for cond_name, cond_value in conditions.items():
-                dual_method = getattr(self.dual, cond_name, None)
+                dual_method = dual_methods[cond_name]
 
                 if dual_method and callable(dual_method):
                     dual_value = dual_method(dual_edge)
@@ -161,11 +168,57 @@ class ForceDiagram(Diagram):
             The identifier of the dual edge if it exists.
 
         """
-        for u, v in self.dual.face_halfedges(edge[0]):
-            if self.dual.halfedge[v][u] == edge[1]:
-                if self.dual.has_edge((u, v)):
-                    return u, v
-                return v, u
+        return self._dual_edge_maps()[0].get(tuple(edge))
+
+    def edge_from_dual(self, edge: tuple[int, int]) -> Union[tuple[int, int], None]:
+        """Find the edge corresponding to an edge of the diagram's dual.
+
+        Parameters
+        ----------
+        edge : tuple of int
+            The identifier of the edge in the dual.
+
+        Returns
+        -------
+        tuple (int, int) or None
+            The identifier of the corresponding edge if it exists.
+            The edge is oriented from the face on the left of the dual edge to the face on its right,
+            and therefore does not necessarily have the same orientation as the edge identifiers of this diagram.
+
+        """
+        return self._dual_edge_maps()[1].get(tuple(edge))
+
+    def _dual_edge_maps(self) -> tuple[dict, dict]:
+        """Construct, or retrieve from the cache, the bidirectional mapping between the edges of the diagram and the edges of its dual.
+
+        The mapping is compiled in one pass over the halfedges of the dual,
+        and recompiled only if the dual has been replaced or the topology of one of the diagrams has changed.
+
+        Returns
+        -------
+        tuple (dict, dict)
+            The mapping of the edges of the diagram, in both directions, to the edges of the dual,
+            and the mapping of the edges of the dual, in both directions, to the edges of the diagram.
+
+        """
+
+        def compile():
+            form = self.dual
+            edges = set(form.edges())
+            edge_dual = {}
+            dual_edge = {}
+            for u, v in edges:
+                dual_edge[u, v] = dual_edge[v, u] = form.halfedge[u][v], form.halfedge[v][u]
+            # if two faces of the dual share more than one edge,
+            # the first one encountered in the cycle of the first face is used
+            for face in form.faces():
+                for u, v in form.face_halfedges(face):
+                    nbr = form.halfedge[v][u]
+                    if nbr is not None and (face, nbr) not in edge_dual:
+                        edge_dual[face, nbr] = (u, v) if (u, v) in edges else (v, u)
+            return edge_dual, dual_edge
+
+        return self._cached("dual_edge_maps", compile, self.dual)
 
     def is_dual_edge_external(self, edge: tuple[int, int]) -> bool:
         """Verify if the corresponding edge in the diagram's dual is marked as "external".
@@ -306,11 +359,58 @@ class ForceDiagram(Diagram):
         Returns
         -------
         list
+
+        Notes
+        -----
+        The list is cached, and only recomputed if the topology of one of the diagrams has changed.
+
         """
-        edge_index = self.edge_index(form=form)
-        index_edge = {index: edge for edge, index in edge_index.items()}
-        edges = [index_edge[index] for index in range(self.number_of_edges())]
-        return edges
+        return list(self._ordered_edges(form))
+
+    def ordered_edge_indices(self, form: FormDiagram) -> tuple[list[int], list[int]]:
+        """Construct the indices and orientations of the edges with the same order as the corresponding edges of the form diagram.
+
+        Parameters
+        ----------
+        form : :class:`compas_ags.diagrams.FormDiagram`
+
+        Returns
+        -------
+        tuple (list, list)
+            For every edge in the list of :meth:`ordered_edges`,
+            the index of the edge in the list of edges of the diagram,
+            and ``1`` if it has the same orientation as in that list or ``-1`` if it is reversed.
+
+        Notes
+        -----
+        The indices and orientations are cached,
+        and only recomputed if the topology of one of the diagrams has changed.
+
+        """
+
+        def compile():
+            edge_index = self.edge_index()
+            indices = []
+            signs = []
+            for u, v in self._ordered_edges(form):
+                if (u, v) in edge_index:
+                    indices.append(edge_index[u, v])
+                    signs.append(1)
+                else:
+                    indices.append(edge_index[v, u])
+                    signs.append(-1)
+            return indices, signs
+
+        indices, signs = self._cached("ordered_edge_indices", compile, form)
+        return list(indices), list(signs)
+
+    def _ordered_edges(self, form: FormDiagram) -> list[tuple[int, int]]:
+        def compile():
+            edge_index = self.edge_index(form=form)
+            index_edge = {index: edge for edge, index in edge_index.items()}
+            return [index_edge[index] for index in range(self.number_of_edges())]
+
+        return self._cached("ordered_edges", compile, form)
 
     # --------------------------------------------------------------------------
     # Helpers
@@ -318,9 +418,7 @@ class ForceDiagram(Diagram):
 
     def constraints_from_dual(self, tol: float = 10e-4) -> None:
         """ "Reflect constraints from the form diagram in the force diagram."""
-        edges = list(self.edges())
-        edge_index = self.dual.edge_index()
-        ordered_edges = self.ordered_edges(self.dual)
+        edges = set(self.edges())
         edges_orient = []
 
         # Fix vertices of dual independent edge
@@ -341,10 +439,8 @@ class ForceDiagram(Diagram):
 
         for form_edge in self.dual.edges():
             target_vector = self.dual.edge_attribute(form_edge, "target_vector")
-            index = edge_index[form_edge]
-            force_edge = ordered_edges[index]
             if target_vector is not None:
-                edges_orient.append(force_edge)
+                edges_orient.append(self.edge_from_dual(form_edge))
 
         for edge in edges_orient:
             edge = edge if edge in edges else (edge[1], edge[0])
@@ -1,5 +1,6 @@
-from itertools import islice
+from numbers import Integral
 from typing import Generator
+from typing import Iterable
 from typing import Optional
 from typing import Union
 
@@ -10,6 +11,9 @@ from compas_ags.diagrams import FormGraph
 class FormDiagram(Diagram):
     """Mesh-based data structure for form diagrams in AGS."""
 
+    array_vertex_attributes = ("x", "y", "is_fixed")
+    array_edge_attributes = ("q", "f", "l", "a", "is_ind", "is_external", "is_reaction", "is_load")
+
     def __init__(self, **kwargs):
         super(FormDiagram, self).__init__(**kwargs)
         self._graph = None
@@ -96,17 +100,26 @@ class FormDiagram(Diagram):
         -------
         list
             The identifiers of vertices with only one connected edge.
+
+        Notes
+        -----
+        The leaves are cached, and only identified again if the topology of the diagram has changed.
+
         """
-        keys = []
-        for key in self.vertices():
-            edges = 0
-            nbrs = self.vertex_neighbors(key)
-            for nbr in nbrs:
-                if self.edge_attribute((key, nbr), "_is_edge"):
-                    edges += 1
-            if edges == 1:
-                keys.append(key)
-        return keys
+
+        def compile():
+            keys = []
+            for key in self.vertices():
+                edges = 0
+                nbrs = self.vertex_neighbors(key)
+                for nbr in nbrs:
+                    if self.edge_attribute((key, nbr), "_is_edge"):
+                        edges += 1
+                if edges == 1:
+                    keys.append(key)
+            return keys
+
+        return list(self._cached("leaves", compile))
 
     # --------------------------------------------------------------------------
     # edges
@@ -125,20 +138,41 @@ class FormDiagram(Diagram):
         tuple
             If `data` is `False`, the tuple of vertices identifying the edge.
             Otherwise, a tuple with the pair of vertices and an attribute dict.
+
+        Notes
+        -----
+        The list of edges is cached, and only compiled again if the topology of the diagram has changed,
+        including changes of the ``_is_edge`` attribute of the edges.
+
         """
-        seen = set()
-        for u in self.halfedge:
-            for v in self.halfedge[u]:
-                if (u, v) in seen or (v, u) in seen:
-                    continue
-                seen.add((u, v))
-                seen.add((v, u))
-                if not self.edge_attribute((u, v), "_is_edge"):
-                    continue
-                if not data:
-                    yield u, v
-                else:
-                    yield (u, v), self.edge_attributes((u, v))
+
+        for edge in self._edge_list():
+            if not data:
+                yield edge
+            else:
+                yield edge, self.edge_attributes(edge)
+
+    def _edge_list(self) -> list[tuple[int, int]]:
+        def compile():
+            edges = []
+            seen = set()
+            for u in self.halfedge:
+                for v in self.halfedge[u]:
+                    if (u, v) in seen or (v, u) in seen:
+                        continue
+                    seen.add((u, v))
+                    seen.add((v, u))
+                    if not self.edge_attribute((u, v), "_is_edge"):
+                        continue
+                    edges.append((u, v))
+            return edges
+
+        return self._cached("edges", compile)
+
+    def _edge_identifier(self, edge: Union[tuple[int, int], int]) -> tuple[int, int]:
+        if isinstance(edge, Integral):
+            return self._edge_list()[edge]
+        return edge
 
     def leaf_edges(self) -> list[tuple[int, int]]:
         """Identify the edges connecting leaf vertices to the diagram.
@@ -148,12 +182,16 @@ class FormDiagram(Diagram):
         list
             The identifiers of the edges.
         """
-        edges = []
-        leaves = set(self.leaves())
-        for u, v in self.edges():
-            if u in leaves or v in leaves:
-                edges.append((u, v))
-        return edges
+
+        def compile():
+            edges = []
+            leaves = set(self.leaves())
+            for u, v in self.edges():
+                if u in leaves or v in leaves:
+                    edges.append((u, v))
+            return edges
+
+        return list(self._cached("leaf_edges", compile))
 
     def edge_forcedensity(
         self,
@@ -177,8 +215,7 @@ class FormDiagram(Diagram):
             The value of the force density in the edge.
 
         """
-        if isinstance(edge, int):
-            edge = next(islice(self.edges(), edge, None))
+        edge = self._edge_identifier(edge)
 
         if q is None:
             return self.edge_attribute(edge, "q")
@@ -203,8 +240,7 @@ class FormDiagram(Diagram):
             The current force in the edge.
 
         """
-        if isinstance(edge, int):
-            edge = next(islice(self.edges(), edge, None))
+        edge = self._edge_identifier(edge)
 
         length = self.edge_length(edge)
         q = self.edge_attribute(edge, "q")
@@ -216,6 +252,79 @@ class FormDiagram(Diagram):
         self.edge_attribute(edge, "q", force / length)
         return force
 
+    def edges_forcedensity(
+        self,
+        q: Optional[Iterable[float]] = None,
+        keys: Optional[Iterable[Union[tuple[int, int], int]]] = None,
+    ) -> list[float]:
+        """Get or set the forcedensities in multiple edges.
+
+        Parameters
+        ----------
+        q : iterable of float, optional
+            If no new values are given, the current forcedensity values will be returned.
+            Otherwise the stored values are updated with the provided ones, one value per edge.
+        keys : iterable of int or tuple, optional
+            The identifiers of the edges.
+            These can be indices in the edge list or tuples of vertices.
+            Default is ``None``, in which case all edges are used.
+
+        Returns
+        -------
+        list
+            The values of the force densities in the edges.
+
+        """
+        edges = self._edge_list() if keys is None else [self._edge_identifier(edge) for edge in keys]
+
+        if q is None:
+            return [self.edge_attribute(edge, "q") for edge in edges]
+
+        q = [float(value) for value in q]
+        if len(q) != len(edges):
+            raise ValueError("The number of force densities ({}) does not match the number of edges ({}).".format(len(q), len(edges)))
+        for edge, value in zip(edges, q):
+            self.edge_attribute(edge, "q", value)
+        return q
+
+    def edges_force(
+        self,
+        forces: Optional[Iterable[float]] = None,
+        keys: Optional[Iterable[Union[tuple[int, int], int]]] = None,
+    ) -> list[float]:
+        """Get or set the forces in multiple edges.
+
+        Parameters
+        ----------
+        forces : iterable of float, optional
+            If no values are given, the current force values will be returned.
+            Otherwise the stored values are updated, one value per edge,
+            and the edges are marked as independent, as in :meth:`edge_force`.
+        keys : iterable of int or tuple, optional
+            The identifiers of the edges.
+            These can be indices in the edge list or tuples of vertices.
+            Default is ``None``, in which case all edges are used.
+
+        Returns
+        -------
+        list
+            The current forces in the edges.
+
+        """
+        edges = self._edge_list() if keys is None else [self._edge_identifier(edge) for edge in keys]
+        lengths = [self.edge_length(edge) for edge in edges]
+
+        if forces is None:
+            return [self.edge_attribute(edge, "q") * length for edge, length in zip(edges, lengths)]
+
+        forces = [float(force) for force in forces]
+        if len(forces) != len(edges):
+            raise ValueError("The number of forces ({}) does not match the number of edges ({}).".format(len(forces), len(edges)))
+        for edge, length, force in zip(edges, lengths, forces):
+            self.edge_attribute(edge, "is_ind", True)
+            self.edge_attribute(edge, "q", force / length)
+        return forces
+
     # --------------------------------------------------------------------------
     # Convenience functions for retrieving the attributes of the formdiagram.
     # --------------------------------------------------------------------------
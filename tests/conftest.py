@@ -0,0 +1,31 @@
+import compas_ags
+import pytest
+
+from compas_ags.ags import force_update_from_form
+from compas_ags.ags import form_update_q_from_qind
+from compas_ags.diagrams import ForceDiagram
+from compas_ags.diagrams import FormDiagram
+from compas_ags.diagrams import FormGraph
+
+
+@pytest.fixture
+def truss_dense():
+    # the form diagram and constraints of scripts/paper-CSD/exampleE_truss_dense.py
+    form = FormDiagram.from_graph(FormGraph.from_obj(compas_ags.get("paper/exE_truss_dense.obj")))
+    force = ForceDiagram.from_formdiagram(form)
+    form.edge_attribute((17, 22), "is_ind", True)
+    form.edge_attribute((17, 22), "q", 1.0)
+    form_update_q_from_qind(form)
+    force_update_from_form(force, form)
+    form.vertices_attribute("is_fixed", True, keys=[14, 5])
+
+    index_edge = form.index_edge()
+    for index in [31, 34, 32, 37, 35, 18, 16, 15, 13, 12]:
+        edge = index_edge[index]
+        form.edge_attribute(edge, "target_vector", form.edge_direction(edge)[:2])
+    for index in [27, 25, 23, 21, 3, 0, 1, 5, 7, 9]:
+        form.edge_attribute(index_edge[index], "target_force", 7.0)
+    for index in [40, 33, 39, 36, 38, 17, 19, 14, 20]:
+        form.edge_attribute(index_edge[index], "target_force", 1.0)
+    form.identify_constraints()
+    return form, force
@@ -0,0 +1,169 @@
+import math
+
+import compas_ags
+import pytest
+from numpy import allclose
+from numpy import zeros
+
+from compas_ags.ags.constraints import AbstractConstraint
+from compas_ags.ags.constraints import AngleFix
+from compas_ags.ags.constraints import ConstraintsCollection
+from compas_ags.ags.constraints import HorizontalFix
+from compas_ags.ags.constraints import LengthFix
+from compas_ags.ags.constraints import SetLength
+from compas_ags.ags.constraints import VerticalFix
+from compas_ags.diagrams import FormDiagram
+from compas_ags.diagrams import FormGraph
+
+
+class DenseFix(AbstractConstraint):
+    # a constraint that only defines the dense row
+    def __init__(self, form, vertex):
+        super().__init__(form)
+        self.vertex = vertex
+
+    def compute_constraint(self):
+        row = zeros((1, self.number_of_cols))
+        row[0, self.vertex_index[self.vertex]] = 2.0
+        row[0, self.vertex_index[self.vertex] + self.vcount] = -1.0
+        return row, 0.5
+
+    def update_constraint_goal(self):
+        pass
+
+
+@pytest.fixture
+def form():
+    return FormDiagram.from_graph(FormGraph.from_obj(compas_ags.get("paper/gs_form_force.obj")))
+
+
+def move(form, vertex, dx, dy):
+    x, y = form.vertex_attributes(vertex, "xy")
+    form.vertex_attributes(vertex, "xy", [x + dx, y + dy])
+
+
+def expected_row(form, constraint):
+    # the rows of the constraints as they were computed before they were assembled from triplets
+    vcount = form.number_of_vertices()
+    i = form.vertex_index()
+    row = zeros(2 * vcount)
+    if isinstance(constraint, HorizontalFix):
+        row[i[constraint.vertex]] = 1.0
+        return row, form.vertex_attribute(constraint.vertex, "x") - constraint.x
+    if isinstance(constraint, VerticalFix):
+        row[i[constraint.vertex] + vcount] = 1.0
+        return row, form.vertex_attribute(constraint.vertex, "y") - constraint.y
+    if isinstance(constraint, AngleFix):
+        theta = math.radians(constraint.angle)
+        row[i[constraint.vertex]] = math.sin(theta)
+        row[i[constraint.vertex] + vcount] = math.cos(theta)
+        return row, (form.vertex_attribute(constraint.vertex, "y") - constraint.y) * math.cos(theta)
+    if isinstance(constraint, LengthFix):
+        u, v = constraint.edge
+        (xu, yu), (xv, yv) = form.vertex_attributes(u, "xy"), form.vertex_attributes(v, "xy")
+        length = math.hypot(xu - xv, yu - yv)
+        row[[i[u], i[v], i[u] + vcount, i[v] + vcount]] = (xu - xv) / length, (xv - xu) / length, (yu - yv) / length, (yv - yu) / length
+        return row, length - constraint.length
+    row[i[constraint.vertex]] = 2.0
+    row[i[constraint.vertex] + vcount] = -1.0
+    return row, 0.5
+
+
+@pytest.fixture
+def collection(form):
+    vertices = list(form.vertices())
+    edge = next(iter(form.edges()))
+    collection = ConstraintsCollection(form)
+    collection.add_constraint(HorizontalFix(form, vertices[0]))
+    collection.add_constraint(VerticalFix(form, vertices[0]))
+    collection.add_constraint(AngleFix(form, vertices[1], 30.0))
+    collection.add_constraint(LengthFix(form, edge))
+    collection.add_constraint(SetLength(form, edge, 2.0))
+    collection.add_constraint(DenseFix(form, vertices[2]))
+    # the same coordinates are fixed twice
+    collection.add_constraint(HorizontalFix(form, vertices[3]))
+    collection.add_constraint(HorizontalFix(form, vertices[3]))
+    collection.add_constraint(VerticalFix(form, vertices[0]))
+
+    for vertex in vertices[:4] + list(edge):
+        move(form, vertex, 0.1, -0.2)
+    move(form, edge[0], 0.3, 0.05)
+    return collection
+
+
+def test_compute_triplets(form, collection):
+    for constraint in collection.constraints:
+        row, r = expected_row(form, constraint)
+        cols, values, residual = constraint.compute_triplets()
+        assert len(cols) == len(set(cols)) == len(values)
+        assert sorted(cols) == row.nonzero()[0].tolist()
+        assert allclose(values, row[cols])
+        assert residual == pytest.approx(r)
+
+        dense, residual = constraint.compute_constraint()
+        assert dense.shape == (1, 2 * form.number_of_vertices())
+        assert allclose(dense[0], row)
+        assert residual == pytest.approx(r)
+
+
+def test_length_fix(form):
+    u, v = next(iter(form.edges()))
+    constraint = LengthFix(form, (u, v))
+    assert constraint.length == pytest.approx(form.edge_length((u, v)))
+    assert constraint.compute_triplets()[2] == pytest.approx(0.0)
+
+    # the row is the derivative of the length of the edge
+    move(form, u, 0.3, -0.1)
+    vertex_index = form.vertex_index()
+    vcount = form.number_of_vertices()
+    cols, values, r = constraint.compute_triplets()
+    assert r == pytest.approx(form.edge_length((u, v)) - constraint.length)
+    h = 1e-6
+    for vertex in (u, v):
+        for axis, offset in ((0, 0), (1, vcount)):
+            xy = form.vertex_attributes(vertex, "xy")
+            xy[axis] += h
+            form.vertex_attributes(vertex, "xy", xy)
+            r_plus = constraint.compute_triplets()[2]
+            xy[axis] -= 2 * h
+            form.vertex_attributes(vertex, "xy", xy)
+            r_min = constraint.compute_triplets()[2]
+            xy[axis] += h
+            form.vertex_attributes(vertex, "xy", xy)
+            assert values[cols.index(vertex_index[vertex] + offset)] == pytest.approx((r_plus - r_min) / (2 * h))
+
+
+def test_compute_constraints(form, collection):
+    rows = [expected_row(form, constraint) for constraint in collection.constraints]
+
+    jac, res = collection.compute_constraints()
+    assert jac.shape == (len(rows), 2 * form.number_of_vertices())
+    assert allclose(jac, [row for row, _ in rows])
+    assert allclose(res[:, 0], [r for _, r in rows])
+
+    csr, res_csr = collection.compute_constraints(rtype="csr")
+    assert allclose(csr.toarray(), jac)
+    assert allclose(res_csr, res)
+
+    # the fix constraints are skipped
+    fixes = [isinstance(constraint, (HorizontalFix, VerticalFix)) for constraint in collection.constraints]
+    jac, res = collection.compute_constraints(fixes=False)
+    assert allclose(jac, [row for (row, _), fix in zip(rows, fixes) if not fix])
+    assert allclose(res[:, 0], [r for (_, r), fix in zip(rows, fixes) if not fix])
+
+
+def test_compute_fixes(form, collection):
+    vertices = list(form.vertices())
+    vertex_index = form.vertex_index()
+    vcount = form.number_of_vertices()
+
+    indices, res = collection.compute_fixes()
+    assert sorted(indices.tolist()) == sorted([vertex_index[vertices[0]], vertex_index[vertices[0]] + vcount, vertex_index[vertices[3]]])
+    assert len(res) == len(indices)
+    assert not allclose(res, 0.0)
+    expected = {}
+    for constraint in collection.constraints:
+        if isinstance(constraint, (HorizontalFix, VerticalFix)):
+            row, r = expected_row(form, constraint)
+            expected[row.nonzero()[0][0]] = r
+    assert allclose(res, [expected[index] for index in indices])
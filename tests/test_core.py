@@ -0,0 +1,109 @@
+import pytest
+from numpy import allclose
+from numpy import arange
+from numpy import array
+from numpy import cos
+from numpy import einsum
+from numpy import errstate
+from numpy import pi
+from numpy import resize
+from numpy import sin
+from numpy import sqrt
+from numpy import stack
+from numpy import where
+
+from compas.geometry import angle_vectors_xy
+from compas.linalg import normrow
+from compas_ags.ags import compile_pair
+from compas_ags.ags import parallelise_edges
+from compas_ags.ags import parallelise_edges_numpy
+from compas_ags.ags import update_edge_results
+
+
+@pytest.mark.parametrize("kmax", [1, 2, 10, 100])
+def test_parallelise_edges_numpy(truss_dense, kmax):
+    _, force = truss_dense
+    force.constraints_from_dual()
+    k_i = force.vertex_index()
+    # the edge of the diagram with a length of 1e-15 has exactly zero length
+    force.vertex_attributes(1, "xy", force.vertex_attributes(0, "xy"))
+    xy = force.vertices_attributes("xy")
+    edges = [(k_i[u], k_i[v]) for u, v in force.edges()]
+    i_nbrs = {k_i[key]: [k_i[nbr] for nbr in force.vertex_neighbors(key)] for key in force.vertices()}
+    ij_e = {uv: index for index, uv in enumerate(edges)}
+    fixed = [k_i[key] for key in force.vertices_where({"is_fixed": True})]
+    line_constraints = force.vertices_attribute("line_constraint")
+    target_lengths = [force.dual_edge_targetforce(edge) for edge in force.edges()]
+    target_vectors = force.edges_attribute("target_vector")
+
+    # the inputs contain all types of constraints
+    assert fixed
+    assert any(line_constraints[i] for i in range(len(xy)) if i not in fixed)
+    assert any(vector is not None for vector in target_vectors)
+    assert any(length is not None for length in target_lengths)
+
+    expected = [list(point) for point in xy]
+    parallelise_edges(expected, edges, i_nbrs, ij_e, target_vectors, target_lengths, fixed=fixed, line_constraints=line_constraints, kmax=kmax)
+    result = array(xy)
+    parallelise_edges_numpy(result, edges, target_vectors, target_lengths, fixed=fixed, line_constraints=line_constraints, kmax=kmax)
+
+    assert not allclose(result, xy)
+    assert allclose(result, expected, rtol=0.0, atol=1e-12)
+    # the zero-length edge is collapsed to its midpoint
+    assert allclose(result[k_i[1]], result[k_i[0]], rtol=0.0, atol=1e-12)
+
+
+def old_edge_results(form, force, uv, _uv, loadpath):
+    # the per-edge results of form_update_from_force and optimise_loadpath before they were vectorised
+    edge_index = form.edge_index()
+    _edge_index = force.edge_index(form)
+    _edge_index.update({(v, u): index for (u, v), index in _edge_index.items()})
+    angles = [angle_vectors_xy(a, b, deg=not loadpath) for a, b in zip(uv, _uv)]
+    lengths = normrow(uv)
+    forces = normrow(_uv)
+    with errstate(divide="ignore", invalid="ignore"):
+        q = forces / lengths
+
+    results = {}
+    for edge in form.edges():
+        index = edge_index[edge]
+        if loadpath:
+            sign = -1.0 if (angles[index] - 3.14159) ** 2 < 0.25 * 3.14159 else 1.0
+        else:
+            sign = 1.0 if angles[index] < 90 else -1.0
+        results[edge] = lengths[index, 0], angles[index], sign * forces[index, 0], sign * q[index, 0]
+    _results = {edge: (angles[_edge_index[edge]], forces[_edge_index[edge], 0]) for edge in force.edges()}
+    return results, _results
+
+
+@pytest.mark.parametrize("loadpath", [False, True])
+def test_update_edge_results(truss_dense, loadpath):
+    form, force = truss_dense
+    pair = compile_pair(form, force)
+    uv = pair.C.dot(form.vertices_array("xy"))
+    m = len(uv)
+
+    # rotate the form vectors over a range of angles, scaled with a range of forces,
+    # around the threshold of 90 degrees and the threshold of the loadpath optimisation at pi - sqrt(pi / 4)
+    threshold = pi - sqrt(0.25 * pi)
+    angles = array([0.0, 0.3, 0.5 * pi - 1e-3, 0.5 * pi + 1e-3, threshold - 1e-3, threshold + 1e-3, pi - 1e-3, pi])
+    angles = resize(angles, m) * where(arange(m) % 2, 1.0, -1.0)
+    rotation = stack((stack((cos(angles), -sin(angles)), axis=1), stack((sin(angles), cos(angles)), axis=1)), axis=1)
+    _uv = einsum("mij,mj->mi", rotation, uv) * (1.0 + arange(m) % 3)[:, None]
+    # zero-length vectors in the force diagram and in the form diagram
+    _uv[[1, 9]] = 0.0
+    uv[17] = 0.0
+
+    expected, _expected = old_edge_results(form, force, uv, _uv, loadpath)
+    assert {value[3] < 0 for value in expected.values()} == {True, False}
+
+    with errstate(divide="ignore", invalid="ignore"):
+        if loadpath:
+            update_edge_results(form, force, uv, _uv, compression_angle=threshold, pair=pair)
+        else:
+            update_edge_results(form, force, uv, _uv, deg=True, pair=pair)
+
+    for edge, values in expected.items():
+        assert allclose(form.edge_attributes(edge, ["l", "a", "f", "q"]), values, equal_nan=True)
+    for edge, values in _expected.items():
+        assert allclose(force.edge_attributes(edge, ["a", "l"]), values)
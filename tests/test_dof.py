@@ -0,0 +1,70 @@
+import compas_ags
+import pytest
+import sympy
+from compas.linalg import nonpivots
+from compas.matrices import equilibrium_matrix
+from numpy import zeros
+from numpy.random import default_rng
+
+from compas_ags.ags import compile_pair
+from compas_ags.ags import form_identify_dof
+from compas_ags.ags import rref_nonpivots
+from compas_ags.ags.core import rref_sympy
+from compas_ags.diagrams import FormDiagram
+from compas_ags.diagrams import FormGraph
+
+
+def exact_nonpivots(A):
+    # exact elimination with rational numbers,
+    # because an elimination with floats does not always recognise a pivot that is zero up to rounding errors
+    A = sympy.Matrix(A.tolist()).applyfunc(lambda a: sympy.nsimplify(a, rational=True))
+    _, pivots = A.rref()
+    return [j for j in range(A.shape[1]) if j not in pivots], len(pivots)
+
+
+def random_matrices(n=50, seed=0):
+    rng = default_rng(seed)
+    for _ in range(n):
+        rows, cols, rank = rng.integers(1, 7), rng.integers(1, 9), rng.integers(0, 6)
+        if rank:
+            yield rng.integers(-3, 4, (rows, rank)).dot(rng.integers(-3, 4, (rank, cols))).astype(float)
+        else:
+            yield zeros((rows, cols))
+
+
+def test_rref_nonpivots_sympy():
+    A = [[1, 0, 1, 3], [2, 3, 4, 7], [-1, -3, -3, -4]]
+    assert rref_nonpivots(A) == sorted(nonpivots(rref_sympy(A)))
+
+
+@pytest.mark.parametrize("A", list(random_matrices()))
+def test_rref_nonpivots_random(A):
+    assert rref_nonpivots(A) == exact_nonpivots(A)[0]
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "gs_form_force.obj",
+        "gs_truss.obj",
+        "exD_truss.obj",
+        "fink.obj",
+        "exA_arch-circular.obj",
+        "three_bar_problem.obj",
+        "funicular.obj",
+    ],
+)
+def test_form_identify_dof(name):
+    form = FormDiagram.from_graph(FormGraph.from_obj(compas_ags.get("paper/" + name)))
+    form.vertices_attribute("is_fixed", True, keys=form.leaves())
+    pair = compile_pair(form)
+    vertex_index = pair.vertex_index
+    fixed = [vertex_index[vertex] for vertex in form.fixed()]
+    free = list(set(range(len(vertex_index))) - set(fixed))
+    E = equilibrium_matrix(pair.C, form.vertices_attributes("xy"), free)
+    ind, rank = exact_nonpivots(E)
+
+    k, m, edges = form_identify_dof(form, pair=pair)
+    assert [pair.edges.index(edge) for edge in edges] == ind
+    assert k == E.shape[1] - rank
+    assert m == E.shape[0] - rank
@@ -0,0 +1,132 @@
+import pytest
+
+
+def walk_dual_edge(force, edge):
+    # the lookup of a dual edge by walking the halfedges of the face of the form diagram
+    form = force.dual
+    for u, v in form.face_halfedges(edge[0]):
+        if form.halfedge[v][u] == edge[1]:
+            if form.has_edge((u, v)):
+                return u, v
+            return v, u
+
+
+def assert_dual_edges(form, force):
+    for u, v in force.edges():
+        assert force.dual_edge((u, v)) == walk_dual_edge(force, (u, v))
+        assert force.dual_edge((v, u)) == walk_dual_edge(force, (v, u))
+    for u, v in form.edges():
+        assert force.edge_from_dual((u, v)) == (form.halfedge[u][v], form.halfedge[v][u])
+        assert force.edge_from_dual((v, u)) == (form.halfedge[u][v], form.halfedge[v][u])
+    assert len(force._dual_edge_maps()[1]) == 2 * form.number_of_edges()
+
+
+def test_dual_edge(truss_dense):
+    form, force = truss_dense
+    assert_dual_edges(form, force)
+
+    for name in ["is_external", "is_reaction", "is_load", "is_ind"]:
+        expected = [edge for edge in force.edges() if form.edge_attribute(walk_dual_edge(force, edge), name)]
+        assert expected
+        assert list(force.edges_where_dual({name: True})) == expected
+        assert [getattr(force, "is_dual_edge_" + name[3:])(edge) for edge in force.edges()] == [edge in expected for edge in force.edges()]
+
+    for edge in force.edges():
+        dual_edge = walk_dual_edge(force, edge)
+        assert force.dual_edge_force(edge) == form.edge_attribute(dual_edge, "f")
+        assert force.dual_edge_angledeviation(edge) == form.edge_attribute(dual_edge, "a")
+        assert force.dual_edge_targetforce(edge) == form.edge_attribute(dual_edge, "target_force")
+
+
+def test_constraints_from_dual(truss_dense):
+    form, force = truss_dense
+    edges = list(force.edges())
+    edge_from_dual = {}
+    for edge in edges:
+        u, v = walk_dual_edge(force, edge)
+        edge_from_dual[u, v] = edge_from_dual[v, u] = edge
+    fixed = set()
+    orient = set()
+    for edge in edges:
+        dual_edge = walk_dual_edge(force, edge)
+        if form.edge_attribute(dual_edge, "is_ind"):
+            fixed.update(edge)
+        if any(form.edge_attribute(dual_edge, name) for name in ["is_ind", "is_load", "is_reaction"]):
+            orient.add(edge)
+    orient.update(edge_from_dual[edge] for edge in form.edges() if form.edge_attribute(edge, "target_vector") is not None)
+
+    force.constraints_from_dual()
+
+    assert set(force.vertices_where({"is_fixed": True})) == fixed
+    assert {edge for edge in edges if force.edge_attribute(edge, "target_vector") is not None} == orient
+    for edge in orient:
+        assert force.edge_attribute(edge, "target_vector") == force.edge_direction(edge)[:2]
+    for edge in force.edges_where({"is_load": True}):
+        assert force.vertex_attribute(edge[0], "line_constraint") is not None
+
+
+@pytest.mark.parametrize(
+    "mutate",
+    [
+        lambda form, force: form.split_edge((17, 22)),
+        lambda form, force: form.collapse_edge((17, 22)),
+        # the new edge connects two faces of the form diagram that are not adjacent
+        lambda form, force: force.split_face(6, 15, 4),
+    ],
+)
+def test_dual_edge_cache(truss_dense, mutate):
+    form, force = truss_dense
+    maps = force._dual_edge_maps()
+    assert force._dual_edge_maps() is maps
+
+    mutate(form, force)
+
+    assert force._dual_edge_maps() is not maps
+    assert_dual_edges(form, force)
+
+
+def fresh_ordered_edges(form, force):
+    edge_index = force.edge_index(form=form)
+    index_edge = {index: edge for edge, index in edge_index.items()}
+    return [index_edge[index] for index in range(force.number_of_edges())]
+
+
+def assert_ordered_edges(form, force):
+    ordered_edges = fresh_ordered_edges(form, force)
+    assert force.ordered_edges(form) == ordered_edges
+
+    edge_index = force.edge_index()
+    indices, signs = force.ordered_edge_indices(form)
+    assert len(indices) == len(signs) == force.number_of_edges()
+    assert sorted(indices) == list(range(force.number_of_edges()))
+    for (u, v), index, sign in zip(ordered_edges, indices, signs):
+        if sign == 1:
+            assert edge_index[u, v] == index
+        else:
+            assert sign == -1
+            assert edge_index[v, u] == index
+
+
+def test_ordered_edges(truss_dense):
+    form, force = truss_dense
+    assert_ordered_edges(form, force)
+    assert -1 in force.ordered_edge_indices(form)[1]
+
+    # the cached lists are copied
+    force.ordered_edges(form).clear()
+    force.ordered_edge_indices(form)[0].clear()
+    assert_ordered_edges(form, force)
+
+
+def test_ordered_edges_cache(truss_dense):
+    form, force = truss_dense
+    ordered_edges = force.ordered_edges(form)
+    indices, signs = force.ordered_edge_indices(form)
+
+    # the faces of the form diagram are the vertices of the force diagram,
+    # such that the edges of the force diagram in the list are reversed
+    form.flip_cycles()
+
+    assert set(force.ordered_edges(form)) == {(v, u) for u, v in ordered_edges}
+    assert force.ordered_edge_indices(form) != (indices, signs)
+    assert_ordered_edges(form, force)
@@ -0,0 +1,143 @@
+import compas_ags
+import pytest
+
+from compas_ags.diagrams import FormDiagram
+from compas_ags.diagrams import FormGraph
+
+
+@pytest.fixture
+def form():
+    return FormDiagram.from_graph(FormGraph.from_obj(compas_ags.get("paper/gs_form_force.obj")))
+
+
+def fresh_edges(form):
+    # the edges of the diagram compiled from the halfedges, without the cache
+    edges = []
+    for u in form.halfedge:
+        for v in form.halfedge[u]:
+            if (v, u) in edges or (u, v) in edges:
+                continue
+            if form.edge_attribute((u, v), "_is_edge"):
+                edges.append((u, v))
+    return edges
+
+
+def fresh_leaves(form):
+    edges = fresh_edges(form)
+    return [vertex for vertex in form.vertices() if sum(vertex in edge for edge in edges) == 1]
+
+
+def set_is_edge_view(form):
+    form.edge_attributes((0, 5))["_is_edge"] = False
+
+
+def unset_is_edge_view(form):
+    form.edge_attribute((1, 6), "_is_edge", True)
+    assert list(form.edges()) == fresh_edges(form)
+    version = form.topology_version
+    del form.edge_attributes((1, 6))["_is_edge"]
+    assert form.topology_version > version
+
+
+@pytest.mark.parametrize(
+    "mutate",
+    [
+        lambda form: form.collapse_edge((0, 5)),
+        lambda form: form.split_edge((0, 5)),
+        lambda form: form.split_face(1, 6, 0),
+        lambda form: form.merge_faces([0, 3]),
+        lambda form: form.insert_vertex(4),
+        lambda form: form.unweld_vertices(4),
+        lambda form: form.delete_vertex(6),
+        lambda form: form.delete_face(0),
+        lambda form: form.edge_attribute((0, 5), "_is_edge", False),
+        lambda form: form.edge_attribute((1, 6), "_is_edge", True),
+        lambda form: form.edges_attribute("_is_edge", False, keys=[(0, 5)]),
+        lambda form: form.unset_edge_attribute((0, 5), "_is_edge"),
+        set_is_edge_view,
+        unset_is_edge_view,
+    ],
+)
+def test_topology_cache_invalidation(form, mutate):
+    # fill the caches
+    assert list(form.edges()) == fresh_edges(form)
+    assert form.leaves() == fresh_leaves(form)
+    form.leaf_edges()
+
+    version = form.topology_version
+    mutate(form)
+
+    assert form.topology_version > version
+    assert list(form.edges()) == fresh_edges(form)
+    assert form.leaves() == fresh_leaves(form)
+    leaves = set(form.leaves())
+    assert form.leaf_edges() == [(u, v) for u, v in form.edges() if u in leaves or v in leaves]
+
+
+def test_topology_cache_attributes(form):
+    version = form.topology_version
+    form.edge_attribute((0, 5), "q", 2.0)
+    form.edge_attributes((0, 5))["q"] = 3.0
+    form.edges_attribute("is_ind", True, keys=[(0, 5)])
+    form.vertex_attribute(0, "x", 1.0)
+    assert form.topology_version == version
+
+
+@pytest.mark.parametrize("arrays", [False, True])
+def test_attribute_arrays(form, arrays):
+    if arrays:
+        form.attach_arrays()
+
+    assert form.vertices_array("xy").tolist() == form.vertices_attributes("xy")
+    assert form.edges_array(["is_ind", "q"]).shape == (form.number_of_edges(), 2)
+    with pytest.raises(KeyError):
+        form.edges_array("is_ind")
+
+    form.set_edges_array(["q"], [2.0] * form.number_of_edges())
+    assert form.edges_attribute("q") == [2.0] * form.number_of_edges()
+    with pytest.raises(ValueError):
+        form.set_edges_array("is_ind", [1.0] * form.number_of_edges())
+
+
+def test_edges_forcedensity(form):
+    edges = list(form.edges())
+    assert form.edges_forcedensity() == form.edges_attribute("q")
+
+    # integer keys are indices in the list of edges
+    assert form.edges_forcedensity([2.0, -3.0], keys=[0, 4]) == [2.0, -3.0]
+    assert form.edge_attribute(edges[0], "q") == 2.0
+    assert form.edge_attribute(edges[4], "q") == -3.0
+    assert form.edges_forcedensity(keys=[edges[0], 4]) == [2.0, -3.0]
+
+    # tuple keys are edges in either direction
+    u, v = edges[1]
+    form.edges_forcedensity([5.0, 6.0], keys=[(u, v), edges[2][::-1]])
+    assert form.edges_forcedensity(keys=[1, 2]) == [5.0, 6.0]
+
+    q = [float(index) for index in range(len(edges))]
+    form.edges_forcedensity(iter(q))
+    assert form.edges_attribute("q") == q
+
+    with pytest.raises(ValueError):
+        form.edges_forcedensity([1.0], keys=[0, 1])
+    with pytest.raises(ValueError):
+        form.edges_forcedensity(q[:-1])
+    assert form.edges_attribute("q") == q
+
+
+def test_edges_force(form):
+    edges = list(form.edges())
+    lengths = [form.edge_length(edge) for edge in edges]
+    assert form.edges_force() == pytest.approx([form.edge_force(edge) for edge in edges])
+    assert not form.ind()
+
+    assert form.edges_force([-10.0, 4.0], keys=[1, edges[3][::-1]]) == [-10.0, 4.0]
+    assert form.edge_attribute(edges[1], "q") == pytest.approx(-10.0 / lengths[1])
+    assert form.edge_attribute(edges[3], "q") == pytest.approx(4.0 / lengths[3])
+    assert form.edges_force(keys=[edges[1], 3]) == pytest.approx([-10.0, 4.0])
+    assert form.edge_force(1) == pytest.approx(-10.0)
+    assert set(form.ind()) == {edges[1], edges[3]}
+
+    with pytest.raises(ValueError):
+        form.edges_force([1.0, 2.0, 3.0], keys=[0, 2])
+    assert set(form.ind()) == {edges[1], edges[3]}
@@ -0,0 +1,141 @@
+import compas_ags
+import pytest
+from numpy import allclose
+from numpy import arange
+from numpy import array
+
+from compas_ags.ags import force_update_from_form
+from compas_ags.ags import form_update_from_force
+from compas_ags.ags import form_identify_dof
+from compas_ags.ags import form_update_q_from_qind
+from compas_ags.ags import vertex_edge_adjacency
+from compas_ags.ags.graphstatics import force_update_from_form_geometrical
+from compas_ags.ags.graphstatics import update_diagrams_from_qind
+from compas_ags.ags.loadpath import optimise_loadpath
+from compas_ags.diagrams import ForceDiagram
+from compas_ags.diagrams import FormDiagram
+from compas_ags.diagrams import FormGraph
+
+
+@pytest.fixture
+def panel():
+    graph = FormGraph.from_obj(compas_ags.get("paper/gs_form_force.obj"))
+    form = FormDiagram.from_graph(graph)
+    force = ForceDiagram.from_formdiagram(form)
+    left = next(form.vertices_where({"x": 0.0, "y": 0.0}))
+    right = next(form.vertices_where({"x": 6.0, "y": 0.0}))
+    form.vertices_attribute("is_fixed", True, keys=[left, right])
+    form.edge_force(1, -10.0)
+    form_update_q_from_qind(form)
+    force_update_from_form(force, form)
+    return form, force
+
+
+@pytest.fixture
+def bridge():
+    # the truss of the loadpath example
+    nodes = [[float(x), 0.0, 0.0] for x in range(7)] + [[float(x), -1.0, 0.0] for x in range(7)] + [[float(x), 1.0, 0.0] for x in range(1, 6)]
+    edges = [(i, i + 1) for i in range(6)] + [(i, i + 7) for i in range(7)] + [(0, 14), (14, 15), (15, 16), (16, 17), (17, 18), (18, 6)]
+    edges += [(i, i + 13) for i in range(1, 6)]
+    form = FormDiagram.from_graph(FormGraph.from_nodes_and_edges(nodes, edges))
+    force = ForceDiagram.from_formdiagram(form)
+    form.edges_attribute("is_ind", True, keys=[(8, 1), (9, 2), (10, 3), (11, 4), (12, 5)])
+    form_update_q_from_qind(form)
+    force_update_from_form(force, form)
+    for vertex, y in zip([6, 5, 4, 0, 3, 2, 1], [-2.5, -1.5, -0.5, 0.0, 0.5, 1.5, 2.5]):
+        force.vertex_attributes(vertex, "xy", [0.0, y])
+    for vertex, y in zip(range(7, 13), [-2.5, -1.5, -0.5, 0.5, 1.5, 2.5]):
+        force.vertex_attributes(vertex, "xy", [-2.0, y])
+    force.vertices_attribute("is_param", True, keys=list(range(7, 13)))
+    form.vertices_attribute("is_fixed", True, keys=list(range(7)))
+    return form, force
+
+
+def diagrams_with_dof(name):
+    form = FormDiagram.from_graph(FormGraph.from_obj(compas_ags.get("paper/" + name)))
+    form.vertices_attribute("is_fixed", True, keys=form.leaves())
+    _, _, ind = form_identify_dof(form)
+    form.vertices_attribute("is_fixed", False)
+    form.edges_attribute("is_ind", True, keys=ind)
+    form_update_q_from_qind(form)
+    force = ForceDiagram.from_formdiagram(form)
+    force_update_from_form(force, form)
+    return form, force
+
+
+def test_vertex_edge_adjacency():
+    indptr, nbrs, edges = vertex_edge_adjacency([1, 2], {1: [0, 2], 2: [1]}, {(1, 0): 0, (1, 2): 1, (2, 1): 1})
+    assert indptr.tolist() == [0, 2, 3]
+    assert nbrs.tolist() == [0, 2, 1]
+    assert edges.tolist() == [0, 1, 1]
+
+    # a neighbour without an edge means that the topologies of the diagrams do not match
+    with pytest.raises(KeyError):
+        vertex_edge_adjacency([1], {1: [0, 2]}, {(1, 0): 0})
+
+
+@pytest.mark.parametrize("tol", [None, 1e-8])
+def test_form_update_from_force_output(panel, tol):
+    form, force = panel
+    vertex = list(force.vertices())[3]
+    force.vertex_attribute(vertex, "x", force.vertex_attribute(vertex, "x") + 0.5)
+
+    assert len(form_update_from_force(form, force, kmax=500, tol=tol)) == 2
+    form, force, (iterations, residual) = form_update_from_force(form, force, kmax=500, tol=tol, full_output=True)
+    if tol is None:
+        assert iterations == 500
+    else:
+        assert iterations < 500
+        assert residual < tol
+
+
+def test_force_update_from_form_geometrical_output(panel):
+    form, force = panel
+    assert isinstance(force_update_from_form_geometrical(force, form, kmax=50, tol=1e-8), ForceDiagram)
+
+    # the diagrams are reciprocal
+    force, (iterations, residual) = force_update_from_form_geometrical(force, form, kmax=50, tol=1e-8, full_output=True)
+    assert iterations < 50
+    assert residual < 1e-8
+
+    # the moved support changes the direction of the reaction, and the iterations do not meet the tolerance
+    vertex = next(form.vertices_where({"x": 6.0, "y": 0.0}))
+    form.vertex_attribute(vertex, "y", 0.5)
+    force, (iterations, residual) = force_update_from_form_geometrical(force, form, kmax=50, tol=1e-8, full_output=True)
+    assert iterations == 50
+    assert residual > 1e-8
+
+
+def test_optimise_loadpath_output(bridge):
+    form, force = bridge
+    form, force, (iterations, residual) = optimise_loadpath(form, force, kmax=100, tol=1e-8, full_output=True)
+    assert iterations < 100
+    assert residual < 1e-8
+
+
+@pytest.mark.parametrize("name", ["3hinged.obj", "gs_form_force-04.obj", "exE_truss_dense.obj", "grid_irregular.obj"])
+def test_update_diagrams_from_qind(name):
+    form, force = diagrams_with_dof(name)
+    q0 = form.edges_array(["q", "f"])
+    xy0 = force.vertices_array("xy")
+    ind = form.ind()
+    qind = array([[1.0, -2.0, 0.5, 3.0]] * len(ind)) * arange(1, len(ind) + 1)[:, None]
+
+    q, f, _xy = update_diagrams_from_qind(form, force, qind)
+    assert (form.edges_array(["q", "f"]) == q0).all()
+    assert (force.vertices_array("xy") == xy0).all()
+
+    for case in range(qind.shape[1]):
+        expected_form, expected_force = diagrams_with_dof(name)
+        for edge, value in zip(ind, qind[:, case]):
+            expected_form.edge_attribute(edge, "q", float(value))
+        form_update_q_from_qind(expected_form)
+        force_update_from_form(expected_force, expected_form)
+
+        assert allclose(q[:, case], expected_form.edges_array("q")[:, 0])
+        assert allclose(f[:, case], expected_form.edges_array("f")[:, 0])
+        assert allclose(_xy[case], expected_force.vertices_array("xy"))
+
+        update_diagrams_from_qind(form, force, qind, case=case)
+        assert allclose(form.edges_array(["q", "f", "l"]), expected_form.edges_array(["q", "f", "l"]))
+        assert allclose(force.vertices_array("xy"), expected_force.vertices_array("xy"))
@@ -0,0 +1,129 @@
+import compas_ags
+import pytest
+from numpy import allclose
+from numpy import eye
+from numpy import zeros
+from scipy.sparse import csr_matrix
+
+from compas_ags.ags import SparseFactor
+from compas_ags.ags import compute_jacobian
+from compas_ags.ags import force_update_from_form
+from compas_ags.ags import form_count_dof
+from compas_ags.ags import form_update_from_force_newton
+from compas_ags.ags import form_update_q_from_qind
+from compas_ags.ags import jacobian_operator
+from compas_ags.diagrams import ForceDiagram
+from compas_ags.diagrams import FormDiagram
+from compas_ags.diagrams import FormGraph
+
+
+@pytest.fixture
+def panel():
+    graph = FormGraph.from_obj(compas_ags.get("paper/gs_form_force.obj"))
+    form = FormDiagram.from_graph(graph)
+    force = ForceDiagram.from_formdiagram(form)
+    left = next(form.vertices_where({"x": 0.0, "y": 0.0}))
+    right = next(form.vertices_where({"x": 6.0, "y": 0.0}))
+    form.vertices_attribute("is_fixed", True, keys=[left, right])
+    form.edge_force(1, -10.0)
+    form_update_q_from_qind(form)
+    force_update_from_form(force, form)
+    return form, force
+
+
+@pytest.fixture
+def truss():
+    # the truss has a mechanism, such that the equilibrium matrix of the dependent edges is not square
+    graph = FormGraph.from_obj(compas_ags.get("paper/gs_truss.obj"))
+    form = FormDiagram.from_graph(graph)
+    force = ForceDiagram.from_formdiagram(form)
+    form.edge_attribute((6, 14), "is_ind", True)
+    form.edge_attribute((6, 14), "q", -1.0)
+    form.vertices_attribute("is_fixed", True, keys=[5, 1])
+    form_update_q_from_qind(form)
+    force_update_from_form(force, form)
+    return form, force
+
+
+def force_coordinates(form, force, xy):
+    form.set_vertices_array("xy", xy)
+    form_update_q_from_qind(form)
+    force_update_from_form(force, form)
+    return force.vertices_array("xy").T.ravel()
+
+
+def test_jacobian_finite_differences(panel):
+    form, force = panel
+    jacobian = compute_jacobian(form, force)
+
+    xy = form.vertices_array("xy")
+    vcount = len(xy)
+    h = 1e-6
+    fd = zeros(jacobian.shape)
+    for column in range(2 * vcount):
+        i, j = column % vcount, column // vcount
+        xy_plus = xy.copy()
+        xy_plus[i, j] += h
+        xy_min = xy.copy()
+        xy_min[i, j] -= h
+        fd[:, column] = (force_coordinates(form, force, xy_plus) - force_coordinates(form, force, xy_min)) / (2 * h)
+
+    assert allclose(jacobian, fd, atol=1e-6)
+
+
+def test_sparsefactor_not_square():
+    with pytest.raises(ValueError):
+        SparseFactor(csr_matrix([[1.0, 0.0, 1.0], [0.0, 1.0, 1.0]]))
+
+
+def test_jacobian_with_mechanism(truss):
+    form, force = truss
+    k, m = form_count_dof(form)
+    assert m > 0
+
+    jacobian = compute_jacobian(form, force)
+    assert jacobian.shape == (2 * force.number_of_vertices(), 2 * form.number_of_vertices())
+
+    operator = jacobian_operator(form, force)
+    assert allclose(operator.matmat(eye(operator.shape[1])), jacobian)
+    assert allclose(operator.rmatmat(eye(operator.shape[0])), jacobian.T)
+
+
+@pytest.mark.parametrize("linear_solver", ["qr", "lsmr", "krylov"])
+def test_newton_with_mechanism(truss, linear_solver):
+    form, force = truss
+    vertex = list(force.vertices())[3]
+    force.vertex_attribute(vertex, "x", force.vertex_attribute(vertex, "x") + 0.02)
+
+    _, result = form_update_from_force_newton(form, force, linear_solver=linear_solver, verbose=False, full_output=True)
+    assert result.converged
+
+
+@pytest.mark.parametrize("damping", [None, "linesearch", "lm"])
+def test_newton_result(truss, damping, capsys):
+    form, force = truss
+    vertex = list(force.vertices())[3]
+    force.vertex_attribute(vertex, "x", force.vertex_attribute(vertex, "x") + 0.3)
+
+    _, result = form_update_from_force_newton(form, force, damping=damping, full_output=True)
+    assert capsys.readouterr().out == ""
+    assert result.converged
+    assert len(result.residuals) == len(result.step_lengths) == len(result.damping) == result.iterations
+    assert all(0.0 < step <= 1.0 for step in result.step_lengths)
+    assert all(damp > 0.0 for damp in result.damping) == (damping == "lm")
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"linear_solver": "LSMR"},
+        {"method": "lm"},
+        {"damping": "LM"},
+        {"check": "never"},
+        {"linear_solver": "krylov", "method": "broyden"},
+    ],
+)
+def test_newton_options(truss, options):
+    form, force = truss
+    with pytest.raises(ValueError):
+        form_update_from_force_newton(form, force, **options)
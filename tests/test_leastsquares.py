@@ -0,0 +1,33 @@
+import pytest
+from numpy import array
+from numpy import hstack
+from numpy.linalg import matrix_rank
+
+from compas_ags.ags import LeastSquaresQR
+
+
+def rank_consistent(A, b):
+    # the rank test of the augmented matrix used by get_jacobian_and_residual before the QR decomposition
+    return matrix_rank(A) == matrix_rank(hstack((A, array(b).reshape(-1, 1))))
+
+
+@pytest.mark.parametrize(
+    "A, b, consistent",
+    [
+        ([[1.0, 1.0], [1.0, 1.0], [0.0, 0.0]], [2.0, 2.0, 0.0], True),
+        ([[1.0, 1.0], [1.0, 1.0], [0.0, 0.0]], [2.0, 2.0, 1.0], False),
+        # the numerical rank ignores the small singular value
+        ([[1.0, 0.0], [0.0, 1e-20]], [1.0, 1e-20], True),
+        ([[1.0, 0.0], [0.0, 1e-20]], [1.0, 1.0], False),
+        # a large solution tolerates a larger residual
+        ([[1e-6, 0.0], [0.0, 0.0]], [1.0, 0.0], True),
+        ([[1e-6, 0.0], [0.0, 0.0]], [1.0, 1e-12], True),
+        ([[1e-6, 0.0], [0.0, 0.0]], [1.0, 1e-10], True),
+        ([[1e-6, 0.0], [0.0, 0.0]], [1.0, 1e-8], False),
+        ([[1.0, 0.0], [0.0, 0.0]], [1.0, 1e-12], False),
+    ],
+)
+def test_is_consistent(A, b, consistent):
+    A = array(A)
+    assert rank_consistent(A, b) == consistent
+    assert LeastSquaresQR(A).is_consistent(b) == consistent